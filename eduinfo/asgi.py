@@ -0,0 +1,11 @@
+"""
+Point d'entrée du serveur web (Procfile : gunicorn avec des workers uvicorn).
+Les flux temps réel (main/flux.py) sont des vues asynchrones : une connexion SSE ou
+long-poll inactive n'y occupe qu'une coroutine, pas un worker. Les événements sont
+partagés entre processus par la base (EVENEMENTS_BROKER dans settings.py).
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eduinfo.settings')
+application = get_asgi_application()
@@ -62,6 +62,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'eduinfo.wsgi.application'
+ASGI_APPLICATION = 'eduinfo.asgi.application' # Flux temps réel (SSE / long-poll)
 
 # Base de données
 # Pour le développement local, on garde SQLite.
@@ -89,6 +90,26 @@ else:
 
 
 
+# Cache (versions des contenus pour les ETags, voir main/versions.py).
+# LocMemCache n'est pas partagé entre processus : en production avec plusieurs workers,
+# utiliser un cache partagé, par ex. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# et CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='eduinfo'),
+    },
+    # Listes de contenus partagées par classe (main/cache_contenus.py). Exemples :
+    # CACHE_CONTENUS_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+    # CACHE_CONTENUS_LOCATION=/var/tmp/eduinfo_contenus
+    'contenus': {
+        'BACKEND': config('CACHE_CONTENUS_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_CONTENUS_LOCATION', default='eduinfo-contenus'),
+        'TIMEOUT': config('CACHE_CONTENUS_TIMEOUT', default=300, cast=int),
+    },
+}
+
+
 LANGUAGE_CODE = 'fr-fr'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -101,9 +122,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles_build' / 'static' # Pour collectstatic
 # STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Fichiers médias (gérés par Cloudinary)
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Surchargeable : main.stockage.StockageLocal pour un hébergement local ou les tests
+DEFAULT_FILE_STORAGE = config('DEFAULT_FILE_STORAGE', default='cloudinary_storage.storage.MediaCloudinaryStorage')
 MEDIA_URL = '/media/' # Les URLs viendront de Cloudinary
-MEDIA_ROOT = BASE_DIR / 'media_temp_uploads' # Pour uploads temporaires locaux
+MEDIA_ROOT = Path(config('MEDIA_ROOT', default=str(BASE_DIR / 'media_temp_uploads'))) # Uploads temporaires, ou médias en stockage local
+# Préfixe d'une location nginx `internal` pointant sur MEDIA_ROOT : les médias locaux sont
+# alors envoyés par nginx (X-Accel-Redirect) au lieu du worker. Vide : envoi par Django.
+MEDIA_X_ACCEL_REDIRECT = config('MEDIA_X_ACCEL_REDIRECT', default='')
 
 # Configuration Cloudinary - lue depuis .env
 CLOUDINARY_STORAGE = {
@@ -125,13 +150,62 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
-    "https://eduinfo-flame.vercel.app/",
+    "https://eduinfo-flame.vercel.app",
 ]
 
 
+# Diffusion des notifications aux classes (voir main/diffusion.py)
+# Le Procfile et render.yaml déploient un worker dédié (manage.py diffuser_notifications --boucle) : les
+# processus web ne traitent donc pas les diffusions. NOTIFICATIONS_DIFFUSION_THREAD=True
+# les fait traiter par un thread du processus web, pour les installations sans worker.
+NOTIFICATIONS_DIFFUSION_THREAD = config('NOTIFICATIONS_DIFFUSION_THREAD', default=False, cast=bool)
+NOTIFICATIONS_TAILLE_LOT = config('NOTIFICATIONS_TAILLE_LOT', default=500, cast=int)
+# Durée du bail d'un worker sur une diffusion (secondes), renouvelé à chaque lot
+NOTIFICATIONS_DIFFUSION_BAIL = config('NOTIFICATIONS_DIFFUSION_BAIL', default=300, cast=int)
+
+# Rétention des notifications (manage.py purger_notifications, voir main/retention.py) ; 0 désactive une règle
+NOTIFICATIONS_RETENTION_LUES_JOURS = config('NOTIFICATIONS_RETENTION_LUES_JOURS', default=90, cast=int)
+NOTIFICATIONS_RETENTION_MAX_PAR_ELEVE = config('NOTIFICATIONS_RETENTION_MAX_PAR_ELEVE', default=500, cast=int)
+NOTIFICATIONS_RETENTION_ARCHIVER = config('NOTIFICATIONS_RETENTION_ARCHIVER', default=False, cast=bool)
+
+# Envois directs : l'empreinte SHA-256 des blobs est calculée pendant la réception (main/blobs.py)
+FILE_UPLOAD_HANDLERS = [
+    'main.blobs.EmpreinteMemoireUploadHandler',
+    'main.blobs.EmpreinteTemporaireUploadHandler',
+]
+
+# Téléversements par morceaux (voir main/televersements.py). Les morceaux sont assemblés
+# dans TELEVERSEMENTS_DOSSIER puis transférés vers le stockage par un pool de threads,
+# ou par `manage.py transferer_televersements --boucle` si TELEVERSEMENTS_THREAD=False.
+TELEVERSEMENTS_THREAD = config('TELEVERSEMENTS_THREAD', default=True, cast=bool)
+TELEVERSEMENTS_THREADS = config('TELEVERSEMENTS_THREADS', default=2, cast=int)
+TELEVERSEMENTS_TAILLE_MAX = config('TELEVERSEMENTS_TAILLE_MAX', default=1024 * 1024 * 1024, cast=int)
+# Durée du bail d'un worker sur un transfert (secondes), prolongé pendant la lecture du fichier
+TELEVERSEMENTS_BAIL = config('TELEVERSEMENTS_BAIL', default=300, cast=int)
+TELEVERSEMENTS_DOSSIER = config('TELEVERSEMENTS_DOSSIER', default=str(MEDIA_ROOT / 'televersements'))
+
+# Broker des événements temps réel (main/evenements.py). BrokerBase lit les nouvelles
+# notifications et messages en base toutes les EVENEMENTS_INTERVALLE secondes (partagé
+# entre processus) ; BrokerLocal ne relie que les requêtes d'un même processus.
+EVENEMENTS_BROKER = config('EVENEMENTS_BROKER', default='main.evenements.BrokerBase')
+EVENEMENTS_INTERVALLE = config('EVENEMENTS_INTERVALLE', default=1.0, cast=float)
+
+# Durée de validité des jetons de session élève, en secondes (30 jours par défaut)
+ELEVE_JETON_DUREE = config('ELEVE_JETON_DUREE', default=30 * 24 * 3600, cast=int)
+
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    # Jeton élève signé renvoyé par login_eleve (main/authentification.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'main.authentification.JetonEleveAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # Pagination par curseur (date, id) : voir main/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'main.pagination.KeysetPagination',
+    'PAGE_SIZE': config('API_PAGE_SIZE', default=50, cast=int),
 }
 # --- END OF FILE app/backend/eduinfo/settings.py ---
@@ -1,12 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from main.stockage import servir_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('main.urls')),
+    # Médias : plages, envoi par blocs, cache et X-Accel-Redirect (voir main/stockage.py)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:nom>", servir_media, name='servir_media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
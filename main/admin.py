@@ -1,6 +1,9 @@
 # --- START OF FILE app/backend/main/admin.py ---
 from django.contrib import admin
-from .models import Eleve, Fichier, Activite, Exercice, Note, Message, Notification, CompletionActivite, ReponseExercice
+from .models import Eleve, Fichier, Activite, Exercice, Note, Message, Notification, CompletionActivite, ReponseExercice, DiffusionNotification, Conversation
+from .models import NotificationArchivee
+from .models import recalculer_notifications_non_lues
+from .recherche import rechercher_eleves
 # J'ai listé explicitement les modèles importés pour plus de clarté,
 # mais "from .models import *" fonctionne aussi.
 
@@ -11,10 +14,16 @@ class EleveAdmin(admin.ModelAdmin):
     search_fields = ['nom', 'prenom']
     ordering = ['classe', 'nom', 'prenom']
 
+    def get_search_results(self, request, queryset, search_term):
+        # Même recherche que l'API : préfixes de mots via l'index TermeEleve, sans LIKE '%...%'
+        if not search_term:
+            return queryset, False
+        return rechercher_eleves(search_term, queryset), False
+
 @admin.register(Fichier)
 class FichierAdmin(admin.ModelAdmin):
     list_display = ['titre', 'get_classes_cibles_display', 'date_upload']
-    list_filter = ['classes_cibles'] # Ce filtre sera basique car c'est un champ texte
+    list_filter = ['classes'] # Filtre sur le ciblage normalisé
     search_fields = ['titre']
     ordering = ['-date_upload']
 
@@ -25,7 +34,7 @@ class FichierAdmin(admin.ModelAdmin):
 @admin.register(Activite)
 class ActiviteAdmin(admin.ModelAdmin):
     list_display = ['titre', 'get_classes_cibles_display', 'date_creation']
-    list_filter = ['classes_cibles']
+    list_filter = ['classes']
     search_fields = ['titre']
     ordering = ['-date_creation']
 
@@ -36,7 +45,7 @@ class ActiviteAdmin(admin.ModelAdmin):
 @admin.register(Exercice)
 class ExerciceAdmin(admin.ModelAdmin):
     list_display = ['titre', 'get_classes_cibles_display', 'date_creation']
-    list_filter = ['classes_cibles']
+    list_filter = ['classes']
     search_fields = ['titre']
     ordering = ['-date_creation']
 
@@ -69,6 +78,25 @@ class MessageAdmin(admin.ModelAdmin):
         return obj.contenu[:75] + '...' if len(obj.contenu) > 75 else obj.contenu
     contenu_court.short_description = 'Contenu'
 
+    # Garde les résumés de la boîte de réception cohérents avec les modifications faites ici.
+    def save_model(self, request, obj, form, change):
+        ancien_eleve_id = Message.objects.filter(pk=obj.pk).values_list('eleve_id', flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        Conversation.recalculer(obj.eleve_id)
+        if ancien_eleve_id and ancien_eleve_id != obj.eleve_id:
+            Conversation.recalculer(ancien_eleve_id)
+
+    def delete_model(self, request, obj):
+        eleve_id = obj.eleve_id
+        super().delete_model(request, obj)
+        Conversation.recalculer(eleve_id)
+
+    def delete_queryset(self, request, queryset):
+        eleve_ids = set(queryset.values_list('eleve_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for eleve_id in eleve_ids:
+            Conversation.recalculer(eleve_id)
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('destinataire', 'message_court', 'type_notification', 'lu', 'date_creation', 'lien_relatif')
@@ -91,6 +119,37 @@ class NotificationAdmin(admin.ModelAdmin):
         return obj.message[:75] + '...' if len(obj.message) > 75 else obj.message
     message_court.short_description = 'Message'
 
+    # Garde le compteur de badges (Eleve.notifications_non_lues) cohérent avec les modifications faites ici.
+    def save_model(self, request, obj, form, change):
+        ancien_destinataire_id = Notification.objects.filter(pk=obj.pk).values_list('destinataire_id', flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        recalculer_notifications_non_lues({obj.destinataire_id, ancien_destinataire_id} - {None})
+
+    def delete_model(self, request, obj):
+        destinataire_id = obj.destinataire_id
+        super().delete_model(request, obj)
+        recalculer_notifications_non_lues([destinataire_id])
+
+    def delete_queryset(self, request, queryset):
+        destinataire_ids = set(queryset.values_list('destinataire_id', flat=True))
+        super().delete_queryset(request, queryset)
+        recalculer_notifications_non_lues(destinataire_ids)
+
+
+@admin.register(NotificationArchivee)
+class NotificationArchiveeAdmin(admin.ModelAdmin):
+    """Consultation seule : les lignes sont écrites par la rétention (main/retention.py)."""
+    list_display = ('destinataire', 'message', 'type_notification', 'lu', 'date_creation', 'date_archivage')
+    list_filter = ('lu', 'type_notification')
+    search_fields = ('destinataire__nom', 'destinataire__prenom', 'message')
+    ordering = ['-date_archivage']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(CompletionActivite)
 class CompletionActiviteAdmin(admin.ModelAdmin):
@@ -111,4 +170,11 @@ class ReponseExerciceAdmin(admin.ModelAdmin):
         return obj.reponse[:75] + '...' if len(obj.reponse) > 75 else obj.reponse
     reponse_courte.short_description = 'Réponse Élève'
 
+@admin.register(DiffusionNotification)
+class DiffusionNotificationAdmin(admin.ModelAdmin):
+    list_display = ('message', 'type_notification', 'classes_cibles', 'statut', 'nb_notifications', 'date_creation', 'date_fin')
+    list_filter = ('statut', 'type_notification')
+    readonly_fields = ('dernier_eleve_id', 'nb_notifications', 'bail_expire_le', 'erreur', 'date_creation', 'date_fin')
+    ordering = ['-date_creation']
+
 # --- END OF FILE app/backend/main/admin.py ---
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Statistiques de correction calculées en SQL : taux de soumission par classe, réponses
+corrigées / à corriger, moyenne, médiane, écart-type et histogramme des notes sur 20 ;
+progression des activités (complétées / total par classe).
+
+Aucune instance de modèle n'est chargée : agrégats, GROUP BY et, pour la médiane,
+une ou deux valeurs lues au milieu de la colonne triée. Le coût ne dépend donc pas
+du volume de texte des réponses, même pour un exercice ciblant tout l'établissement.
+
+Les résultats sont mis en cache (cache par défaut) sous une clé incluant un numéro de
+génération, incrémenté après commit à chaque nouvelle note, réponse ou complétion, et à
+chaque modification d'un exercice ou d'une activité (dont son ciblage). Les changements
+de classe des élèves n'invalident pas le cache : ils sont pris en compte au plus tard
+après ANALYTIQUE_TIMEOUT secondes.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, BooleanField, Count, F, FilteredRelation, IntegerField, Max, Min, Q, StdDev
+from django.db.models.functions import Cast, Coalesce, Floor
+
+from .models import Eleve, Note, ReponseExercice
+
+NOTE_MAX = 20
+LARGEURS_TRANCHES = (1, 2, 4, 5, 10) # Diviseurs de NOTE_MAX
+ANALYTIQUE_TIMEOUT = 600
+
+
+def _cle_generation(portee):
+    return f'analytique:generation:{portee}'
+
+
+def _generation(portee):
+    return cache.get_or_set(_cle_generation(portee), 0, None)
+
+
+def _invalider(portee):
+    def invalider():
+        try:
+            cache.incr(_cle_generation(portee))
+        except ValueError:
+            cache.set(_cle_generation(portee), 1, None)
+    transaction.on_commit(invalider)
+
+
+def invalider_exercice(exercice_id):
+    """À appeler après une soumission, une correction ou une suppression de réponse."""
+    _invalider(f'exercice:{exercice_id}')
+
+
+def invalider_activite(activite_id):
+    """À appeler après une complétion d'activité."""
+    _invalider(f'activite:{activite_id}')
+
+
+def invalider_notes():
+    """À appeler après toute écriture sur Note."""
+    _invalider('notes')
+
+
+def _arrondi(valeur):
+    return round(float(valeur), 2) if valeur is not None else None
+
+
+def statistiques(queryset, champ='note', largeur=2):
+    """
+    Statistiques de `champ` (note sur 20) sur `queryset`, les valeurs NULL étant ignorées.
+    Trois à quatre requêtes quelle que soit la taille du queryset.
+    """
+    queryset = queryset.filter(**{f'{champ}__isnull': False})
+    agregats = queryset.aggregate(
+        nb=Count(champ), moyenne=Avg(champ), ecart_type=StdDev(champ), minimum=Min(champ), maximum=Max(champ),
+    )
+    nb = agregats['nb']
+
+    mediane = None
+    if nb:
+        milieu = queryset.order_by(champ).values_list(champ, flat=True)
+        valeurs = list(milieu[nb // 2:nb // 2 + 1] if nb % 2 else milieu[nb // 2 - 1:nb // 2 + 1])
+        mediane = sum(valeurs) / len(valeurs)
+
+    nb_tranches = NOTE_MAX // largeur
+    comptes = [0] * nb_tranches
+    if nb:
+        tranches = queryset.annotate(
+            tranche=Cast(Floor(F(champ) / largeur), IntegerField())
+        ).values('tranche').annotate(nb=Count('pk')).order_by()
+        for ligne in tranches:
+            # 20/20 tombe dans la dernière tranche ; les valeurs hors bornes sont ramenées aux extrémités.
+            comptes[min(max(ligne['tranche'], 0), nb_tranches - 1)] += ligne['nb']
+
+    return {
+        'nb': nb,
+        'moyenne': _arrondi(agregats['moyenne']),
+        'mediane': _arrondi(mediane),
+        'ecart_type': _arrondi(agregats['ecart_type']),
+        'min': _arrondi(agregats['minimum']),
+        'max': _arrondi(agregats['maximum']),
+        'histogramme': [
+            {'de': i * largeur, 'a': (i + 1) * largeur, 'nb': compte} for i, compte in enumerate(comptes)
+        ],
+    }
+
+
+def _en_cache(portee, variante, calculer):
+    cle = f'analytique:{portee}:{_generation(portee)}:{variante}'
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = calculer()
+        cache.set(cle, donnees, ANALYTIQUE_TIMEOUT)
+    return donnees
+
+
+def analytique_exercice(exercice, largeur=2):
+    def calculer():
+        classes = list(exercice.classes.values_list('code', flat=True))
+        effectifs = dict(
+            Eleve.objects.filter(classe__in=classes).values_list('classe').annotate(nb=Count('id')).order_by()
+        )
+        reponses = ReponseExercice.objects.filter(exercice_id=exercice.pk, eleve__classe__in=classes)
+        par_classe = {
+            ligne['eleve__classe']: ligne
+            for ligne in reponses.values('eleve__classe').annotate(
+                soumises=Count('id'),
+                corrigees=Count('id', filter=Q(corrigee=True)),
+                moyenne=Avg('note', filter=Q(corrigee=True)),
+            ).order_by()
+        }
+
+        lignes_classes = []
+        for code in classes:
+            ligne = par_classe.get(code, {})
+            effectif, soumises = effectifs.get(code, 0), ligne.get('soumises', 0)
+            lignes_classes.append({
+                'classe': code,
+                'effectif': effectif,
+                'soumises': soumises,
+                'corrigees': ligne.get('corrigees', 0),
+                'taux_soumission': round(soumises / effectif, 3) if effectif else None,
+                'moyenne': _arrondi(ligne.get('moyenne')),
+            })
+
+        effectif = sum(effectifs.values())
+        soumises = sum(l['soumises'] for l in lignes_classes)
+        corrigees = sum(l['corrigees'] for l in lignes_classes)
+        return {
+            'exercice': exercice.pk,
+            'effectif': effectif,
+            'soumises': soumises,
+            'corrigees': corrigees,
+            'a_corriger': soumises - corrigees,
+            'taux_soumission': round(soumises / effectif, 3) if effectif else None,
+            'notes': statistiques(reponses.filter(corrigee=True), largeur=largeur),
+            'classes': lignes_classes,
+        }
+
+    return _en_cache(f'exercice:{exercice.pk}', largeur, calculer)
+
+
+def analytique_notes(classe=None, largeur=2):
+    def calculer():
+        notes = Note.objects.all()
+        if classe:
+            notes = notes.filter(eleve__classe=classe)
+        par_classe = notes.values('eleve__classe').annotate(
+            nb=Count('id'), eleves=Count('eleve', distinct=True), moyenne=Avg('note'), ecart_type=StdDev('note'),
+        ).order_by('eleve__classe')
+        return {
+            'classe': classe,
+            'notes': statistiques(notes, largeur=largeur),
+            'classes': [
+                {
+                    'classe': ligne['eleve__classe'],
+                    'nb': ligne['nb'],
+                    'eleves': ligne['eleves'],
+                    'moyenne': _arrondi(ligne['moyenne']),
+                    'ecart_type': _arrondi(ligne['ecart_type']),
+                }
+                for ligne in par_classe
+            ],
+        }
+
+    return _en_cache('notes', f'{classe or ""}:{largeur}', calculer)
+
+
+def eleves_avec_completion(activite_id, codes):
+    """
+    Élèves des classes `codes` avec leur complétion de l'activité (False / None si aucune),
+    en une seule requête : LEFT JOIN filtré sur CompletionActivite.
+    """
+    return Eleve.objects.filter(classe__in=codes).annotate(
+        completion=FilteredRelation('completionactivite', condition=Q(completionactivite__activite_id=activite_id)),
+        completee=Coalesce(F('completion__completee'), False, output_field=BooleanField()),
+        date_completion=F('completion__date_completion'),
+    )
+
+
+def resume_progression(activite):
+    """Complétées / total par classe ciblée, via GROUP BY."""
+    codes = sorted(activite.classes.values_list('code', flat=True))
+
+    def calculer():
+        par_classe = {
+            ligne['classe']: ligne
+            for ligne in eleves_avec_completion(activite.pk, codes).values('classe').annotate(
+                total=Count('id'), completees=Count('id', filter=Q(completion__completee=True)),
+            ).order_by()
+        }
+        classes = []
+        for code in codes:
+            ligne = par_classe.get(code, {})
+            total, completees = ligne.get('total', 0), ligne.get('completees', 0)
+            classes.append({
+                'classe': code,
+                'total': total,
+                'completees': completees,
+                'taux': round(completees / total, 3) if total else None,
+            })
+        total, completees = sum(c['total'] for c in classes), sum(c['completees'] for c in classes)
+        return {
+            'activite': activite.pk,
+            'total': total,
+            'completees': completees,
+            'taux': round(completees / total, 3) if total else None,
+            'classes': classes,
+        }
+
+    # Les classes ciblées entrent dans la clé : une modification du ciblage change de clé.
+    return _en_cache(f'activite:{activite.pk}', ','.join(codes), calculer)
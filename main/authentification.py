@@ -0,0 +1,72 @@
+"""
+Jetons de session élève signés et sans état.
+
+`login_eleve` renvoie un jeton signé (django.core.signing, clé SECRET_KEY) qui contient
+l'id et la classe de l'élève. Envoyé dans l'en-tête `Authorization: Eleve <jeton>`, il
+est vérifié par JetonEleveAuthentication sans accès à la base : les vues
+`/eleve/<id>/...` en tirent l'élève et sa classe au lieu de relire la ligne Eleve.
+
+Un jeton reste valable ELEVE_JETON_DUREE secondes ; un changement de classe n'est vu
+qu'à la connexion suivante. Sans jeton, les vues relisent l'élève en base comme avant.
+Les vues sont ouvertes (AllowAny) et le jeton n'évite qu'une lecture : un jeton invalide
+ou expiré est ignoré comme un jeton absent, au lieu d'un 401 qui empêcherait justement
+le client de se reconnecter.
+"""
+from django.conf import settings
+from django.core import signing
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import Eleve
+
+SALT = 'main.eleve.session'
+MOT_CLE = 'Eleve'
+
+
+class SessionEleve:
+    """Utilisateur DRF d'une requête authentifiée par jeton élève."""
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, eleve_id, classe):
+        self.eleve_id = eleve_id
+        self.classe = classe
+
+    def eleve(self):
+        """Instance Eleve partielle (id et classe seulement), construite sans requête."""
+        return Eleve(id=self.eleve_id, classe=self.classe)
+
+    def __str__(self):
+        return f'eleve:{self.eleve_id}'
+
+
+def creer_jeton(eleve):
+    return signing.dumps({'e': eleve.id, 'c': eleve.classe}, salt=SALT, compress=True)
+
+
+def lire_jeton(jeton):
+    """Retourne la SessionEleve du jeton, ou lève signing.BadSignature (SignatureExpired incluse)."""
+    donnees = signing.loads(jeton, salt=SALT, max_age=getattr(settings, 'ELEVE_JETON_DUREE', None))
+    return SessionEleve(donnees['e'], donnees['c'])
+
+
+class JetonEleveAuthentication(BaseAuthentication):
+    def authenticate(self, request):
+        morceaux = get_authorization_header(request).split()
+        if len(morceaux) != 2 or morceaux[0].lower() != MOT_CLE.lower().encode():
+            return None
+        try:
+            session = lire_jeton(morceaux[1].decode())
+        except (signing.BadSignature, UnicodeDecodeError, KeyError, TypeError): # SignatureExpired incluse
+            return None # Requête anonyme : l'élève est relu en base
+        return session, morceaux[1].decode()
+
+    def authenticate_header(self, request):
+        return MOT_CLE
+
+
+def session_eleve(request, eleve_id):
+    """SessionEleve de la requête si son jeton désigne l'élève `eleve_id`, sinon None."""
+    session = getattr(request, 'user', None)
+    if isinstance(session, SessionEleve) and session.eleve_id == int(eleve_id):
+        return session
+    return None
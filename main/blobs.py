@@ -0,0 +1,175 @@
+"""
+Stockage des fichiers par contenu (déduplication).
+
+Chaque contenu distinct est stocké une seule fois, sous un nom dérivé de son SHA-256
+(`blobs/ab/abcd....pdf`), et décrit par une ligne Blob avec un compteur de références.
+`Fichier.fichier` et `Activite.fichier_joint` restent des FileField ordinaires (l'API ne
+change pas) mais pointent vers le nom du blob, référencé par `Fichier.blob` /
+`Activite.blob_joint`. Le même PDF envoyé pour plusieurs groupes de classes n'est donc
+transféré et stocké qu'une fois.
+
+Les références sont prises et rendues par ContenuCible.save()/delete() ; le dernier
+contenu qui lâche un blob supprime le fichier stocké. Les suppressions en masse
+(`queryset.delete()`) contournent ces méthodes : `manage.py nettoyer_blobs` recalcule
+les compteurs depuis les références réelles et supprime les blobs orphelins.
+
+L'empreinte est calculée pendant la réception, sans relire le fichier : par les
+gestionnaires d'upload ci-dessous (FILE_UPLOAD_HANDLERS) pour un envoi direct, morceau
+par morceau pour un téléversement (main/televersements.py). `stocker()` ne relit le
+fichier que si aucune empreinte ne lui est transmise.
+
+Une référence est prise par `stocker()` avant que le contenu qui la porte soit
+enregistré. Le recalcul ignore donc les blobs référencés depuis moins de DELAI_GRACE
+(`Blob.date_reference`) : il ne peut pas remettre à zéro, ni supprimer, le blob d'un
+envoi en cours.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .metadonnees import extraire
+from .models import Activite, Blob, Fichier
+
+DELAI_GRACE = timedelta(hours=1)
+
+
+def empreinte(fichier):
+    """SHA-256 du fichier, lu par morceaux (sans le charger en mémoire), puis rembobiné."""
+    sha = hashlib.sha256()
+    if hasattr(fichier, 'seek'):
+        fichier.seek(0)
+    for morceau in fichier.chunks():
+        sha.update(morceau)
+    fichier.seek(0)
+    return sha.hexdigest()
+
+
+class _EmpreinteUploadMixin:
+    """Calcule le SHA-256 des données reçues et l'attache au fichier (`fichier.empreinte`)."""
+    def new_file(self, *args, **kwargs):
+        self.sha = hashlib.sha256() # Avant super() : MemoryFileUploadHandler lève StopFutureHandlers
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        reste = super().receive_data_chunk(raw_data, start)
+        if reste is None: # Données gardées par ce gestionnaire (sinon passées au suivant)
+            self.sha.update(raw_data)
+        return reste
+
+    def file_complete(self, file_size):
+        fichier = super().file_complete(file_size)
+        if fichier is not None:
+            fichier.empreinte = self.sha.hexdigest()
+        return fichier
+
+
+class EmpreinteMemoireUploadHandler(_EmpreinteUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class EmpreinteTemporaireUploadHandler(_EmpreinteUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def nom_blob(somme, nom_original):
+    extension = os.path.splitext(nom_original or '')[1].lower()[:10]
+    return f'blobs/{somme[:2]}/{somme}{extension}'
+
+
+def stocker(fichier, nom_original=None, somme=None):
+    """
+    Blob du contenu de `fichier` (File ou UploadedFile), avec une référence de plus. Le
+    contenu n'est envoyé au stockage que s'il n'y est pas déjà. `somme` est le SHA-256
+    calculé à la réception ; sans elle, le fichier est lu une fois de plus pour l'obtenir.
+    """
+    somme = somme or empreinte(fichier)
+    if Blob.objects.filter(empreinte=somme).update(nb_references=F('nb_references') + 1, date_reference=timezone.now()):
+        return Blob.objects.get(empreinte=somme)
+    # Nouveau contenu : métadonnées extraites une seule fois, réutilisées par tous ses envois.
+    metadonnees = extraire(fichier, nom_original or fichier.name)
+    nom = default_storage.save(nom_blob(somme, nom_original or fichier.name), fichier)
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(empreinte=somme, fichier=nom, nb_references=1, **metadonnees)
+    except IntegrityError:
+        # Même contenu stocké en parallèle : on garde le blob gagnant et on retire notre copie.
+        default_storage.delete(nom)
+        Blob.objects.filter(empreinte=somme).update(nb_references=F('nb_references') + 1, date_reference=timezone.now())
+        return Blob.objects.get(empreinte=somme)
+
+
+def attacher_blobs(instance):
+    """
+    Avant la sauvegarde d'un contenu : chaque fichier nouvellement envoyé est remplacé par
+    le blob correspondant (le FileField est marqué comme déjà stocké, son pre_save ne
+    renvoie donc rien au stockage). Retourne les ids des blobs à libérer après la sauvegarde.
+    """
+    a_liberer = []
+    for champ, champ_blob in instance.champs_blob:
+        fichier = getattr(instance, champ)
+        ancien_id = getattr(instance, f'{champ_blob}_id')
+        if fichier and not fichier._committed:
+            nom_original = fichier.name
+            blob = stocker(fichier.file, nom_original, getattr(fichier.file, 'empreinte', None))
+            fichier.name = blob.fichier.name
+            fichier._committed = True
+            setattr(instance, champ_blob, blob)
+            instance.renseigner_metadonnees(champ, blob, nom_original)
+        elif not fichier and ancien_id:
+            setattr(instance, champ_blob, None)
+        else:
+            continue
+        if ancien_id and ancien_id != getattr(instance, f'{champ_blob}_id'):
+            a_liberer.append(ancien_id)
+    return a_liberer
+
+
+def liberer(blob_ids):
+    """Rend une référence par id (répétitions comprises) et supprime les blobs devenus orphelins."""
+    for blob_id in blob_ids:
+        Blob.objects.filter(pk=blob_id, nb_references__gt=0).update(nb_references=F('nb_references') - 1)
+    supprimer_orphelins(Blob.objects.filter(pk__in=set(blob_ids), nb_references=0))
+
+
+def supprimer_orphelins(blobs):
+    """
+    Supprime les blobs sans référence, puis leurs fichiers stockés après le commit. La
+    suppression est conditionnelle : un blob repris entre-temps par un envoi est conservé.
+    """
+    supprimes = 0
+    for blob_id, nom in blobs.values_list('id', 'fichier'):
+        if Blob.objects.filter(pk=blob_id, nb_references=0).delete()[0]:
+            transaction.on_commit(lambda nom=nom: default_storage.delete(nom))
+            supprimes += 1
+    return supprimes
+
+
+def blobs_stables(delai=DELAI_GRACE):
+    """Blobs sans référence prise depuis `delai` : leur compteur peut être recalculé."""
+    return Blob.objects.filter(date_reference__lt=timezone.now() - delai)
+
+
+def recalculer_references(delai=DELAI_GRACE):
+    """
+    Recale les compteurs des blobs stables sur les références réelles. La mise à jour est
+    conditionnelle : un blob repris entre-temps par un envoi est laissé tel quel.
+    Retourne le nombre de blobs corrigés.
+    """
+    stables = list(blobs_stables(delai).values_list('id', 'nb_references'))
+    reels = {}
+    for modele, champ_blob in ((Fichier, 'blob'), (Activite, 'blob_joint')):
+        for ligne in modele.objects.exclude(**{champ_blob: None}).values(champ_blob).annotate(nb=Count('pk')):
+            reels[ligne[champ_blob]] = reels.get(ligne[champ_blob], 0) + ligne['nb']
+    corriges = 0
+    for blob_id, nb_references in stables:
+        if reels.get(blob_id, 0) != nb_references:
+            corriges += blobs_stables(delai).filter(pk=blob_id, nb_references=nb_references).update(
+                nb_references=reels.get(blob_id, 0)
+            )
+    return corriges
@@ -0,0 +1,109 @@
+"""
+Cache des listes de contenus partagées par tous les élèves d'une classe.
+
+Les ~40 élèves d'une classe reçoivent les mêmes fichiers, activités et exercices ;
+seules quelques données personnelles (complétion, réponse) diffèrent. La partie
+commune est calculée une fois par classe et mise en cache ; la vue y fusionne
+ensuite la partie propre à l'élève.
+
+L'invalidation est précise : chaque (type de contenu, classe) a un numéro de
+génération inclus dans les clés, incrémenté par les écritures des ViewSets. Une
+génération évincée du cache repart d'une valeur horaire (ns), jamais d'un petit
+compteur : les listes encore stockées sous une ancienne génération ne reviennent pas.
+
+Le backend est l'alias de cache `contenus` (voir CACHES dans settings.py) :
+LocMemCache, FileBasedCache, Redis... Avec plusieurs processus, préférer un
+backend partagé, sinon un processus peut servir une liste périmée jusqu'au TIMEOUT.
+"""
+import time
+
+from django.core.cache import caches
+from django.conf import settings
+from django.db import transaction
+
+ALIAS = 'contenus'
+TYPES_CONTENUS = ('fichiers', 'activites', 'exercices')
+
+
+def _cache():
+    return caches[ALIAS if ALIAS in settings.CACHES else 'default']
+
+
+def _cle_generation(type_contenu, classe):
+    return f'contenus:generation:{type_contenu}:{classe}'
+
+
+def _nouvelle_generation():
+    return time.time_ns()
+
+
+def _cle_stat(type_contenu, resultat):
+    return f'contenus:stats:{type_contenu}:{resultat}'
+
+
+def _compter(type_contenu, resultat):
+    cache, cle = _cache(), _cle_stat(type_contenu, resultat)
+    try:
+        cache.incr(cle)
+    except ValueError:
+        if not cache.add(cle, 1, None):
+            cache.incr(cle)
+
+
+def liste_classe(type_contenu, classe, calculer, variante=''):
+    """
+    Retourne la partie commune de la liste `type_contenu` pour `classe`, depuis le cache
+    ou en appelant `calculer()` (qui doit renvoyer des données sérialisables : listes, dicts).
+    `variante` distingue les pages d'une même liste (curseur, taille de page...).
+    """
+    cache = _cache()
+    cle_generation = _cle_generation(type_contenu, classe)
+    generation = cache.get(cle_generation)
+    if generation is None:
+        cache.add(cle_generation, _nouvelle_generation(), None)
+        generation = cache.get(cle_generation)
+    cle = f'contenus:{type_contenu}:{classe}:{generation}:{variante}'
+    donnees = cache.get(cle)
+    if donnees is not None:
+        _compter(type_contenu, 'hits')
+        return donnees
+    _compter(type_contenu, 'misses')
+    donnees = calculer()
+    cache.set(cle, donnees)
+    return donnees
+
+
+def invalider_classes(type_contenu, codes):
+    """À appeler après toute écriture sur un contenu ciblant les classes `codes`."""
+    cles = [_cle_generation(type_contenu, code) for code in set(codes)]
+
+    def invalider():
+        cache = _cache()
+        for cle in cles:
+            try:
+                cache.incr(cle)
+            except ValueError:
+                cache.set(cle, _nouvelle_generation(), None)
+
+    transaction.on_commit(invalider)
+
+
+def statistiques():
+    cache = _cache()
+    cles = {(t, r): _cle_stat(t, r) for t in TYPES_CONTENUS for r in ('hits', 'misses')}
+    valeurs = cache.get_many(list(cles.values()))
+    stats = {}
+    for type_contenu in TYPES_CONTENUS:
+        hits = valeurs.get(cles[(type_contenu, 'hits')], 0)
+        misses = valeurs.get(cles[(type_contenu, 'misses')], 0)
+        stats[type_contenu] = {
+            'hits': hits,
+            'misses': misses,
+            'taux_hits': round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    stats['backend'] = type(cache).__name__
+    return stats
+
+
+def reinitialiser_statistiques():
+    _cache().delete_many([_cle_stat(t, r) for t in TYPES_CONTENUS for r in ('hits', 'misses')])
@@ -0,0 +1,162 @@
+"""
+Moteur de diffusion des notifications vers des classes entières.
+
+La requête de l'enseignant se contente d'enregistrer une DiffusionNotification
+(coût constant quelle que soit la taille de l'audience). Les notifications sont
+ensuite écrites par lots bornés par la commande `python manage.py diffuser_notifications`
+(worker du Procfile), ou par un thread du processus web si NOTIFICATIONS_DIFFUSION_THREAD.
+
+Le worker qui prend une diffusion la passe « en cours » avec un bail, prolongé à chaque
+lot. Une diffusion n'est reprise par un autre que si ce bail a expiré, et chaque lot
+n'avance le curseur que s'il n'a pas bougé entre-temps : deux workers ne peuvent pas
+écrire le même lot.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .evenements import publier_notifications
+from .models import DiffusionNotification, Eleve, Notification, codes_classes_cibles
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT_DEFAUT = 500
+BAIL_DEFAUT = 300
+
+# Un seul thread : les diffusions sont traitées l'une après l'autre, dans l'ordre.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diffusion')
+
+
+def _taille_lot():
+    return getattr(settings, 'NOTIFICATIONS_TAILLE_LOT', TAILLE_LOT_DEFAUT)
+
+
+def _fin_bail():
+    return timezone.now() + timedelta(seconds=getattr(settings, 'NOTIFICATIONS_DIFFUSION_BAIL', BAIL_DEFAUT))
+
+
+def programmer_diffusion(classes_cibles_str, message, type_notification, lien_relatif=None):
+    """
+    Enregistre une diffusion à traiter. Le message et le lien sont déjà formatés.
+    Retourne None si aucune classe n'est ciblée.
+    """
+    codes = codes_classes_cibles(classes_cibles_str)
+    if not codes:
+        return None
+    diffusion = DiffusionNotification.objects.create(
+        classes_cibles=','.join(codes),
+        message=message[:255],
+        type_notification=type_notification,
+        lien_relatif=lien_relatif,
+    )
+    if getattr(settings, 'NOTIFICATIONS_DIFFUSION_THREAD', False):
+        # On attend le commit : le thread ne doit pas voir une diffusion annulée.
+        transaction.on_commit(lambda: _executor.submit(_traiter_en_arriere_plan, diffusion.pk))
+    return diffusion
+
+
+def _traiter_en_arriere_plan(diffusion_id):
+    try:
+        traiter_diffusion(diffusion_id)
+    except Exception:
+        logger.exception("Échec de la diffusion %s", diffusion_id)
+    finally:
+        connection.close()
+
+
+def _eleves_cibles(diffusion):
+    return Eleve.objects.filter(classe__in=diffusion.classes_cibles.split(','))
+
+
+def traiter_diffusion(diffusion_id, taille_lot=None):
+    """
+    Crée les notifications d'une diffusion, lot par lot, en parcourant les identifiants
+    des élèves dans l'ordre (pagination par clé). Chaque lot est écrit dans la même
+    transaction que l'avancement du curseur : une reprise ne crée jamais de doublon.
+    Retourne False si la diffusion a déjà été prise en charge par un autre worker.
+    """
+    taille_lot = taille_lot or _taille_lot()
+
+    # Prise en charge atomique : un seul worker peut passer la diffusion « en cours ».
+    pris = DiffusionNotification.objects.filter(
+        pk=diffusion_id, statut='en_attente'
+    ).update(statut='en_cours', bail_expire_le=_fin_bail())
+    if not pris:
+        return False
+
+    diffusion = DiffusionNotification.objects.get(pk=diffusion_id)
+    eleves = _eleves_cibles(diffusion)
+    try:
+        while True:
+            ids = list(
+                eleves.filter(id__gt=diffusion.dernier_eleve_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:taille_lot]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                # Avance conditionnelle du curseur (et du bail) : si un autre worker a repris
+                # la diffusion après expiration de notre bail, le lot est abandonné.
+                avance = DiffusionNotification.objects.filter(
+                    pk=diffusion.pk, statut='en_cours', dernier_eleve_id=diffusion.dernier_eleve_id
+                ).update(
+                    dernier_eleve_id=ids[-1],
+                    nb_notifications=F('nb_notifications') + len(ids),
+                    bail_expire_le=_fin_bail(),
+                )
+                if not avance:
+                    logger.warning("Diffusion %s reprise par un autre worker, lot abandonné", diffusion.pk)
+                    return False
+                notifications = Notification.objects.bulk_create([
+                    Notification(
+                        destinataire_id=eleve_id,
+                        message=diffusion.message,
+                        type_notification=diffusion.type_notification,
+                        lien_relatif=diffusion.lien_relatif,
+                    )
+                    for eleve_id in ids
+                ])
+                Eleve.objects.filter(id__in=ids).update(notifications_non_lues=F('notifications_non_lues') + 1)
+                publier_notifications(notifications)
+                diffusion.dernier_eleve_id = ids[-1]
+    except Exception as exc:
+        DiffusionNotification.objects.filter(pk=diffusion.pk, dernier_eleve_id=diffusion.dernier_eleve_id).update(
+            statut='echouee', erreur=str(exc), bail_expire_le=None
+        )
+        raise
+
+    DiffusionNotification.objects.filter(pk=diffusion.pk, dernier_eleve_id=diffusion.dernier_eleve_id).update(
+        statut='terminee', date_fin=timezone.now(), bail_expire_le=None
+    )
+    return True
+
+
+def traiter_diffusions_en_attente(limite=None, taille_lot=None):
+    """Traite les diffusions en attente dans l'ordre d'arrivée. Retourne le nombre traité."""
+    ids = DiffusionNotification.objects.filter(statut='en_attente').order_by('id').values_list('id', flat=True)
+    if limite:
+        ids = ids[:limite]
+    traitees = 0
+    for diffusion_id in list(ids):
+        if traiter_diffusion(diffusion_id, taille_lot=taille_lot):
+            traitees += 1
+    return traitees
+
+
+def reprendre_diffusions_interrompues():
+    """
+    Remet en attente les diffusions « échouées » et celles restées « en cours » dont le
+    bail a expiré (worker arrêté en plein traitement) ; une diffusion qu'un worker vivant
+    traite n'est pas touchée. Le curseur garantit que les lots déjà écrits ne sont pas refaits.
+    """
+    interrompues = Q(statut='echouee') | Q(statut='en_cours', bail_expire_le__lt=timezone.now())
+    interrompues |= Q(statut='en_cours', bail_expire_le=None)
+    return DiffusionNotification.objects.filter(interrompues).update(
+        statut='en_attente', erreur='', bail_expire_le=None
+    )
@@ -0,0 +1,43 @@
+"""
+Corps des réponses en flux (exports, médias) adaptés au serveur qui les envoie.
+
+Sous ASGI (Procfile : workers uvicorn), Django 4.2 consomme un itérateur synchrone en
+entier (`sync_to_async(list)`) avant d'envoyer le premier octet : un export ou une vidéo
+serait chargé en mémoire. Il faut donc lui donner un itérateur asynchrone, qui produit
+chaque morceau par un appel à `sync_to_async`. Sous WSGI (runserver, tests, gunicorn
+synchrone), l'itérateur synchrone est gardé tel quel et envoyé au fil de l'eau.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_FIN = object()
+
+
+def sous_asgi(request):
+    """Vrai si la requête (Django ou DRF) est servie par le gestionnaire ASGI."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def morceaux_async(morceaux, thread_sensitive=True):
+    """
+    Itérateur asynchrone sur un itérateur synchrone, un morceau à la fois.
+
+    Avec thread_sensitive, chaque morceau est produit sur le thread de la vue (même
+    connexion à la base) : un curseur serveur PostgreSQL (`.iterator()`) l'exige.
+    """
+    morceaux = iter(morceaux)
+    suivant = sync_to_async(next, thread_sensitive=thread_sensitive)
+    try:
+        while True:
+            morceau = await suivant(morceaux, _FIN)
+            if morceau is _FIN:
+                return
+            yield morceau
+    finally:
+        if hasattr(morceaux, 'close'):
+            await sync_to_async(morceaux.close, thread_sensitive=thread_sensitive)()
+
+
+def contenu_flux(request, morceaux):
+    """Contenu à passer à StreamingHttpResponse pour cette requête."""
+    return morceaux_async(morceaux) if sous_asgi(request) else morceaux
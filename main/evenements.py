@@ -0,0 +1,252 @@
+"""
+Publication/abonnement des événements destinés aux élèves (nouvelles notifications,
+nouveaux messages), consommés par le flux SSE et le long-poll de main/flux.py.
+
+Le broker est configurable via le setting EVENEMENTS_BROKER (chemin pointé) :
+- BrokerBase (défaut) lit les événements dans les tables Notification et Message, qui
+  sont partagées : une notification écrite par le worker de diffusion ou par un autre
+  processus web parvient aux abonnés de chaque processus. Une seule tâche par processus
+  interroge la base, quel que soit le nombre d'abonnés ; elle démarre avec le premier
+  abonnement et s'arrête au départ du dernier ;
+- BrokerLocal garde les événements en mémoire : il ne relie que les requêtes servies
+  par le même processus (développement, processus unique).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from .models import Message, Notification
+
+logger = logging.getLogger(__name__)
+
+
+class Abonnement:
+    def __init__(self, eleve_id, loop, taille_max=100):
+        self.eleve_id = eleve_id
+        self.loop = loop
+        self.file = asyncio.Queue(maxsize=taille_max)
+
+    def _deposer(self, evenement):
+        try:
+            self.file.put_nowait(evenement)
+        except asyncio.QueueFull:
+            # Client trop lent : on perd les plus anciens, il se resynchronise via l'API.
+            self.file.get_nowait()
+            self.file.put_nowait(evenement)
+
+    async def attendre(self, timeout):
+        """Retourne le prochain événement, ou None si rien n'arrive avant `timeout` secondes."""
+        try:
+            return await asyncio.wait_for(self.file.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """Interface des brokers d'événements."""
+
+    def abonner(self, eleve_id):
+        """À appeler depuis la boucle asyncio qui consommera les événements."""
+        raise NotImplementedError
+
+    def desabonner(self, abonnement):
+        raise NotImplementedError
+
+    def publier(self, eleve_id, evenement):
+        """Peut être appelé depuis n'importe quel thread (vues synchrones, worker de diffusion)."""
+        raise NotImplementedError
+
+
+class BrokerLocal(Broker):
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._abonnes = defaultdict(set)
+
+    def abonner(self, eleve_id):
+        abonnement = Abonnement(eleve_id, asyncio.get_running_loop())
+        with self._verrou:
+            self._abonnes[eleve_id].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            abonnes = self._abonnes.get(abonnement.eleve_id)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self._abonnes[abonnement.eleve_id]
+
+    def publier(self, eleve_id, evenement):
+        self.distribuer(eleve_id, evenement)
+
+    def distribuer(self, eleve_id, evenement):
+        """Remet `evenement` aux abonnés de ce processus."""
+        with self._verrou:
+            abonnes = list(self._abonnes.get(eleve_id, ()))
+        for abonnement in abonnes:
+            try:
+                abonnement.loop.call_soon_threadsafe(abonnement._deposer, evenement)
+            except RuntimeError:
+                # Boucle fermée : le client est parti.
+                self.desabonner(abonnement)
+
+    def eleves_abonnes(self):
+        with self._verrou:
+            return list(self._abonnes)
+
+    def nb_abonnes(self):
+        with self._verrou:
+            return sum(len(abonnes) for abonnes in self._abonnes.values())
+
+
+class _Source:
+    """
+    Lignes nouvelles d'une table, pour les élèves abonnés. Les ids sont attribués avant le
+    commit : une transaction plus lente peut valider un id inférieur à un id déjà vu. Les
+    ids sont donc relus depuis le curseur d'il y a FENETRE secondes, en écartant ceux déjà
+    remis.
+    """
+    FENETRE = 10
+
+    def __init__(self, modele, champ_eleve, evenement):
+        self.modele = modele
+        self.champ_eleve = champ_eleve
+        self.evenement = evenement
+        self.curseur = None
+        self.historique = deque()
+        self.vus = set()
+
+    def lire(self, eleve_ids):
+        """[(eleve_id, événement)] des lignes apparues depuis la lecture précédente."""
+        maximum = self.modele.objects.aggregate(m=Max('id'))['m'] or 0
+        if self.curseur is None: # Premier passage : seules les lignes à venir comptent
+            self.curseur = maximum
+        maintenant = time.monotonic()
+        self.historique.append((maintenant, self.curseur))
+        while len(self.historique) > 1 and self.historique[1][0] <= maintenant - self.FENETRE:
+            self.historique.popleft()
+        plancher = self.historique[0][1]
+        self.curseur = max(self.curseur, maximum)
+        self.vus = {ligne_id for ligne_id in self.vus if ligne_id > plancher}
+        if not eleve_ids:
+            return []
+        lignes = self.modele.objects.filter(
+            id__gt=plancher, **{f'{self.champ_eleve}__in': eleve_ids}
+        ).exclude(id__in=self.vus).order_by('id')
+        resultats = []
+        for ligne in lignes:
+            self.vus.add(ligne.id)
+            resultats.append((getattr(ligne, self.champ_eleve), self.evenement(ligne)))
+        return resultats
+
+
+class BrokerBase(BrokerLocal):
+    """
+    Les événements viennent de la base : `publier` n'a rien à faire, la tâche de lecture
+    de chaque processus trouve les nouvelles lignes toutes les EVENEMENTS_INTERVALLE secondes,
+    tant qu'il y a au moins un abonné.
+    """
+    def __init__(self):
+        super().__init__()
+        self.intervalle = getattr(settings, 'EVENEMENTS_INTERVALLE', 1.0)
+        # Un thread dédié aux lectures : une seule connexion, jamais celle d'une requête.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='evenements')
+        self._tache = None
+
+    def abonner(self, eleve_id):
+        abonnement = super().abonner(eleve_id)
+        with self._verrou:
+            if self._tache is None or self._tache.done() or self._tache.get_loop() is not abonnement.loop:
+                self._tache = abonnement.loop.create_task(self._lire_en_boucle())
+        return abonnement
+
+    def desabonner(self, abonnement):
+        super().desabonner(abonnement)
+        with self._verrou:
+            if self._abonnes or self._tache is None:
+                return
+            tache, self._tache = self._tache, None
+        try:
+            tache.get_loop().call_soon_threadsafe(tache.cancel)
+        except RuntimeError:
+            pass # Boucle fermée : la tâche ne tourne plus
+
+    def publier(self, eleve_id, evenement):
+        pass
+
+    def _lire(self, sources):
+        close_old_connections()
+        eleve_ids = self.eleves_abonnes()
+        return [evenement for source in sources for evenement in source.lire(eleve_ids)]
+
+    async def _lire_en_boucle(self):
+        loop = asyncio.get_running_loop()
+        # Curseurs propres à chaque démarrage : les lignes écrites sans abonné ne sont pas rejouées.
+        sources = [
+            _Source(Notification, 'destinataire_id', evenement_notification),
+            _Source(Message, 'eleve_id', evenement_message),
+        ]
+        while True:
+            try:
+                for eleve_id, evenement in await loop.run_in_executor(self._executor, self._lire, sources):
+                    self.distribuer(eleve_id, evenement)
+            except Exception:
+                logger.exception("Lecture des événements impossible")
+            await asyncio.sleep(self.intervalle)
+
+
+_broker = None
+_broker_verrou = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_verrou:
+            if _broker is None:
+                chemin = getattr(settings, 'EVENEMENTS_BROKER', 'main.evenements.BrokerBase')
+                _broker = import_string(chemin)()
+    return _broker
+
+
+def publier_apres_commit(eleve_id, evenement):
+    """Publie `evenement` pour l'élève une fois la transaction courante validée."""
+    transaction.on_commit(lambda: get_broker().publier(eleve_id, evenement))
+
+
+def publier_notifications(notifications):
+    """Annonce des notifications fraîchement créées à leurs destinataires, après commit."""
+    evenements = [(n.destinataire_id, evenement_notification(n)) for n in notifications]
+
+    def publier():
+        broker = get_broker()
+        for eleve_id, evenement in evenements:
+            broker.publier(eleve_id, evenement)
+
+    transaction.on_commit(publier)
+
+
+def evenement_message(message):
+    from .serializers import MessageSerializer
+    return {'type': 'message', 'message': MessageSerializer(message).data}
+
+
+def evenement_notification(notification):
+    return {
+        'type': 'notification',
+        'notification': {
+            'id': notification.pk,
+            'message': notification.message,
+            'type_notification': notification.type_notification,
+            'lien_relatif': notification.lien_relatif,
+            'date_creation': notification.date_creation.isoformat() if notification.date_creation else None,
+        },
+    }
@@ -0,0 +1,158 @@
+"""
+Exports en flux (CSV ou JSON lines) des notes, des réponses aux exercices et de la
+progression des activités, pour les enseignants.
+
+Les lignes sont lues avec `values_list(...).iterator(chunk_size=...)` (curseur côté
+serveur sous PostgreSQL) et écrites au fil de l'eau dans une StreamingHttpResponse :
+le premier octet part tout de suite et la mémoire reste constante, même pour
+l'historique complet de l'établissement. Sous ASGI, la vue passe le générateur par
+`envoi.contenu_flux`, qui lit chaque morceau séparément (voir main/envoi.py).
+
+Filtres communs : `classe`, `depuis` et `jusqu_a` (date ou date-heure ISO, bornes
+incluses). Pour la progression, les dates portent sur la création de l'activité.
+"""
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .analytique import eleves_avec_completion
+from .models import Activite, Note, ReponseExercice
+
+TAILLE_CHUNK = 2000
+LIGNES_PAR_ENVOI = 200 # Lignes regroupées par morceau envoyé au client
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class ErreurExport(Exception):
+    pass
+
+
+def _borne(valeur, fin=False):
+    if not valeur:
+        return None
+    moment = parse_datetime(valeur)
+    if moment is None:
+        jour = parse_date(valeur)
+        if jour is None:
+            raise ErreurExport(f"Date invalide : {valeur!r} (format attendu AAAA-MM-JJ).")
+        moment = datetime.combine(jour, time.max if fin else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _filtrer(queryset, champ_date, params, champ_classe='eleve__classe'):
+    if params.get('classe'):
+        queryset = queryset.filter(**{champ_classe: params['classe']})
+    depuis, jusqu_a = _borne(params.get('depuis')), _borne(params.get('jusqu_a'), fin=True)
+    if depuis:
+        queryset = queryset.filter(**{f'{champ_date}__gte': depuis})
+    if jusqu_a:
+        queryset = queryset.filter(**{f'{champ_date}__lte': jusqu_a})
+    return queryset
+
+
+def _lignes_notes(params):
+    colonnes = ['id', 'eleve_id', 'eleve__nom', 'eleve__prenom', 'eleve__classe', 'note', 'commentaire', 'date_attribution']
+    notes = _filtrer(Note.objects.all(), 'date_attribution', params)
+    if params.get('eleve'):
+        notes = notes.filter(eleve_id=params['eleve'])
+    return colonnes, notes.order_by('pk').values_list(*colonnes).iterator(chunk_size=TAILLE_CHUNK)
+
+
+def _lignes_reponses(params):
+    colonnes = [
+        'id', 'exercice_id', 'exercice__titre', 'eleve_id', 'eleve__nom', 'eleve__prenom', 'eleve__classe',
+        'reponse', 'corrigee', 'note', 'date_soumission',
+    ]
+    reponses = _filtrer(ReponseExercice.objects.all(), 'date_soumission', params)
+    if params.get('exercice'):
+        reponses = reponses.filter(exercice_id=params['exercice'])
+    return colonnes, reponses.order_by('pk').values_list(*colonnes).iterator(chunk_size=TAILLE_CHUNK)
+
+
+def _lignes_progression(params):
+    """Une ligne par (activité, élève d'une classe ciblée), complétée ou non."""
+    colonnes = ['activite_id', 'activite__titre', 'eleve_id', 'eleve__nom', 'eleve__prenom', 'eleve__classe',
+                'completee', 'date_completion']
+    activites = _filtrer(Activite.objects.all(), 'date_creation', params, champ_classe='classes')
+    if params.get('activite'):
+        activites = activites.filter(pk=params['activite'])
+    activites = activites.order_by('pk').only('id', 'titre').prefetch_related('classes')
+
+    def lignes():
+        for activite in activites.iterator(chunk_size=100):
+            codes = [classe.code for classe in activite.classes.all()]
+            if params.get('classe'):
+                codes = [code for code in codes if code == params['classe']]
+            eleves = eleves_avec_completion(activite.pk, codes).order_by('classe', 'nom', 'prenom').values_list('id', 'nom', 'prenom', 'classe', 'completee', 'date_completion')
+            for ligne in eleves.iterator(chunk_size=TAILLE_CHUNK):
+                yield (activite.pk, activite.titre, *ligne)
+
+    return colonnes, lignes()
+
+
+EXPORTS = {
+    'notes': _lignes_notes,
+    'reponses': _lignes_reponses,
+    'progression': _lignes_progression,
+}
+
+
+class _Tampon:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de la stocker."""
+    def write(self, valeur):
+        return valeur
+
+
+def _valeur_json(valeur):
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    return str(valeur) # Decimal
+
+
+def _csv(colonnes, lignes):
+    writer = csv.writer(_Tampon())
+    yield '\ufeff' + writer.writerow(colonnes) # BOM : Excel lit alors correctement l'arabe
+    morceau = []
+    for ligne in lignes:
+        morceau.append(writer.writerow(ligne))
+        if len(morceau) >= LIGNES_PAR_ENVOI:
+            yield ''.join(morceau)
+            morceau = []
+    if morceau:
+        yield ''.join(morceau)
+
+
+def _jsonl(colonnes, lignes):
+    morceau = []
+    for ligne in lignes:
+        morceau.append(json.dumps(dict(zip(colonnes, ligne)), ensure_ascii=False, default=_valeur_json) + '\n')
+        if len(morceau) >= LIGNES_PAR_ENVOI:
+            yield ''.join(morceau)
+            morceau = []
+    if morceau:
+        yield ''.join(morceau)
+
+
+def generer_export(type_export, format_export, params):
+    """
+    Retourne un générateur de morceaux de texte. Les paramètres sont validés ici,
+    avant le premier octet, pour pouvoir encore répondre par une erreur 400.
+    """
+    if type_export not in EXPORTS:
+        raise ErreurExport(f"Export inconnu : {type_export!r} (attendu : {', '.join(EXPORTS)}).")
+    if format_export not in FORMATS:
+        raise ErreurExport(f"Format inconnu : {format_export!r} (attendu : {', '.join(FORMATS)}).")
+    for cle in ('eleve', 'exercice', 'activite'):
+        if params.get(cle) and not params[cle].isdigit():
+            raise ErreurExport(f"{cle} doit être un identifiant numérique.")
+    colonnes, lignes = EXPORTS[type_export](params)
+    return _csv(colonnes, lignes) if format_export == 'csv' else _jsonl(colonnes, lignes)
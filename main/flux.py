@@ -0,0 +1,124 @@
+"""
+Diffusion en temps réel des événements aux élèves, à la place du polling.
+
+- `flux_eleve` : Server-Sent Events. Une connexion inactive ne coûte qu'un
+  commentaire « keep-alive » périodique, aucune requête SQL.
+- `attente_eleve` : long-poll de repli pour les clients sans EventSource.
+
+Les notifications manquées (`?depuis=` du long-poll, en-tête Last-Event-ID d'une
+reconnexion SSE) sont relues dans l'ordre croissant des ids, par pages de TAILLE_RATTRAPAGE.
+
+Ces vues sont asynchrones : le Procfile sert le projet par l'application ASGI
+(eduinfo/asgi.py, workers uvicorn), où une connexion ouverte n'occupe qu'une coroutine.
+"""
+import json
+import time
+
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+
+from .evenements import get_broker
+from .models import Eleve, Notification
+
+KEEPALIVE_SECONDES = 15
+# Le flux est fermé au bout de ce délai ; EventSource se reconnecte tout seul. Cela borne
+# la durée de vie d'un abonnement dont le client serait parti sans que le serveur le voie.
+DUREE_MAX_FLUX = 300
+LONG_POLL_DEFAUT = 25
+LONG_POLL_MAX = 55
+TAILLE_RATTRAPAGE = 50
+
+
+async def _verifier_eleve(eleve_id):
+    if not await Eleve.objects.filter(id=eleve_id).aexists():
+        raise Http404('Élève introuvable.')
+
+
+def _format_sse(evenement):
+    # L'id des notifications revient dans Last-Event-ID quand EventSource se reconnecte.
+    identifiant = f"id: {evenement['notification']['id']}\n" if evenement['type'] == 'notification' else ''
+    return f"{identifiant}event: {evenement['type']}\ndata: {json.dumps(evenement, default=str)}\n\n"
+
+
+def _curseur(valeur):
+    return int(valeur) if valeur and valeur.isdigit() else None
+
+
+async def _manquees(eleve_id, depuis):
+    """
+    Page de notifications d'id supérieur à `depuis`, les plus anciennes d'abord, et
+    un booléen indiquant s'il en reste après.
+    """
+    notifications = Notification.objects.filter(destinataire_id=eleve_id, id__gt=depuis).order_by('id')
+    page = [
+        {'type': 'notification', 'notification': n}
+        async for n in notifications.values(
+            'id', 'message', 'type_notification', 'lien_relatif', 'date_creation'
+        )[:TAILLE_RATTRAPAGE + 1]
+    ]
+    return page[:TAILLE_RATTRAPAGE], len(page) > TAILLE_RATTRAPAGE
+
+
+async def flux_eleve(request, eleve_id):
+    await _verifier_eleve(eleve_id)
+    depuis = _curseur(request.headers.get('Last-Event-ID'))
+
+    async def generer():
+        broker = get_broker()
+        abonnement = broker.abonner(eleve_id)
+        try:
+            yield f"retry: {KEEPALIVE_SECONDES * 1000}\n\n"
+            if depuis is not None: # Reconnexion : d'abord ce qui a été publié pendant la coupure
+                curseur, reste = depuis, True
+                while reste:
+                    page, reste = await _manquees(eleve_id, curseur)
+                    for evenement in page:
+                        yield _format_sse(evenement)
+                    curseur = page[-1]['notification']['id'] if page else curseur
+            fin = time.monotonic() + DUREE_MAX_FLUX
+            while time.monotonic() < fin:
+                evenement = await abonnement.attendre(KEEPALIVE_SECONDES)
+                if evenement is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _format_sse(evenement)
+        finally:
+            broker.desabonner(abonnement)
+
+    response = StreamingHttpResponse(generer(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Pas de mise en tampon côté nginx
+    return response
+
+
+async def attente_eleve(request, eleve_id):
+    """
+    Long-poll : `?depuis=<id de la dernière notification connue>&timeout=<s>`.
+    Répond tout de suite si des notifications plus récentes existent déjà (les plus
+    anciennes d'abord, au plus TAILLE_RATTRAPAGE ; `plus` indique qu'il faut relancer
+    aussitôt avec le dernier id reçu), sinon attend le prochain événement ou l'expiration
+    du délai.
+    """
+    await _verifier_eleve(eleve_id)
+    try:
+        timeout = min(float(request.GET.get('timeout', LONG_POLL_DEFAUT)), LONG_POLL_MAX)
+    except ValueError:
+        timeout = LONG_POLL_DEFAUT
+
+    broker = get_broker()
+    # Abonnement avant la lecture en base : un événement publié entre les deux n'est pas perdu.
+    abonnement = broker.abonner(eleve_id)
+    try:
+        depuis = _curseur(request.GET.get('depuis'))
+        if depuis is not None:
+            page, reste = await _manquees(eleve_id, depuis)
+            if page:
+                return JsonResponse({'evenements': page, 'plus': reste})
+
+        evenement = await abonnement.attendre(timeout)
+        evenements = []
+        while evenement is not None:
+            evenements.append(evenement)
+            evenement = abonnement.file.get_nowait() if not abonnement.file.empty() else None
+        return JsonResponse({'evenements': evenements, 'plus': False})
+    finally:
+        broker.desabonner(abonnement)
@@ -0,0 +1,243 @@
+"""
+Import en masse de listes d'élèves (CSV, ou XLSX si openpyxl est installé).
+
+Le fichier est lu ligne à ligne et traité par lots de `taille_lot` : chaque lot est
+validé, confronté à la base en une requête, puis inséré avec un `bulk_create` dans sa
+propre transaction. La mémoire utilisée ne dépend que de la taille des lots.
+
+Colonnes attendues (en-tête, ordre libre) : nom, prenom, classe — ou leurs libellés
+arabes الاسم, اللقب, القسم. La classe est acceptée sous la forme « 1AM1 » ou « 1am1 ».
+
+Les noms sont comparés sous leur forme normalisée (`normaliser_nom`, comme `login_eleve` :
+casse et accents ignorés), dans les deux modes. Pour un élève déjà présent :
+- `skip` : une ligne identique (nom, prénom, classe) est ignorée ;
+- `update` : de plus, une ligne dont le nom et le prénom sont ceux d'un élève d'une autre
+  classe n'est pas créée mais signalée en conflit (rapport `conflits`) : ce peut être le
+  même élève changé de classe, ou un homonyme. Avec `deplacer=True` (passage d'une année
+  à l'autre, liste vérifiée), l'élève existant est déplacé dans la classe importée ; les
+  homonymes multiples sont alors signalés en erreur.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from .models import CLASSES_CHOICES, Eleve
+from .recherche import indexer_eleves
+from .texte import normaliser_nom
+from .versions import oublier_eleve
+
+MODES = ('skip', 'update')
+TAILLE_LOT = 500
+ERREURS_MAX = 100 # Au-delà, seules les erreurs sont comptées
+
+COLONNES = {
+    'nom': 'nom', 'الاسم': 'nom',
+    'prenom': 'prenom', 'prénom': 'prenom', 'اللقب': 'prenom',
+    'classe': 'classe', 'القسم': 'classe',
+}
+
+
+class ErreurImport(Exception):
+    """Fichier illisible ou en-tête incomplet : rien n'est importé."""
+
+
+def _entete(valeurs):
+    champs = [COLONNES.get(str(v or '').strip().lower()) for v in valeurs]
+    manquantes = {'nom', 'prenom', 'classe'} - set(champs)
+    if manquantes:
+        raise ErreurImport(f"Colonnes manquantes : {', '.join(sorted(manquantes))}.")
+    return champs
+
+
+def _lignes_csv(fichier):
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    try:
+        echantillon = texte.read(4096)
+        dialecte = csv.Sniffer().sniff(echantillon, delimiters=',;\t') if echantillon else csv.excel
+    except csv.Error:
+        dialecte = csv.excel
+    texte.seek(0)
+    lecteur = csv.reader(texte, dialecte)
+    try:
+        champs = _entete(next(lecteur, []))
+        for numero, valeurs in enumerate(lecteur, start=2):
+            yield numero, dict(zip(champs, valeurs))
+    except UnicodeDecodeError:
+        raise ErreurImport("Le fichier CSV doit être encodé en UTF-8.")
+    finally:
+        texte.detach() # Ne pas fermer le fichier de l'appelant
+
+
+def _lignes_xlsx(fichier):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErreurImport("L'import XLSX nécessite le paquet openpyxl.")
+    try:
+        classeur = load_workbook(fichier, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ErreurImport(f"Fichier XLSX illisible : {exc}")
+    try:
+        lignes = classeur.active.iter_rows(values_only=True)
+        champs = _entete(next(lignes, ()))
+        for numero, valeurs in enumerate(lignes, start=2):
+            yield numero, dict(zip(champs, valeurs))
+    finally:
+        classeur.close()
+
+
+def lire_lignes(fichier, nom_fichier=''):
+    """Itère sur (numéro de ligne, {'nom', 'prenom', 'classe'}) d'un fichier binaire ouvert."""
+    if nom_fichier.lower().endswith(('.xlsx', '.xlsm')):
+        return _lignes_xlsx(fichier)
+    return _lignes_csv(fichier)
+
+
+def _normaliser(numero, ligne, classes_valides):
+    nom = str(ligne.get('nom') or '').strip()
+    prenom = str(ligne.get('prenom') or '').strip()
+    classe = str(ligne.get('classe') or '').replace(' ', '').lower()
+    if not any((nom, prenom, classe)):
+        return None, None # Ligne vide
+    if not nom or not prenom:
+        return None, "Nom et prénom sont obligatoires."
+    if len(nom) > 100 or len(prenom) > 100:
+        return None, "Nom ou prénom trop long (100 caractères au maximum)."
+    if classe not in classes_valides:
+        return None, f"Classe inconnue : {ligne.get('classe')!r}."
+    return (nom, prenom, classe), None
+
+
+class RapportImport:
+    def __init__(self):
+        self.lues = self.creees = self.deplacees = self.ignorees = self.nb_erreurs = self.nb_conflits = 0
+        self.erreurs = []
+        self.conflits = []
+
+    def erreur(self, numero, message):
+        self.nb_erreurs += 1
+        if len(self.erreurs) < ERREURS_MAX:
+            self.erreurs.append({'ligne': numero, 'erreur': message})
+
+    def conflit(self, numero, classe, homonymes):
+        self.nb_conflits += 1
+        if len(self.conflits) < ERREURS_MAX:
+            self.conflits.append({
+                'ligne': numero,
+                'classe': classe,
+                'existants': [{'id': eleve.pk, 'classe': eleve.classe} for eleve in homonymes],
+            })
+
+    def as_dict(self):
+        return {
+            'lues': self.lues,
+            'creees': self.creees,
+            'deplacees': self.deplacees,
+            'ignorees': self.ignorees,
+            'nb_erreurs': self.nb_erreurs,
+            'erreurs': self.erreurs,
+            'nb_conflits': self.nb_conflits,
+            'conflits': self.conflits,
+        }
+
+
+def _importer_lot(lot, mode, rapport, deplacer=False):
+    noms = {normaliser_nom(nom) for _, (nom, _, _) in lot}
+
+    with transaction.atomic():
+        existants = Eleve.objects.filter(nom_normalise__in=noms) # Index eleve_nom_normalise_idx
+        if mode == 'update':
+            existants = existants.select_for_update()
+        par_nom = {}
+        identiques = set()
+        for eleve in existants.only('id', 'nom', 'prenom', 'classe', 'nom_normalise', 'prenom_normalise'):
+            identiques.add((eleve.nom_normalise, eleve.prenom_normalise, eleve.classe))
+            par_nom.setdefault((eleve.nom_normalise, eleve.prenom_normalise), []).append(eleve)
+
+        nouveaux, deplaces, ignorees, erreurs, conflits = [], [], 0, [], []
+        for numero, (nom, prenom, classe) in lot:
+            # Même clé dans les deux modes : « ben ali » dans 1AM1 est « Ben Ali » de 1am1.
+            cle = (normaliser_nom(nom), normaliser_nom(prenom), classe)
+            if cle in identiques:
+                ignorees += 1
+                continue
+            homonymes = par_nom.get(cle[:2], [])
+            if mode == 'update' and homonymes and not deplacer:
+                # Même nom dans une autre classe : même élève ou homonyme, l'enseignant tranche.
+                conflits.append((numero, classe, homonymes))
+                continue
+            if mode == 'update' and homonymes:
+                if len(homonymes) > 1:
+                    erreurs.append((numero, f"Plusieurs élèves nommés {prenom} {nom} : déplacement ambigu."))
+                    continue
+                eleve = homonymes[0]
+                if any(e.classe == classe for e in homonymes) or eleve in deplaces:
+                    ignorees += 1
+                    continue
+                eleve.classe = classe
+                deplaces.append(eleve)
+            else:
+                eleve = Eleve(nom=nom, prenom=prenom, classe=classe)
+                eleve.normaliser() # bulk_create n'appelle pas Eleve.save()
+                nouveaux.append(eleve)
+            identiques.add(cle) # Doublons à l'intérieur du lot
+
+        Eleve.objects.bulk_create(nouveaux)
+        if nouveaux and nouveaux[0].pk is None: # Base sans RETURNING (MySQL) : relire les ids
+            cles_nouvelles = {(e.nom_normalise, e.prenom_normalise, e.classe) for e in nouveaux}
+            nouveaux = [
+                e for e in Eleve.objects.filter(nom_normalise__in=noms).only(
+                    'id', 'nom', 'prenom', 'classe', 'nom_normalise', 'prenom_normalise'
+                )
+                if (e.nom_normalise, e.prenom_normalise, e.classe) in cles_nouvelles
+            ]
+        indexer_eleves(nouveaux) # Index de recherche (main/recherche.py)
+        if deplaces:
+            Eleve.objects.bulk_update(deplaces, ['classe'])
+            for eleve in deplaces:
+                oublier_eleve(eleve.pk) # bulk_update n'appelle pas Eleve.save()
+    # Le rapport n'est mis à jour qu'une fois le lot validé.
+    rapport.creees += len(nouveaux)
+    rapport.deplacees += len(deplaces)
+    rapport.ignorees += ignorees
+    for numero, message in erreurs:
+        rapport.erreur(numero, message)
+    for numero, classe, homonymes in conflits:
+        rapport.conflit(numero, classe, homonymes)
+
+
+def importer_eleves(lignes, mode='skip', taille_lot=TAILLE_LOT, deplacer=False):
+    """
+    Importe les lignes produites par `lire_lignes` et retourne un RapportImport.
+    `deplacer` (mode update) déplace les élèves d'une autre classe au lieu de les signaler.
+    Un lot rejeté par la base est compté en erreur sans interrompre les suivants.
+    """
+    if mode not in MODES:
+        raise ErreurImport(f"Mode inconnu : {mode!r} (attendu : {', '.join(MODES)}).")
+    classes_valides = dict(CLASSES_CHOICES)
+    rapport = RapportImport()
+    lignes = iter(lignes)
+    while True:
+        brut = list(islice(lignes, taille_lot))
+        if not brut:
+            break
+        lot = []
+        for numero, ligne in brut:
+            cle, erreur = _normaliser(numero, ligne, classes_valides)
+            if cle is None and erreur is None:
+                continue
+            rapport.lues += 1
+            if erreur:
+                rapport.erreur(numero, erreur)
+            else:
+                lot.append((numero, cle))
+        if not lot:
+            continue
+        try:
+            _importer_lot(lot, mode, rapport, deplacer)
+        except DatabaseError as exc:
+            for numero, _ in lot:
+                rapport.erreur(numero, f"Lot rejeté par la base : {exc}")
+    return rapport
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.diffusion import reprendre_diffusions_interrompues, traiter_diffusions_en_attente
+
+
+class Command(BaseCommand):
+    help = "Traite les diffusions de notifications en attente (écriture par lots)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu comme worker au lieu de s'arrêter une fois la file vide.")
+        parser.add_argument('--intervalle', type=float, default=2.0,
+                            help="Secondes d'attente entre deux passages quand la file est vide (avec --boucle).")
+        parser.add_argument('--taille-lot', type=int, default=None,
+                            help="Nombre de notifications écrites par transaction.")
+        parser.add_argument('--reprendre', action='store_true',
+                            help="Remet en attente les diffusions interrompues (bail expiré) ; "
+                                 "avec --boucle, à chaque passage.")
+
+    def handle(self, *args, **options):
+        while True:
+            if options['reprendre']:
+                nb = reprendre_diffusions_interrompues()
+                if nb:
+                    self.stdout.write(f"{nb} diffusion(s) remise(s) en attente.")
+            traitees = traiter_diffusions_en_attente(taille_lot=options['taille_lot'])
+            if traitees:
+                self.stdout.write(self.style.SUCCESS(f"{traitees} diffusion(s) traitée(s)."))
+            if not options['boucle']:
+                break
+            if not traitees:
+                time.sleep(options['intervalle'])
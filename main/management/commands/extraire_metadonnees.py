@@ -0,0 +1,69 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from main.metadonnees import extraire
+from main.models import Blob, Fichier
+
+
+def _lire(nom):
+    """Métadonnées d'un fichier stocké (exécuté dans le pool : aucun accès à la base)."""
+    try:
+        with default_storage.open(nom, 'rb') as fichier:
+            metadonnees = extraire(fichier, nom)
+        return {**metadonnees, 'url_publique': default_storage.url(nom)[:500]}, None
+    except Exception as exc:
+        return None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "Renseigne taille, type, pages et URL des fichiers envoyés avant l'extraction à l'envoi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4,
+                            help="Fichiers lus en parallèle depuis le stockage.")
+        parser.add_argument('--taille-lot', type=int, default=100,
+                            help="Fichiers traités puis enregistrés (bulk_update) par lot.")
+
+    def handle(self, *args, **options):
+        debut = time.monotonic()
+        a_traiter = Fichier.objects.filter(taille__isnull=True).exclude(fichier='').select_related('blob').order_by('id')
+        dernier_id, traites, erreurs = 0, 0, 0
+        with ThreadPoolExecutor(max_workers=max(options['threads'], 1), thread_name_prefix='metadonnees') as pool:
+            while True:
+                lot = list(a_traiter.filter(id__gt=dernier_id)[:options['taille_lot']])
+                if not lot:
+                    break
+                dernier_id = lot[-1].id
+                # Les blobs déjà décrits sont recopiés sans lire le stockage.
+                a_lire = [fichier for fichier in lot if not (fichier.blob and fichier.blob.type_mime)]
+                lus = dict(zip((fichier.id for fichier in a_lire), pool.map(_lire, [f.fichier.name for f in a_lire])))
+                modifies, blobs = [], []
+                for fichier in lot:
+                    if fichier.id not in lus:
+                        fichier.renseigner_metadonnees('fichier', fichier.blob, fichier.nom_original or fichier.fichier.name)
+                        modifies.append(fichier)
+                        continue
+                    metadonnees, erreur = lus[fichier.id]
+                    if erreur:
+                        erreurs += 1
+                        self.stdout.write(self.style.WARNING(f"Fichier {fichier.id} ({fichier.fichier.name}) : {erreur}"))
+                        continue
+                    for nom, valeur in metadonnees.items():
+                        setattr(fichier, nom, valeur)
+                    fichier.nom_original = fichier.nom_original or os.path.basename(fichier.fichier.name)[:255]
+                    modifies.append(fichier)
+                    if fichier.blob:
+                        fichier.blob.type_mime, fichier.blob.nb_pages = metadonnees['type_mime'], metadonnees['nb_pages']
+                        blobs.append(fichier.blob)
+                Fichier.objects.bulk_update(modifies, Fichier.champs_metadonnees)
+                Blob.objects.bulk_update(blobs, ['type_mime', 'nb_pages'])
+                traites += len(modifies)
+                self.stdout.write(f"{traites} fichier(s) renseigné(s) ({time.monotonic() - debut:.1f} s)...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé : {traites} fichier(s) renseigné(s), {erreurs} erreur(s) en {time.monotonic() - debut:.1f} s."
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.import_eleves import MODES, TAILLE_LOT, ErreurImport, importer_eleves, lire_lignes
+
+
+class Command(BaseCommand):
+    help = "Importe une liste d'élèves depuis un fichier CSV ou XLSX (colonnes nom, prenom, classe)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier .csv ou .xlsx.")
+        parser.add_argument('--mode', choices=MODES, default='skip',
+                            help="skip : ignorer les élèves existants ; update : signaler aussi les homonymes d'une autre classe.")
+        parser.add_argument('--deplacer', action='store_true',
+                            help="Avec --mode update : déplacer dans la classe importée l'élève de même nom d'une autre classe.")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT,
+                            help="Nombre de lignes traitées par transaction.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = importer_eleves(
+                    lire_lignes(fichier, options['fichier']), mode=options['mode'], taille_lot=options['taille_lot'],
+                    deplacer=options['deplacer'],
+                )
+        except (OSError, ErreurImport) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport.lues} ligne(s) lue(s) : {rapport.creees} créé(s), {rapport.deplacees} déplacé(s), "
+            f"{rapport.ignorees} ignoré(s), {rapport.nb_conflits} conflit(s), {rapport.nb_erreurs} erreur(s)."
+        ))
+        for conflit in rapport.conflits:
+            existants = ', '.join(f"#{e['id']} ({e['classe']})" for e in conflit['existants'])
+            self.stdout.write(self.style.WARNING(
+                f"Ligne {conflit['ligne']} : même nom qu'un élève d'une autre classe ({existants}), non importée."
+            ))
+        for erreur in rapport.erreurs:
+            self.stdout.write(self.style.WARNING(f"Ligne {erreur['ligne']} : {erreur['erreur']}"))
+        if rapport.nb_erreurs > len(rapport.erreurs):
+            self.stdout.write(f"... et {rapport.nb_erreurs - len(rapport.erreurs)} autre(s) erreur(s).")
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from main.blobs import DELAI_GRACE, blobs_stables, recalculer_references, supprimer_orphelins
+
+
+class Command(BaseCommand):
+    help = "Recalcule les références des contenus stockés (blobs) et supprime les orphelins."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delai-minutes', type=int, default=int(DELAI_GRACE.total_seconds() // 60),
+                            help="Ignore les blobs référencés depuis moins de N minutes (envois en cours).")
+
+    def handle(self, *args, **options):
+        delai = timedelta(minutes=options['delai_minutes'])
+        corriges = recalculer_references(delai)
+        self.stdout.write(f"{corriges} compteur(s) de références corrigé(s).")
+        supprimes = supprimer_orphelins(blobs_stables(delai).filter(nb_references=0))
+        self.stdout.write(self.style.SUCCESS(f"{supprimes} blob(s) orphelin(s) supprimé(s)."))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.retention import (
+    TAILLE_LOT_DEFAUT, eleves_en_exces, lues_anciennes, politique_par_defaut, purger_excedent, purger_lues,
+)
+
+
+class Command(BaseCommand):
+    help = "Applique la rétention des notifications (suppression ou archivage par lots)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lues-jours', type=int, default=None,
+                            help="Retire les notifications lues plus anciennes que N jours (0 : règle désactivée).")
+        parser.add_argument('--max-par-eleve', type=int, default=None,
+                            help="Ne garde que les M notifications les plus récentes par élève (0 : règle désactivée).")
+        parser.add_argument('--archiver', action='store_true', default=None,
+                            help="Copie les notifications retirées dans la table d'archive.")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT_DEFAUT,
+                            help="Notifications retirées par transaction.")
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Secondes d'attente entre deux lots.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Affiche seulement ce qui serait retiré.")
+
+    def handle(self, *args, **options):
+        politique = politique_par_defaut()
+        for cle in ('lues_jours', 'max_par_eleve', 'archiver'):
+            if options[cle] is not None:
+                politique[cle] = options[cle]
+        if options['taille_lot'] < 1:
+            raise CommandError("--taille-lot doit être au moins 1.")
+        if not politique['lues_jours'] and not politique['max_par_eleve']:
+            raise CommandError("Aucune règle active : préciser --lues-jours et/ou --max-par-eleve.")
+        action = 'archivée(s)' if politique['archiver'] else 'supprimée(s)'
+
+        if options['dry_run']:
+            if politique['lues_jours']:
+                nb = lues_anciennes(politique['lues_jours']).count()
+                self.stdout.write(f"Lues de plus de {politique['lues_jours']} jour(s) : {nb} notification(s).")
+            if politique['max_par_eleve']:
+                exces = eleves_en_exces(politique['max_par_eleve'])
+                nb = sum(exces.values()) - len(exces) * politique['max_par_eleve']
+                self.stdout.write(f"Au-delà de {politique['max_par_eleve']} par élève : {nb} notification(s), {len(exces)} élève(s).")
+            return
+
+        regles = []
+        if politique['lues_jours']:
+            regles.append((f"lues de plus de {politique['lues_jours']} jour(s)", purger_lues, politique['lues_jours']))
+        if politique['max_par_eleve']:
+            regles.append((f"au-delà de {politique['max_par_eleve']} par élève", purger_excedent, politique['max_par_eleve']))
+
+        debut_total = time.monotonic()
+        for libelle, purger, seuil in regles:
+            debut, total, lots = time.monotonic(), 0, 0
+            for nb in purger(seuil, taille_lot=options['taille_lot'], archiver=politique['archiver'], pause=options['pause']):
+                total += nb
+                lots += 1
+                if lots % 10 == 0:
+                    ecoule = time.monotonic() - debut
+                    self.stdout.write(f"  {libelle} : {total} {action} en {lots} lot(s), {ecoule:.1f} s ({total / ecoule if ecoule else 0:.0f}/s)")
+            self.stdout.write(self.style.SUCCESS(
+                f"Notifications {libelle} : {total} {action} en {lots} lot(s), {time.monotonic() - debut:.2f} s."
+            ))
+        self.stdout.write(f"Durée totale : {time.monotonic() - debut_total:.2f} s.")
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.televersements import purger_receptions_abandonnees, reprendre_transferts_interrompus, transferer_en_attente
+
+
+class Command(BaseCommand):
+    help = "Transfère vers le stockage les téléversements par morceaux terminés."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu comme worker au lieu de s'arrêter une fois la file vide.")
+        parser.add_argument('--intervalle', type=float, default=2.0,
+                            help="Secondes d'attente entre deux passages quand la file est vide (avec --boucle).")
+        parser.add_argument('--reprendre', action='store_true',
+                            help="Remet en attente les transferts échoués ou interrompus (bail expiré) avant de commencer.")
+        parser.add_argument('--purger', type=float, metavar='HEURES', default=None,
+                            help="Supprime d'abord les téléversements inachevés depuis plus de HEURES heures.")
+
+    def handle(self, *args, **options):
+        if options['purger'] is not None:
+            nb = purger_receptions_abandonnees(options['purger'])
+            self.stdout.write(f"{nb} téléversement(s) abandonné(s) supprimé(s).")
+        if options['reprendre']:
+            nb = reprendre_transferts_interrompus()
+            self.stdout.write(f"{nb} transfert(s) remis en attente.")
+
+        while True:
+            traites = transferer_en_attente()
+            if traites:
+                self.stdout.write(self.style.SUCCESS(f"{traites} transfert(s) terminé(s)."))
+            if not options['boucle']:
+                break
+            if not traites:
+                time.sleep(options['intervalle'])
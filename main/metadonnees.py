@@ -0,0 +1,69 @@
+"""
+Métadonnées des fichiers envoyés (type MIME, taille, nombre de pages des PDF), extraites
+une seule fois à l'envoi (main/blobs.py) puis recopiées dans les colonnes de Fichier :
+les listes les servent depuis la ligne, sans appel au stockage.
+
+Le nombre de pages utilise pypdf s'il est installé, sinon un comptage des objets
+`/Type /Page` du fichier (exact pour la plupart des PDF non compressés, None sinon).
+"""
+import mimetypes
+import re
+
+TAILLE_ENTETE = 16
+TAILLE_MORCEAU = 1024 * 1024
+
+# Signatures des formats courants, prioritaires sur l'extension du nom
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+def type_mime(entete, nom):
+    for signature, mime in SIGNATURES:
+        if entete.startswith(signature):
+            return mime
+    return mimetypes.guess_type(nom or '')[0] or 'application/octet-stream'
+
+
+def _compter_pages(fichier):
+    compte, reste = 0, b''
+    fichier.seek(0)
+    for morceau in iter(lambda: fichier.read(TAILLE_MORCEAU), b''):
+        bloc = reste + morceau
+        # Les motifs qui débutent dans les 32 derniers octets sont comptés au morceau suivant.
+        coupure = max(len(bloc) - 32, 0)
+        compte += sum(1 for motif in _PAGE.finditer(bloc) if motif.start() < coupure)
+        reste = bloc[coupure:]
+    compte += len(_PAGE.findall(reste))
+    return compte or None
+
+
+def nb_pages_pdf(fichier):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return _compter_pages(fichier)
+    try:
+        fichier.seek(0)
+        return len(PdfReader(fichier).pages)
+    except Exception: # PDF illisible pour pypdf : comptage de repli
+        return _compter_pages(fichier)
+
+
+def extraire(fichier, nom):
+    """{'taille', 'type_mime', 'nb_pages'} d'un fichier lisible et repositionnable (rembobiné après)."""
+    fichier.seek(0)
+    mime = type_mime(fichier.read(TAILLE_ENTETE), nom)
+    metadonnees = {
+        'taille': fichier.size,
+        'type_mime': mime,
+        'nb_pages': nb_pages_pdf(fichier) if mime == 'application/pdf' else None,
+    }
+    fichier.seek(0)
+    return metadonnees
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiffusionNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('classes_cibles', models.CharField(max_length=500, verbose_name='Classes cibles')),
+                ('message', models.CharField(max_length=255, verbose_name='Message de notification')),
+                ('type_notification', models.CharField(choices=[('new_file', 'Nouveau Fichier'), ('new_activity', 'Nouvelle Activité'), ('new_exercise', 'Nouvel Exercice'), ('grade_updated', 'Note Mise à Jour'), ('new_message', 'Nouveau Message'), ('activity_reminder', "Rappel d'Activité")], max_length=50, verbose_name='Type')),
+                ('lien_relatif', models.CharField(blank=True, max_length=200, null=True, verbose_name='Lien relatif (frontend)')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('terminee', 'Terminée'), ('echouee', 'Échouée')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('dernier_eleve_id', models.BigIntegerField(default=0, verbose_name='Dernier élève traité')),
+                ('nb_notifications', models.PositiveIntegerField(default=0, verbose_name='Notifications créées')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Diffusion de notification',
+                'verbose_name_plural': 'Diffusions de notifications',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['statut', 'id'], name='diffusion_statut_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_diffusionnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Classe',
+            fields=[
+                ('code', models.CharField(choices=[('1am1', '1AM1'), ('1am2', '1AM2'), ('1am3', '1AM3'), ('1am4', '1AM4'), ('1am5', '1AM5'), ('2am1', '2AM1'), ('2am2', '2AM2'), ('2am3', '2AM3'), ('2am4', '2AM4'), ('2am5', '2AM5'), ('3am1', '3AM1'), ('3am2', '3AM2'), ('3am3', '3AM3'), ('3am4', '3AM4'), ('3am5', '3AM5'), ('4am1', '4AM1'), ('4am2', '4AM2'), ('4am3', '4AM3'), ('4am4', '4AM4'), ('4am5', '4AM5')], max_length=10, primary_key=True, serialize=False, verbose_name='القسم')),
+            ],
+            options={
+                'verbose_name': 'قسم',
+                'verbose_name_plural': 'الأقسام',
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AddField(
+            model_name='activite',
+            name='classes',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='activites', to='main.classe'),
+        ),
+        migrations.AddField(
+            model_name='exercice',
+            name='classes',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='exercices', to='main.classe'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='classes',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='fichiers', to='main.classe'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Figé ici : la migration ne doit pas dépendre de l'évolution de CLASSES_CHOICES.
+CODES_CLASSES = [f'{niveau}am{groupe}' for niveau in range(1, 5) for groupe in range(1, 6)]
+
+
+def codes_cibles(classes_cibles_str):
+    codes = [c.strip().lower() for c in (classes_cibles_str or '').split(',') if c.strip()]
+    if 'all' in codes:
+        return CODES_CLASSES
+    return [code for code in dict.fromkeys(codes) if code in CODES_CLASSES]
+
+
+def remplir_ciblage(apps, schema_editor):
+    Classe = apps.get_model('main', 'Classe')
+    Classe.objects.bulk_create([Classe(code=code) for code in CODES_CLASSES], ignore_conflicts=True)
+
+    for nom_modele, champ in [('Fichier', 'fichier_id'), ('Activite', 'activite_id'), ('Exercice', 'exercice_id')]:
+        Modele = apps.get_model('main', nom_modele)
+        Through = Modele.classes.through
+        liens = []
+        for objet_id, classes_cibles in Modele.objects.values_list('id', 'classes_cibles').iterator():
+            liens.extend(Through(**{champ: objet_id, 'classe_id': code}) for code in codes_cibles(classes_cibles))
+            if len(liens) >= 1000:
+                Through.objects.bulk_create(liens, ignore_conflicts=True)
+                liens = []
+        Through.objects.bulk_create(liens, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_classe_ciblage'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_ciblage, migrations.RunPython.noop),
+    ]
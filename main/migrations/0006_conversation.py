@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_remplir_ciblage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('eleve', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='conversation', serialize=False, to='main.eleve')),
+                ('dernier_message_contenu', models.CharField(blank=True, max_length=60)),
+                ('dernier_message_date', models.DateTimeField(blank=True, null=True)),
+                ('dernier_message_expediteur', models.CharField(blank=True, max_length=20)),
+                ('non_lus_enseignant', models.PositiveIntegerField(default=0)),
+                ('non_lus_eleve', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'محادثة',
+                'verbose_name_plural': 'المحادثات',
+                'indexes': [models.Index(fields=['-dernier_message_date', '-eleve'], name='conversation_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery
+
+
+def extrait(contenu):
+    return contenu[:50] + '...' if contenu and len(contenu) > 50 else contenu
+
+
+def remplir_conversations(apps, schema_editor):
+    Message = apps.get_model('main', 'Message')
+    Conversation = apps.get_model('main', 'Conversation')
+
+    dernier = Message.objects.filter(eleve_id=OuterRef('eleve_id')).order_by('-date_envoi', '-id')
+    resumes = (
+        Message.objects.values('eleve_id')
+        .annotate(
+            non_lus_enseignant=Count('id', filter=Q(expediteur='eleve', lu=False)),
+            non_lus_eleve=Count('id', filter=Q(expediteur='enseignant', lu=False)),
+            dernier_id=Subquery(dernier.values('id')[:1]),
+        )
+        .order_by('eleve_id')
+    )
+    conversations = []
+    for resume in resumes.iterator():
+        message = Message.objects.get(pk=resume['dernier_id'])
+        conversations.append(Conversation(
+            eleve_id=resume['eleve_id'],
+            dernier_message_contenu=extrait(message.contenu),
+            dernier_message_date=message.date_envoi,
+            dernier_message_expediteur=message.expediteur,
+            non_lus_enseignant=resume['non_lus_enseignant'],
+            non_lus_eleve=resume['non_lus_eleve'],
+        ))
+        if len(conversations) >= 500:
+            Conversation.objects.bulk_create(conversations, ignore_conflicts=True)
+            conversations = []
+    Conversation.objects.bulk_create(conversations, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_conversation'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_conversations, migrations.RunPython.noop),
+    ]
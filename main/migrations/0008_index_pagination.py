@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_remplir_conversations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activite',
+            index=models.Index(fields=['-date_creation', '-id'], name='activite_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exercice',
+            index=models.Index(fields=['-date_creation', '-id'], name='exercice_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fichier',
+            index=models.Index(fields=['-date_upload', '-id'], name='fichier_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['eleve', 'date_envoi', 'id'], name='message_eleve_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['-date_envoi', '-id'], name='message_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['eleve', '-date_attribution', '-id'], name='note_eleve_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['-date_attribution', '-id'], name='note_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['destinataire', '-date_creation', '-id'], name='notif_dest_date_idx'),
+        ),
+    ]
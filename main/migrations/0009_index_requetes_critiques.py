@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_index_pagination'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eleve',
+            index=models.Index(fields=['classe', 'nom', 'prenom'], name='eleve_classe_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['eleve', 'expediteur', 'lu'], name='message_non_lus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['destinataire', 'lu', '-date_creation', '-id'], name='notif_dest_lu_date_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remplir_compteurs(apps, schema_editor):
+    Eleve = apps.get_model('main', 'Eleve')
+    Notification = apps.get_model('main', 'Notification')
+    non_lues = Notification.objects.filter(
+        destinataire=OuterRef('pk'), lu=False
+    ).order_by().values('destinataire').annotate(n=Count('id')).values('n')
+    Eleve.objects.update(notifications_non_lues=Coalesce(Subquery(non_lues), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_index_requetes_critiques'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eleve',
+            name='notifications_non_lues',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(remplir_compteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+from main.texte import normaliser_nom
+
+
+def remplir_noms_normalises(apps, schema_editor):
+    Eleve = apps.get_model('main', 'Eleve')
+    lot = []
+    for eleve in Eleve.objects.only('id', 'nom', 'prenom').iterator(chunk_size=1000):
+        eleve.nom_normalise = normaliser_nom(eleve.nom)
+        eleve.prenom_normalise = normaliser_nom(eleve.prenom)
+        lot.append(eleve)
+        if len(lot) >= 1000:
+            Eleve.objects.bulk_update(lot, ['nom_normalise', 'prenom_normalise'])
+            lot = []
+    Eleve.objects.bulk_update(lot, ['nom_normalise', 'prenom_normalise'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_compteurs_non_lus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eleve',
+            name='nom_normalise',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='eleve',
+            name='prenom_normalise',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='eleve',
+            index=models.Index(fields=['nom_normalise', 'prenom_normalise'], name='eleve_nom_normalise_idx'),
+        ),
+        migrations.RunPython(remplir_noms_normalises, migrations.RunPython.noop),
+    ]
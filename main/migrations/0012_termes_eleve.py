@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from main.texte import termes
+
+
+def indexer_eleves(apps, schema_editor):
+    Eleve = apps.get_model('main', 'Eleve')
+    TermeEleve = apps.get_model('main', 'TermeEleve')
+    lot = []
+    for eleve in Eleve.objects.only('id', 'nom', 'prenom').iterator(chunk_size=1000):
+        lot.extend(TermeEleve(eleve_id=eleve.id, terme=terme[:100]) for terme in termes(eleve.nom, eleve.prenom))
+        if len(lot) >= 2000:
+            TermeEleve.objects.bulk_create(lot)
+            lot = []
+    TermeEleve.objects.bulk_create(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_nom_normalise'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermeEleve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terme', models.CharField(db_index=True, max_length=100)),
+                ('eleve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termes', to='main.eleve')),
+            ],
+            options={
+                'unique_together': {('eleve', 'terme')},
+            },
+        ),
+        migrations.RunPython(indexer_eleves, migrations.RunPython.noop),
+    ]
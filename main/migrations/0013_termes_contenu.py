@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+from main.texte import termes_ponderes
+
+# Copie de `champs_recherche` des modèles (absent des modèles historiques)
+CHAMPS = {
+    'Exercice': (('titre', 3), ('enonce', 1)),
+    'Activite': (('titre', 3), ('description', 1)),
+    'Fichier': (('titre', 3),),
+    'Message': (('contenu', 1),),
+}
+
+
+def indexer_contenus(apps, schema_editor):
+    TermeContenu = apps.get_model('main', 'TermeContenu')
+    lot = []
+    for nom_modele, champs in CHAMPS.items():
+        colonnes = [champ for champ, _ in champs]
+        for objet in apps.get_model('main', nom_modele).objects.only('id', *colonnes).iterator(chunk_size=1000):
+            lot.extend(
+                TermeContenu(type_contenu=nom_modele.lower(), objet_id=objet.id, terme=terme, poids=poids)
+                for terme, poids in termes_ponderes(*((getattr(objet, champ), p) for champ, p in champs)).items()
+            )
+            if len(lot) >= 2000:
+                TermeContenu.objects.bulk_create(lot)
+                lot = []
+    TermeContenu.objects.bulk_create(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0012_termes_eleve'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermeContenu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_contenu', models.CharField(choices=[('fichier', 'ملف'), ('activite', 'نشاط'), ('exercice', 'تمرين'), ('message', 'رسالة')], max_length=10)),
+                ('objet_id', models.BigIntegerField()),
+                ('terme', models.CharField(db_index=True, max_length=100)),
+                ('poids', models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                'unique_together': {('type_contenu', 'objet_id', 'terme')},
+            },
+        ),
+        migrations.RunPython(indexer_contenus, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0013_termes_contenu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fichier',
+            name='statut',
+            field=models.CharField(choices=[('en_attente', 'قيد الرفع'), ('pret', 'جاهز'), ('echoue', 'فشل الرفع')], default='pret', editable=False, max_length=20, verbose_name='الحالة'),
+        ),
+        migrations.CreateModel(
+            name='Televersement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(editable=False, max_length=43, unique=True)),
+                ('cible', models.CharField(choices=[('fichier', 'Fichier'), ('activite', 'Activité')], max_length=10)),
+                ('objet_id', models.BigIntegerField(blank=True, null=True)),
+                ('nom_fichier', models.CharField(max_length=255)),
+                ('taille', models.BigIntegerField()),
+                ('taille_recue', models.BigIntegerField(default=0)),
+                ('titre', models.CharField(blank=True, max_length=200)),
+                ('classes_cibles', models.CharField(default='all', max_length=500)),
+                ('statut', models.CharField(choices=[('reception', 'Réception des morceaux'), ('en_attente', 'Transfert en attente'), ('en_cours', 'Transfert en cours'), ('termine', 'Terminé'), ('echoue', 'Échoué')], default='reception', max_length=20)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Téléversement',
+                'verbose_name_plural': 'Téléversements',
+                'indexes': [models.Index(fields=['statut', 'id'], name='televersement_statut_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0014_televersements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empreinte', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('fichier', models.FileField(upload_to='blobs/')),
+                ('taille', models.BigIntegerField(default=0)),
+                ('nb_references', models.PositiveIntegerField(default=0)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contenu stocké',
+                'verbose_name_plural': 'Contenus stockés',
+            },
+        ),
+        migrations.AddField(
+            model_name='activite',
+            name='blob_joint',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='main.blob'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='main.blob'),
+        ),
+    ]
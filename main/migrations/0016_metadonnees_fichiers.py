@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='nb_pages',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blob',
+            name='type_mime',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='nb_pages',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='عدد الصفحات'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='nom_original',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='اسم الملف الأصلي'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='taille',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='الحجم'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='type_mime',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, verbose_name='النوع'),
+        ),
+        migrations.AddField(
+            model_name='fichier',
+            name='url_publique',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_metadonnees_fichiers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchivee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField(unique=True)),
+                ('message', models.CharField(max_length=255)),
+                ('lu', models.BooleanField(default=False)),
+                ('type_notification', models.CharField(choices=[('new_file', 'Nouveau Fichier'), ('new_activity', 'Nouvelle Activité'), ('new_exercise', 'Nouvel Exercice'), ('grade_updated', 'Note Mise à Jour'), ('new_message', 'Nouveau Message'), ('activity_reminder', "Rappel d'Activité")], max_length=50)),
+                ('lien_relatif', models.CharField(blank=True, max_length=200, null=True)),
+                ('date_creation', models.DateTimeField()),
+                ('date_archivage', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notification archivée',
+                'verbose_name_plural': 'Notifications archivées',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['lu', 'date_creation', 'id'], name='notif_lu_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationarchivee',
+            name='destinataire',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications_archivees', to='main.eleve'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchivee',
+            index=models.Index(fields=['destinataire', '-date_creation'], name='notif_archive_dest_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_retention_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diffusionnotification',
+            name='bail_expire_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin du bail'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from main.texte import normaliser_nom
+
+
+def recalculer_noms_normalises(apps, schema_editor):
+    # normaliser_nom ignore désormais les accents : les formes enregistrées sont recalculées.
+    Eleve = apps.get_model('main', 'Eleve')
+    lot = []
+    for eleve in Eleve.objects.only('id', 'nom', 'prenom').iterator(chunk_size=1000):
+        eleve.nom_normalise = normaliser_nom(eleve.nom)
+        eleve.prenom_normalise = normaliser_nom(eleve.prenom)
+        lot.append(eleve)
+        if len(lot) >= 1000:
+            Eleve.objects.bulk_update(lot, ['nom_normalise', 'prenom_normalise'])
+            lot = []
+    Eleve.objects.bulk_update(lot, ['nom_normalise', 'prenom_normalise'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_bail_diffusion'),
+    ]
+
+    operations = [
+        migrations.RunPython(recalculer_noms_normalises, migrations.RunPython.noop),
+    ]
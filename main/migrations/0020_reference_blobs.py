@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_noms_sans_accents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='date_reference',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
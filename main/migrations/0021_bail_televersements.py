@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_reference_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='televersement',
+            name='bail_expire_le',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_bail_televersements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='televersement',
+            name='empreinte',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
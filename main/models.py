@@ -1,6 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
 import json
+import os
+
+from .texte import normaliser_nom
 
 CLASSES_CHOICES = [
     ('1am1', '1AM1'), ('1am2', '1AM2'), ('1am3', '1AM3'), ('1am4', '1AM4'), ('1am5', '1AM5'),
@@ -9,43 +15,206 @@ CLASSES_CHOICES = [
     ('4am1', '4AM1'), ('4am2', '4AM2'), ('4am3', '4AM3'), ('4am4', '4AM4'), ('4am5', '4AM5'),
 ]
 
+def codes_classes_cibles(classes_cibles_str):
+    """
+    Convertit la chaîne saisie par l'enseignant ('all' ou '1am1, 2am3') en liste
+    de codes de classes valides. La correspondance est exacte : '11am1' ne cible pas '1am1'.
+    """
+    codes = [c.strip().lower() for c in (classes_cibles_str or '').split(',') if c.strip()]
+    if 'all' in codes:
+        return [code for code, _ in CLASSES_CHOICES]
+    valides = dict(CLASSES_CHOICES)
+    return [code for code in dict.fromkeys(codes) if code in valides]
+
+class Classe(models.Model):
+    """Dimension des classes, utilisée pour le ciblage indexé des contenus."""
+    code = models.CharField(max_length=10, primary_key=True, choices=CLASSES_CHOICES, verbose_name="القسم")
+
+    class Meta:
+        verbose_name = "قسم"
+        verbose_name_plural = "الأقسام"
+        ordering = ['code']
+
+    def __str__(self):
+        return self.get_code_display()
+
+class Blob(models.Model):
+    """
+    Contenu de fichier stocké une seule fois, identifié par son SHA-256 (main/blobs.py).
+    `nb_references` compte les fichiers et pièces jointes qui le désignent.
+    """
+    empreinte = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    fichier = models.FileField(upload_to='blobs/')
+    taille = models.BigIntegerField(default=0)
+    # Extraites une fois par contenu (main/metadonnees.py)
+    type_mime = models.CharField(max_length=100, blank=True)
+    nb_pages = models.PositiveIntegerField(null=True, blank=True)
+    nb_references = models.PositiveIntegerField(default=0)
+    # Dernière référence prise par main.blobs.stocker(), avant la sauvegarde du contenu qui
+    # la porte : le recalcul des références laisse de côté les blobs pris trop récemment.
+    date_reference = models.DateTimeField(default=timezone.now)
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Contenu stocké"
+        verbose_name_plural = "Contenus stockés"
+
+    def __str__(self):
+        return f"{self.empreinte[:12]} ({self.nb_references} réf.)"
+
+class ContenuCible(models.Model):
+    """
+    Base des contenus destinés à des classes (fichiers, activités, exercices).
+    `classes_cibles` reste la saisie de l'enseignant ; la relation `classes` en est la
+    forme normalisée, resynchronisée à chaque sauvegarde, sur laquelle portent les filtres.
+    """
+    # (champ, poids) indexés pour la recherche plein texte (main/recherche.py)
+    champs_recherche = ()
+    # (FileField, ForeignKey vers Blob) dédupliqués par contenu (main/blobs.py)
+    champs_blob = ()
+    # Colonnes renseignées par renseigner_metadonnees() à chaque nouvel envoi
+    champs_metadonnees = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from .blobs import attacher_blobs, liberer
+        from .recherche import indexer_contenus
+        a_liberer = attacher_blobs(self)
+        super().save(*args, **kwargs)
+        self.synchroniser_classes()
+        indexer_contenus([self])
+        liberer(a_liberer)
+
+    def delete(self, *args, **kwargs):
+        from .blobs import liberer
+        from .recherche import desindexer_contenus
+        blobs = [getattr(self, f'{champ_blob}_id') for _, champ_blob in self.champs_blob]
+        desindexer_contenus(type(self), [self.pk])
+        resultat = super().delete(*args, **kwargs)
+        liberer([blob_id for blob_id in blobs if blob_id])
+        return resultat
+
+    def synchroniser_classes(self):
+        self.classes.set(codes_classes_cibles(self.classes_cibles))
+
+    def renseigner_metadonnees(self, champ, blob, nom_original):
+        pass
+
 class Eleve(models.Model):
     nom = models.CharField(max_length=100, verbose_name="الاسم")
     prenom = models.CharField(max_length=100, verbose_name="اللقب")
     classe = models.CharField(max_length=10, choices=CLASSES_CHOICES, verbose_name="القسم")
     date_creation = models.DateTimeField(auto_now_add=True)
+    # Compteur dénormalisé pour les badges, tenu à jour avec des expressions F()
+    notifications_non_lues = models.PositiveIntegerField(default=0, editable=False)
+    # Formes normalisées (main/texte.py) pour la connexion par index, recalculées à chaque save()
+    nom_normalise = models.CharField(max_length=100, default='', editable=False)
+    prenom_normalise = models.CharField(max_length=100, default='', editable=False)
     
     class Meta:
         unique_together = ['nom', 'prenom', 'classe']
         verbose_name = "تلميذ"
         verbose_name_plural = "التلاميذ"
+        indexes = [
+            models.Index(fields=['classe', 'nom', 'prenom'], name='eleve_classe_nom_idx'),
+            models.Index(fields=['nom_normalise', 'prenom_normalise'], name='eleve_nom_normalise_idx'),
+        ]
     
     def __str__(self):
         return f"{self.prenom} {self.nom} - {self.classe}"
 
-class Fichier(models.Model):
+    def normaliser(self):
+        """À appeler avant un bulk_create, qui ne passe pas par save()."""
+        self.nom_normalise = normaliser_nom(self.nom)
+        self.prenom_normalise = normaliser_nom(self.prenom)
+
+    # La classe de l'élève est mise en cache pour les ETags (main/versions.py).
+    # Le compteur de badges n'est écrit que par des F() : une sauvegarde complète d'un élève
+    # existant ne réécrit pas la valeur en mémoire, peut-être périmée.
+    def save(self, *args, **kwargs):
+        from .recherche import indexer_eleves
+        from .versions import oublier_eleve
+        self.normaliser()
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            ignores = {'notifications_non_lues', *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.attname not in ignores
+            ]
+        update_fields = kwargs.get('update_fields')
+        noms_modifies = update_fields is None or bool({'nom', 'prenom'} & set(update_fields))
+        if update_fields is not None and noms_modifies:
+            kwargs['update_fields'] = {*update_fields, 'nom_normalise', 'prenom_normalise'}
+        super().save(*args, **kwargs)
+        if noms_modifies:
+            indexer_eleves([self])
+        oublier_eleve(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .recherche import desindexer_contenus
+        from .versions import oublier_eleve
+        eleve_id = self.pk
+        desindexer_contenus(Message, Message.objects.filter(eleve_id=eleve_id).values('id'))
+        resultat = super().delete(*args, **kwargs)
+        oublier_eleve(eleve_id)
+        return resultat
+
+STATUTS_FICHIER = [
+    ('en_attente', 'قيد الرفع'), # Téléversement par morceaux reçu, transfert vers le stockage en cours
+    ('pret', 'جاهز'),
+    ('echoue', 'فشل الرفع'),
+]
+
+class Fichier(ContenuCible):
+    champs_recherche = (('titre', 3),)
+    champs_blob = (('fichier', 'blob'),)
+    champs_metadonnees = ('nom_original', 'taille', 'type_mime', 'nb_pages', 'url_publique')
     titre = models.CharField(max_length=200, verbose_name="العنوان")
     fichier = models.FileField(upload_to='fichiers/', verbose_name="الملف")
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='+')
+    # Seuls les fichiers « prêts » sont servis aux élèves (voir main/televersements.py)
+    statut = models.CharField(max_length=20, choices=STATUTS_FICHIER, default='pret', editable=False, verbose_name="الحالة")
+    # Métadonnées copiées à l'envoi : les listes n'interrogent jamais le stockage
+    nom_original = models.CharField(max_length=255, blank=True, editable=False, verbose_name="اسم الملف الأصلي")
+    taille = models.BigIntegerField(null=True, blank=True, editable=False, verbose_name="الحجم")
+    type_mime = models.CharField(max_length=100, blank=True, db_index=True, editable=False, verbose_name="النوع")
+    nb_pages = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="عدد الصفحات")
+    url_publique = models.CharField(max_length=500, blank=True, editable=False)
     classes_cibles = models.CharField(max_length=500, default='all', verbose_name="الأقسام المستهدفة")
+    classes = models.ManyToManyField(Classe, blank=True, editable=False, related_name='fichiers')
     date_upload = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = "ملف"
         verbose_name_plural = "الملفات"
+        indexes = [models.Index(fields=['-date_upload', '-id'], name='fichier_date_idx')]
     
     def __str__(self):
         return self.titre
 
-class Activite(models.Model):
+    def renseigner_metadonnees(self, champ, blob, nom_original):
+        self.nom_original = os.path.basename(nom_original or '')[:255]
+        self.taille = blob.taille
+        self.type_mime = blob.type_mime
+        self.nb_pages = blob.nb_pages
+        self.url_publique = blob.fichier.url[:500]
+
+class Activite(ContenuCible):
+    champs_recherche = (('titre', 3), ('description', 1))
+    champs_blob = (('fichier_joint', 'blob_joint'),)
     titre = models.CharField(max_length=200, verbose_name="العنوان")
     description = models.TextField(verbose_name="الوصف")
     fichier_joint = models.FileField(upload_to='activites/', blank=True, null=True)
+    blob_joint = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='+')
     classes_cibles = models.CharField(max_length=500, default='all')
+    classes = models.ManyToManyField(Classe, blank=True, editable=False, related_name='activites')
     date_creation = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = "نشاط"
         verbose_name_plural = "الأنشطة"
+        indexes = [models.Index(fields=['-date_creation', '-id'], name='activite_date_idx')]
     
     def __str__(self):
         return self.titre
@@ -59,15 +228,18 @@ class CompletionActivite(models.Model):
     class Meta:
         unique_together = ['eleve', 'activite']
 
-class Exercice(models.Model):
+class Exercice(ContenuCible):
+    champs_recherche = (('titre', 3), ('enonce', 1))
     titre = models.CharField(max_length=200, verbose_name="العنوان")
     enonce = models.TextField(verbose_name="نص التمرين")
     classes_cibles = models.CharField(max_length=500, default='all')
+    classes = models.ManyToManyField(Classe, blank=True, editable=False, related_name='exercices')
     date_creation = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         verbose_name = "تمرين"
         verbose_name_plural = "التمارين"
+        indexes = [models.Index(fields=['-date_creation', '-id'], name='exercice_date_idx')]
     
     def __str__(self):
         return self.titre
@@ -92,6 +264,10 @@ class Note(models.Model):
     class Meta:
         verbose_name = "علامة"
         verbose_name_plural = "العلامات"
+        indexes = [
+            models.Index(fields=['eleve', '-date_attribution', '-id'], name='note_eleve_date_idx'),
+            models.Index(fields=['-date_attribution', '-id'], name='note_date_idx'),
+        ]
 
 class Message(models.Model):
     eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE)
@@ -104,7 +280,96 @@ class Message(models.Model):
         verbose_name = "رسالة"
         verbose_name_plural = "الرسائل"
         ordering = ['-date_envoi']
-        
+        indexes = [
+            models.Index(fields=['eleve', 'date_envoi', 'id'], name='message_eleve_date_idx'),
+            models.Index(fields=['eleve', 'expediteur', 'lu'], name='message_non_lus_idx'),
+            models.Index(fields=['-date_envoi', '-id'], name='message_date_idx'),
+        ]
+
+    champs_recherche = (('contenu', 1),)
+
+    def save(self, *args, **kwargs):
+        from .recherche import indexer_contenus
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'contenu' in update_fields:
+            indexer_contenus([self])
+
+    def delete(self, *args, **kwargs):
+        from .recherche import desindexer_contenus
+        desindexer_contenus(Message, [self.pk])
+        return super().delete(*args, **kwargs)
+
+def extrait_message(contenu):
+    return contenu[:50] + '...' if contenu and len(contenu) > 50 else contenu
+
+class Conversation(models.Model):
+    """
+    Résumé de la conversation d'un élève avec l'enseignant (boîte de réception).
+    Mis à jour dans la même transaction que l'envoi et la lecture des messages.
+    """
+    eleve = models.OneToOneField(Eleve, on_delete=models.CASCADE, primary_key=True, related_name='conversation')
+    dernier_message_contenu = models.CharField(max_length=60, blank=True)
+    dernier_message_date = models.DateTimeField(null=True, blank=True)
+    dernier_message_expediteur = models.CharField(max_length=20, blank=True)
+    non_lus_enseignant = models.PositiveIntegerField(default=0) # Messages de l'élève non lus par l'enseignant
+    non_lus_eleve = models.PositiveIntegerField(default=0) # Messages de l'enseignant non lus par l'élève
+
+    class Meta:
+        verbose_name = "محادثة"
+        verbose_name_plural = "المحادثات"
+        indexes = [models.Index(fields=['-dernier_message_date', '-eleve'], name='conversation_date_idx')]
+
+    def __str__(self):
+        return f"Conversation avec {self.eleve_id}"
+
+    @staticmethod
+    def champ_non_lus(expediteur):
+        return 'non_lus_enseignant' if expediteur == 'eleve' else 'non_lus_eleve'
+
+    @classmethod
+    def enregistrer_message(cls, message):
+        """À appeler dans la transaction qui crée `message`."""
+        with transaction.atomic():
+            conversation, _ = cls.objects.select_for_update().get_or_create(eleve_id=message.eleve_id)
+            if conversation.dernier_message_date is None or message.date_envoi >= conversation.dernier_message_date:
+                conversation.dernier_message_contenu = extrait_message(message.contenu)
+                conversation.dernier_message_date = message.date_envoi
+                conversation.dernier_message_expediteur = message.expediteur
+            if not message.lu:
+                champ = cls.champ_non_lus(message.expediteur)
+                setattr(conversation, champ, F(champ) + 1)
+            conversation.save()
+
+    @classmethod
+    def marquer_lus(cls, eleve_id, expediteur):
+        """Marque comme lus les messages envoyés par `expediteur` et décrémente le compteur associé."""
+        champ = cls.champ_non_lus(expediteur)
+        with transaction.atomic():
+            nb = Message.objects.filter(eleve_id=eleve_id, expediteur=expediteur, lu=False).update(lu=True)
+            if nb:
+                cls.objects.filter(eleve_id=eleve_id).update(**{champ: F(champ) - nb})
+        return nb
+
+    @classmethod
+    def recalculer(cls, eleve_id):
+        """Reconstruit le résumé depuis la table Message (après une suppression, par exemple)."""
+        with transaction.atomic():
+            dernier = Message.objects.filter(eleve_id=eleve_id).order_by('-date_envoi', '-id').first()
+            if dernier is None:
+                cls.objects.filter(eleve_id=eleve_id).delete()
+                return
+            compteurs = Message.objects.filter(eleve_id=eleve_id, lu=False).aggregate(
+                non_lus_enseignant=Count('id', filter=Q(expediteur='eleve')),
+                non_lus_eleve=Count('id', filter=Q(expediteur='enseignant')),
+            )
+            cls.objects.update_or_create(eleve_id=eleve_id, defaults={
+                'dernier_message_contenu': extrait_message(dernier.contenu),
+                'dernier_message_date': dernier.date_envoi,
+                'dernier_message_expediteur': dernier.expediteur,
+                **compteurs,
+            })
+
 # --- À AJOUTER À LA FIN DE app/backend/main/models.py ---
 
 # ... (tous tes modèles existants Eleve, Fichier, Activite, etc. sont au-dessus) ...
@@ -139,8 +404,160 @@ class Notification(models.Model):
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
         ordering = ['-date_creation']
+        indexes = [
+            models.Index(fields=['destinataire', '-date_creation', '-id'], name='notif_dest_date_idx'),
+            models.Index(fields=['destinataire', 'lu', '-date_creation', '-id'], name='notif_dest_lu_date_idx'),
+            # Parcours par lots de la rétention (main/retention.py)
+            models.Index(fields=['lu', 'date_creation', 'id'], name='notif_lu_date_idx'),
+        ]
 
     def __str__(self):
         return f"Notification pour {self.destinataire.prenom} {self.destinataire.nom} : {self.message[:50]}"
 
-# --- FIN DE L'AJOUT ---
\ No newline at end of file
+def recalculer_notifications_non_lues(eleve_ids):
+    """Recalcule le compteur de badges depuis la table Notification (après une suppression, par exemple)."""
+    non_lues = Notification.objects.filter(
+        destinataire=OuterRef('pk'), lu=False
+    ).order_by().values('destinataire').annotate(n=Count('id')).values('n')
+    Eleve.objects.filter(pk__in=eleve_ids).update(
+        notifications_non_lues=Coalesce(Subquery(non_lues), 0)
+    )
+
+class NotificationArchivee(models.Model):
+    """
+    Notification retirée de la table active par la rétention (main/retention.py), conservée
+    pour consultation. Les listes et badges des élèves ne lisent jamais cette table.
+    """
+    notification_id = models.BigIntegerField(unique=True) # id d'origine : un lot rejoué n'archive pas deux fois
+    destinataire = models.ForeignKey(Eleve, on_delete=models.CASCADE, related_name='notifications_archivees')
+    message = models.CharField(max_length=255)
+    lu = models.BooleanField(default=False)
+    type_notification = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
+    lien_relatif = models.CharField(max_length=200, blank=True, null=True)
+    date_creation = models.DateTimeField()
+    date_archivage = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notification archivée"
+        verbose_name_plural = "Notifications archivées"
+        indexes = [models.Index(fields=['destinataire', '-date_creation'], name='notif_archive_dest_idx')]
+
+    def __str__(self):
+        return f"Notification archivée {self.notification_id} : {self.message[:50]}"
+
+# --- FIN DE L'AJOUT ---
+
+
+STATUTS_DIFFUSION = [
+    ('en_attente', 'En attente'),
+    ('en_cours', 'En cours'),
+    ('terminee', 'Terminée'),
+    ('echouee', 'Échouée'),
+]
+
+class DiffusionNotification(models.Model):
+    """
+    Diffusion d'une notification à des classes entières, traitée en arrière-plan.
+    Le message est formaté une seule fois ; le worker crée les notifications par lots
+    et mémorise le dernier élève traité pour pouvoir reprendre après une interruption.
+    """
+    classes_cibles = models.CharField(max_length=500, verbose_name="Classes cibles")
+    message = models.CharField(max_length=255, verbose_name="Message de notification")
+    type_notification = models.CharField(max_length=50, choices=NOTIFICATION_TYPES, verbose_name="Type")
+    lien_relatif = models.CharField(max_length=200, blank=True, null=True, verbose_name="Lien relatif (frontend)")
+    statut = models.CharField(max_length=20, choices=STATUTS_DIFFUSION, default='en_attente', verbose_name="Statut")
+    dernier_eleve_id = models.BigIntegerField(default=0, verbose_name="Dernier élève traité")
+    nb_notifications = models.PositiveIntegerField(default=0, verbose_name="Notifications créées")
+    # Bail du worker qui traite la diffusion, prolongé à chaque lot : seule une diffusion
+    # « en cours » dont le bail a expiré (worker arrêté) peut être reprise par un autre.
+    bail_expire_le = models.DateTimeField(null=True, blank=True, verbose_name="Fin du bail")
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Diffusion de notification"
+        verbose_name_plural = "Diffusions de notifications"
+        ordering = ['id']
+        indexes = [models.Index(fields=['statut', 'id'], name='diffusion_statut_idx')]
+
+    def __str__(self):
+        return f"{self.get_type_notification_display()} -> {self.classes_cibles} ({self.get_statut_display()})"
+
+class TermeEleve(models.Model):
+    """
+    Index de recherche des élèves : un mot replié (main/texte.py) de son nom ou prénom par
+    ligne. Une recherche par préfixe (`terme__startswith`, LIKE 'xyz%') parcourt un
+    intervalle de l'index de `terme` au lieu de balayer la table des élèves.
+    """
+    eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE, related_name='termes')
+    # db_index : sous PostgreSQL, Django ajoute l'index varchar_pattern_ops utilisé par LIKE 'xyz%'
+    terme = models.CharField(max_length=100, db_index=True)
+
+    class Meta:
+        unique_together = ['eleve', 'terme']
+
+    def __str__(self):
+        return self.terme
+
+TYPES_CONTENU = [('fichier', 'ملف'), ('activite', 'نشاط'), ('exercice', 'تمرين'), ('message', 'رسالة')]
+
+class TermeContenu(models.Model):
+    """
+    Index inversé de la recherche plein texte des enseignants : une ligne par (contenu,
+    terme) avec le poids du terme dans ce contenu (occurrences x poids du champ, voir
+    `champs_recherche`). Tenu à jour par save()/delete() des contenus et des messages.
+    """
+    type_contenu = models.CharField(max_length=10, choices=TYPES_CONTENU)
+    objet_id = models.BigIntegerField()
+    # db_index : comme pour TermeEleve, sert les recherches par préfixe LIKE 'xyz%'
+    terme = models.CharField(max_length=100, db_index=True)
+    poids = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        # Sert aussi la réindexation d'un contenu (préfixe type_contenu, objet_id)
+        unique_together = ['type_contenu', 'objet_id', 'terme']
+
+    def __str__(self):
+        return f"{self.type_contenu}:{self.objet_id} {self.terme}"
+
+STATUTS_TELEVERSEMENT = [
+    ('reception', 'Réception des morceaux'),
+    ('en_attente', 'Transfert en attente'),
+    ('en_cours', 'Transfert en cours'),
+    ('termine', 'Terminé'),
+    ('echoue', 'Échoué'),
+]
+
+class Televersement(models.Model):
+    """
+    Téléversement par morceaux d'un fichier d'enseignant (main/televersements.py). Les
+    morceaux sont ajoutés à un fichier local ; une fois complet, le transfert vers le
+    stockage configuré se fait en arrière-plan puis le Fichier (ou la pièce jointe de
+    l'activité) passe « prêt ».
+    """
+    cle = models.CharField(max_length=43, unique=True, editable=False)
+    cible = models.CharField(max_length=10, choices=[('fichier', 'Fichier'), ('activite', 'Activité')])
+    objet_id = models.BigIntegerField(null=True, blank=True) # Fichier créé à la fin, ou activité visée
+    nom_fichier = models.CharField(max_length=255)
+    taille = models.BigIntegerField()
+    taille_recue = models.BigIntegerField(default=0)
+    # Titre et classes du Fichier à créer (cible 'fichier')
+    titre = models.CharField(max_length=200, blank=True)
+    classes_cibles = models.CharField(max_length=500, default='all')
+    statut = models.CharField(max_length=20, choices=STATUTS_TELEVERSEMENT, default='reception')
+    erreur = models.TextField(blank=True)
+    # SHA-256 calculé au fil des morceaux (vide s'ils ont été reçus par plusieurs processus)
+    empreinte = models.CharField(max_length=64, blank=True)
+    # Fin du bail du worker qui mène le transfert (« en cours »), prolongé pendant la lecture
+    bail_expire_le = models.DateTimeField(null=True, blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Téléversement"
+        verbose_name_plural = "Téléversements"
+        indexes = [models.Index(fields=['statut', 'id'], name='televersement_statut_idx')]
+
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.taille_recue}/{self.taille}, {self.get_statut_display()})"
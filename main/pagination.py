@@ -0,0 +1,196 @@
+"""
+Pagination par clé (keyset / curseur) pour les listes qui grandissent sans limite.
+
+Le curseur contient les valeurs de tri de la dernière ligne renvoyée, par exemple
+(date_creation, id). La page suivante est obtenue par une comparaison lexicographique
+sur ces colonnes, servie par un index composite : une page profonde coûte autant que
+la première, contrairement à OFFSET. Les colonnes de tri ne doivent pas être NULL.
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+
+class KeysetPagination(BasePagination):
+    """
+    `ordering` peut être fixé sur la classe, sur la vue (`keyset_ordering`), ou déduit
+    du `order_by` du queryset. La clé primaire est ajoutée en dernier pour départager
+    les égalités, ce qui rend les curseurs stables.
+    """
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    ordering = None
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return self.paginer(
+            queryset, request.query_params.get(self.cursor_query_param), self.get_page_size(request), view
+        )
+
+    def paginer(self, queryset, curseur=None, page_size=None, view=None):
+        """Comme paginate_queryset, mais sans requête HTTP (curseur et taille explicites)."""
+        if page_size:
+            self.page_size = self.borner_page_size(page_size)
+        results = list(self.requete_page(queryset, curseur, view))
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def requete_page(self, queryset, curseur=None, view=None):
+        """Queryset (non évalué) de la page qui suit `curseur` : tri, filtre du curseur, LIMIT."""
+        self.ordering = self.get_ordering(queryset, view)
+        self.modele = queryset.model
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(curseur)
+        if position is not None:
+            queryset = queryset.filter(self.filtre_apres(position))
+
+        # Une ligne de plus pour savoir s'il existe une page suivante, sans COUNT.
+        return queryset[:self.page_size + 1]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        return self.borner_page_size(request.query_params.get(self.page_size_query_param))
+
+    def borner_page_size(self, demande):
+        try:
+            demande = int(demande)
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(demande, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        ordering = (
+            getattr(view, 'keyset_ordering', None)
+            or self.ordering
+            or queryset.query.order_by
+            or ('pk',)
+        )
+        pk_name = queryset.model._meta.pk.attname
+        ordering = [champ.replace('pk', pk_name) if champ.lstrip('-') == 'pk' else champ for champ in ordering]
+        if pk_name not in [champ.lstrip('-') for champ in ordering]:
+            # Départage dans le même sens que le dernier champ de tri.
+            ordering.append(('-' if ordering and ordering[-1].startswith('-') else '') + pk_name)
+        return tuple(ordering)
+
+    def filtre_apres(self, position):
+        """(a, b, c) > (x, y, z) en lexicographique, chaque champ dans son propre sens."""
+        filtre = Q()
+        egalites = {}
+        for champ, valeur in zip(self.ordering, position):
+            nom = champ.lstrip('-')
+            lookup = 'lt' if champ.startswith('-') else 'gt'
+            filtre |= Q(**egalites, **{f'{nom}__{lookup}': valeur})
+            egalites[nom] = valeur
+        return filtre
+
+    def valeurs_de_tri(self, obj):
+        valeurs = []
+        for champ in self.ordering:
+            nom = champ.lstrip('-')
+            valeur = obj[nom] if isinstance(obj, dict) else getattr(obj, nom)
+            valeurs.append(valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur)
+        return valeurs
+
+    def encode_cursor(self, position):
+        brut = json.dumps(position, separators=(',', ':'), default=str).encode('utf-8')
+        return base64.urlsafe_b64encode(brut).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, encoded):
+        """
+        Position du curseur, chaque valeur convertie au type de sa colonne de tri : un
+        curseur forgé (mauvais type, valeur nulle) donne 404 au lieu d'une erreur de l'ORM.
+        """
+        if not encoded:
+            return None
+        try:
+            brut = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position = json.loads(brut.decode('utf-8'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(position)
+            return [self.convertir_valeur(champ, valeur) for champ, valeur in zip(self.ordering, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def convertir_valeur(self, champ, valeur):
+        """Valeur JSON du curseur -> valeur Python du champ (ValueError/ValidationError sinon)."""
+        if valeur is None or isinstance(valeur, (dict, list, bool)):
+            raise ValueError(valeur)
+        valeur = self.modele._meta.get_field(champ.lstrip('-')).to_python(valeur)
+        if valeur is None:
+            raise ValueError(valeur)
+        if isinstance(valeur, datetime) and settings.USE_TZ and timezone.is_naive(valeur):
+            valeur = timezone.make_aware(valeur, dt_timezone.utc)
+        return valeur
+
+    def get_next_cursor(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.valeurs_de_tri(self.page[-1]))
+
+    def get_next_link(self):
+        return self.lien_pour_curseur(self.request, self.get_next_cursor())
+
+    def lien_pour_curseur(self, request, curseur, url=None):
+        """
+        Lien vers la page commençant après `curseur` (utile quand la page vient d'un cache).
+        `url` permet de pointer vers un autre endpoint que celui de la requête courante.
+        """
+        if curseur is None:
+            return None
+        url = url or request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, curseur)
+
+
+class ConversationPagination(KeysetPagination):
+    """Boîte de réception de l'enseignant : conversations les plus récentes d'abord."""
+    page_size = 30
+    max_page_size = 100
+    ordering = ('-dernier_message_date', '-eleve_id')
+
+
+class NotificationPagination(KeysetPagination):
+    ordering = ('-date_creation', '-id')
+
+
+class MessagePagination(KeysetPagination):
+    # Fil de discussion dans l'ordre chronologique.
+    ordering = ('date_envoi', 'id')
+
+
+class NotePagination(KeysetPagination):
+    ordering = ('-date_attribution', '-id')
+
+
+class FichierPagination(KeysetPagination):
+    ordering = ('-date_upload', '-id')
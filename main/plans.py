@@ -0,0 +1,58 @@
+"""
+Plans d'exécution des requêtes critiques, vérifiés par main/tests.py.
+
+Les tests construisent les querysets avec les mêmes fonctions que les vues
+(main/sections_eleve.py, `projeter`, `requete_page` de la pagination...), puis
+`parcours_complets()` lance EXPLAIN sur la base de test et relève les parcours complets
+de table, qui indiquent un index manquant ou inutilisable.
+"""
+import re
+
+from django.db import connection
+
+
+def _parcours_complets_sqlite(plan):
+    # « SCAN main_x » sans « USING ... INDEX » = lecture de toute la table.
+    return [ligne.strip() for ligne in plan.splitlines()
+            if re.search(r'\bSCAN\b', ligne) and 'INDEX' not in ligne and 'PRIMARY KEY' not in ligne]
+
+
+def _parcours_complets_postgresql(plan):
+    return [ligne.strip() for ligne in plan.splitlines() if 'Seq Scan' in ligne]
+
+
+def _parcours_complets_mysql(plan):
+    return [ligne.strip() for ligne in plan.splitlines() if re.search(r'"access_type":\s*"ALL"', ligne)]
+
+
+def expliquer(queryset):
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # Sur de petites tables, PostgreSQL préfère un Seq Scan même quand l'index existe :
+            # on le décourage pour vérifier que l'index est utilisable.
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            return queryset.explain()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = on')
+    if vendor == 'mysql':
+        return queryset.explain(format='JSON')
+    return queryset.explain()
+
+
+DETECTEURS = {
+    'sqlite': _parcours_complets_sqlite,
+    'postgresql': _parcours_complets_postgresql,
+    'mysql': _parcours_complets_mysql,
+}
+
+
+def parcours_complets(queryset):
+    """(plan, [lignes du plan qui lisent une table entière]) de `queryset`."""
+    detecteur = DETECTEURS.get(connection.vendor)
+    if detecteur is None:
+        raise NotImplementedError(f"Analyse des plans non prise en charge pour {connection.vendor}.")
+    plan = expliquer(queryset)
+    return plan, detecteur(plan)
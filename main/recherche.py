@@ -0,0 +1,188 @@
+"""
+Recherche des élèves par préfixes de mots, insensible à la casse, aux accents français
+et aux diacritiques / variantes orthographiques arabes (voir main/texte.py).
+
+Chaque élève a ses mots repliés dans TermeEleve, tenus à jour par Eleve.save() et par
+l'import en masse. « ben al » trouve « Ben Ali » comme « بن علي » : chaque mot saisi doit
+être le début d'un mot du nom ou du prénom.
+
+Recherche plein texte des contenus (exercices, activités, fichiers, messages) : même
+principe avec l'index inversé TermeContenu, tenu à jour par save()/delete() des modèles.
+Les termes sont en plus débarrassés des mots vides et de l'article arabe
+(`texte.termes_recherche`), et pondérés pour classer les résultats.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+
+from .models import Activite, Eleve, Exercice, Fichier, Message, TermeContenu, TermeEleve
+from .texte import racine, replier, termes, termes_ponderes, termes_recherche
+
+MOTS_MAX = 5 # Mots de la saisie pris en compte
+EXTRAIT_LONGUEUR = 160
+
+CONTENUS = {
+    'exercice': Exercice,
+    'activite': Activite,
+    'fichier': Fichier,
+    'message': Message,
+}
+
+
+def termes_eleve(eleve):
+    return [terme[:100] for terme in termes(eleve.nom, eleve.prenom)]
+
+
+def indexer_eleves(eleves):
+    """(Ré)indexe des élèves déjà enregistrés : deux requêtes quel que soit leur nombre."""
+    eleves = [eleve for eleve in eleves if eleve.pk is not None]
+    if not eleves:
+        return
+    with transaction.atomic():
+        TermeEleve.objects.filter(eleve_id__in=[eleve.pk for eleve in eleves]).delete()
+        TermeEleve.objects.bulk_create([
+            TermeEleve(eleve_id=eleve.pk, terme=terme) for eleve in eleves for terme in termes_eleve(eleve)
+        ])
+
+
+def rechercher_eleves(saisie, queryset=None):
+    """Filtre `queryset` (tous les élèves par défaut) sur les préfixes de mots de `saisie`."""
+    queryset = Eleve.objects.all() if queryset is None else queryset
+    mots = termes(saisie)[:MOTS_MAX]
+    if not mots:
+        return queryset.none()
+    for mot in mots:
+        queryset = queryset.filter(id__in=TermeEleve.objects.filter(terme__startswith=mot).values('eleve_id'))
+    return queryset
+
+
+def _type_contenu(modele):
+    return modele._meta.model_name
+
+
+def indexer_contenus(objets):
+    """(Ré)indexe des contenus déjà enregistrés (d'un même modèle) : deux requêtes."""
+    objets = [objet for objet in objets if objet.pk is not None]
+    if not objets:
+        return
+    type_contenu = _type_contenu(type(objets[0]))
+    with transaction.atomic():
+        TermeContenu.objects.filter(type_contenu=type_contenu, objet_id__in=[objet.pk for objet in objets]).delete()
+        TermeContenu.objects.bulk_create([
+            TermeContenu(type_contenu=type_contenu, objet_id=objet.pk, terme=terme, poids=poids)
+            for objet in objets
+            for terme, poids in termes_ponderes(
+                *((getattr(objet, champ), poids_champ) for champ, poids_champ in objet.champs_recherche)
+            ).items()
+        ])
+
+
+def desindexer_contenus(modele, ids):
+    """`ids` : liste ou sous-requête d'identifiants (ex. les messages d'un élève supprimé)."""
+    TermeContenu.objects.filter(type_contenu=_type_contenu(modele), objet_id__in=ids).delete()
+
+
+def _filtre_classe(types, classe):
+    """Restreint chaque type de contenu à ceux de la classe, par sous-requêtes indexées."""
+    condition = Q()
+    for type_contenu in types:
+        modele = CONTENUS[type_contenu]
+        if modele is Message:
+            ids = Message.objects.filter(eleve__classe=classe).values('id')
+        else:
+            relation = modele.classes.through
+            ids = relation.objects.filter(classe_id=classe).values(f'{type_contenu}_id')
+        condition |= Q(type_contenu=type_contenu, objet_id__in=ids)
+    return condition
+
+
+def rechercher_contenus(saisie, types=None, classe=None, debut=0, limite=20):
+    """
+    Contenus contenant tous les mots de `saisie` (en préfixe), classés par score (somme des
+    poids des termes trouvés), puis du plus récent au plus ancien. Une seule requête
+    GROUP BY sur l'index : [{'type_contenu', 'objet_id', 'score'}, ...].
+    """
+    mots = termes_recherche(saisie)[:MOTS_MAX]
+    if not mots:
+        return []
+    types = [type_contenu for type_contenu in (types or CONTENUS) if type_contenu in CONTENUS]
+    conditions = [Q(terme__startswith=mot) for mot in mots]
+    correspondances = Q()
+    for condition in conditions:
+        correspondances |= condition
+    index = TermeContenu.objects.filter(correspondances, type_contenu__in=types)
+    if classe:
+        index = index.filter(_filtre_classe(types, classe))
+    resultats = index.values('type_contenu', 'objet_id').annotate(score=Sum('poids'))
+    if len(mots) > 1:
+        # Chaque mot saisi doit correspondre à au moins un terme du contenu (HAVING).
+        presences = {
+            f'mot_{i}': Max(Case(When(condition, then=Value(1)), default=Value(0), output_field=IntegerField()))
+            for i, condition in enumerate(conditions)
+        }
+        resultats = resultats.annotate(**presences).filter(**{nom: 1 for nom in presences})
+    resultats = resultats.order_by('-score', '-objet_id', 'type_contenu')[debut:debut + limite]
+    return [
+        {'type_contenu': ligne['type_contenu'], 'objet_id': ligne['objet_id'], 'score': ligne['score']}
+        for ligne in resultats
+    ]
+
+
+def extrait(texte, mots, longueur=EXTRAIT_LONGUEUR):
+    """Passage de `texte` autour du premier mot qui correspond à la saisie."""
+    texte = texte or ''
+    if len(texte) <= longueur:
+        return texte
+    debut = 0
+    for correspondance in re.finditer(r'\w+', texte):
+        forme = replier(correspondance.group())
+        if any(racine(forme).startswith(mot) or forme.startswith(mot) for mot in mots):
+            debut = max(0, correspondance.start() - longueur // 4)
+            break
+    morceau = texte[debut:debut + longueur]
+    return ('...' if debut else '') + morceau + ('...' if debut + longueur < len(texte) else '')
+
+
+def _resume(type_contenu, objet, mots):
+    if type_contenu == 'message':
+        return {'titre': None, 'extrait': extrait(objet.contenu, mots), 'date': objet.date_envoi,
+                'eleve': objet.eleve_id, 'expediteur': objet.expediteur}
+    if type_contenu == 'fichier':
+        return {'titre': objet.titre, 'extrait': '', 'date': objet.date_upload}
+    texte = objet.enonce if type_contenu == 'exercice' else objet.description
+    return {'titre': objet.titre, 'extrait': extrait(texte, mots), 'date': objet.date_creation}
+
+
+CHAMPS_RESUME = {
+    'exercice': ('id', 'titre', 'enonce', 'date_creation'),
+    'activite': ('id', 'titre', 'description', 'date_creation'),
+    'fichier': ('id', 'titre', 'date_upload'),
+    'message': ('id', 'contenu', 'date_envoi', 'eleve_id', 'expediteur'),
+}
+
+
+def resumer_resultats(resultats, saisie):
+    """
+    Complète les résultats de rechercher_contenus (une requête par type présent). Les
+    entrées dont le contenu a disparu sans passer par delete() (suppression en masse)
+    sont ignorées.
+    """
+    ids_par_type = {}
+    for resultat in resultats:
+        ids_par_type.setdefault(resultat['type_contenu'], []).append(resultat['objet_id'])
+    objets = {
+        (type_contenu, objet.pk): objet
+        for type_contenu, ids in ids_par_type.items()
+        for objet in CONTENUS[type_contenu].objects.filter(pk__in=ids).only(*CHAMPS_RESUME[type_contenu])
+    }
+    mots = termes_recherche(saisie)[:MOTS_MAX]
+    resumes = []
+    for resultat in resultats:
+        objet = objets.get((resultat['type_contenu'], resultat['objet_id']))
+        if objet is not None:
+            resumes.append({
+                'type': resultat['type_contenu'], 'id': objet.pk, 'score': resultat['score'],
+                **_resume(resultat['type_contenu'], objet, mots),
+            })
+    return resumes
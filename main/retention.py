@@ -0,0 +1,111 @@
+"""
+Rétention des notifications : sans elle, chaque diffusion ajoute une ligne par élève et la
+table Notification grossit sans fin.
+
+Deux politiques, réglables dans les settings ou par `manage.py purger_notifications` :
+- `lues_jours` : les notifications lues plus anciennes que N jours sont retirées ;
+- `max_par_eleve` : au-delà des M plus récentes d'un élève, les plus anciennes le sont
+  aussi (lues ou non ; son compteur de badges est alors recalculé).
+
+Les lignes sont retirées par petits lots, chacun dans sa propre transaction, en avançant
+une clé de parcours (pagination par clé) plutôt qu'avec un seul DELETE : les verrous
+restent courts et les lectures des élèves ne sont pas bloquées. Avec `archiver`, chaque
+lot est d'abord copié dans NotificationArchivee, dans la même transaction.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Notification, NotificationArchivee, recalculer_notifications_non_lues
+
+TAILLE_LOT_DEFAUT = 500
+
+COLONNES = ['id', 'destinataire_id', 'message', 'lu', 'type_notification', 'lien_relatif', 'date_creation']
+
+
+def politique_par_defaut():
+    """Politique des settings ; 0 ou None désactive une règle."""
+    return {
+        'lues_jours': getattr(settings, 'NOTIFICATIONS_RETENTION_LUES_JOURS', None),
+        'max_par_eleve': getattr(settings, 'NOTIFICATIONS_RETENTION_MAX_PAR_ELEVE', None),
+        'archiver': getattr(settings, 'NOTIFICATIONS_RETENTION_ARCHIVER', False),
+    }
+
+
+def _retirer(ids, archiver):
+    """Archive (optionnellement) puis supprime un lot ; recalcule les badges touchés."""
+    with transaction.atomic():
+        lignes = list(Notification.objects.filter(id__in=ids).values(*COLONNES))
+        if archiver:
+            NotificationArchivee.objects.bulk_create([
+                NotificationArchivee(notification_id=ligne['id'], **{c: v for c, v in ligne.items() if c != 'id'})
+                for ligne in lignes
+            ], ignore_conflicts=True)
+        supprimees, _ = Notification.objects.filter(id__in=[ligne['id'] for ligne in lignes]).delete()
+        non_lues = {ligne['destinataire_id'] for ligne in lignes if not ligne['lu']}
+        if non_lues:
+            recalculer_notifications_non_lues(non_lues)
+    return supprimees
+
+
+def _limite(jours):
+    return timezone.now() - timedelta(days=jours)
+
+
+def lues_anciennes(jours):
+    return Notification.objects.filter(lu=True, date_creation__lt=_limite(jours))
+
+
+def _par_lots(candidates, taille_lot, archiver, pause):
+    """
+    Retire `candidates` par lots, en avançant la clé (date_creation, id) du dernier lot
+    (pas d'OFFSET, et une ligne qui résiste n'est jamais relue). Génère le nombre retiré par lot.
+    """
+    candidates = candidates.order_by('date_creation', 'id')
+    cle = None
+    while True:
+        lot = candidates
+        if cle is not None:
+            lot = lot.filter(Q(date_creation__gt=cle[0]) | Q(date_creation=cle[0], id__gt=cle[1]))
+        lot = list(lot.values_list('date_creation', 'id')[:taille_lot])
+        if not lot:
+            return
+        cle = lot[-1]
+        yield _retirer([notification_id for _, notification_id in lot], archiver)
+        if pause:
+            time.sleep(pause) # Laisse passer les écritures concurrentes entre deux lots
+
+
+def purger_lues(jours, taille_lot=TAILLE_LOT_DEFAUT, archiver=False, pause=0):
+    """Retire les notifications lues de plus de `jours` jours (index notif_lu_date_idx)."""
+    return _par_lots(lues_anciennes(jours), taille_lot, archiver, pause)
+
+
+def eleves_en_exces(max_par_eleve):
+    """{eleve_id: nombre de notifications} des élèves qui en ont plus de `max_par_eleve`."""
+    return dict(
+        Notification.objects.order_by().values('destinataire').annotate(nb=Count('id'))
+        .filter(nb__gt=max_par_eleve).values_list('destinataire', 'nb')
+    )
+
+
+def purger_excedent(max_par_eleve, taille_lot=TAILLE_LOT_DEFAUT, archiver=False, pause=0):
+    """
+    Ne garde que les `max_par_eleve` notifications les plus récentes de chaque élève : tout
+    ce qui précède la plus ancienne conservée est retiré (index notif_dest_date_idx).
+    """
+    if max_par_eleve < 1:
+        raise ValueError("max_par_eleve doit être au moins 1.")
+    for eleve_id in sorted(eleves_en_exces(max_par_eleve)):
+        notifications = Notification.objects.filter(destinataire_id=eleve_id)
+        date_gardee, id_garde = notifications.order_by('-date_creation', '-id').values_list(
+            'date_creation', 'id'
+        )[max_par_eleve - 1]
+        yield from _par_lots(
+            notifications.filter(Q(date_creation__lt=date_gardee) | Q(date_creation=date_gardee, id__lt=id_garde)),
+            taille_lot, archiver, pause,
+        )
@@ -0,0 +1,175 @@
+"""
+Construction des données des endpoints élèves, partagée entre les vues individuelles
+(`fichiers_eleve`, `note_eleve`...) et le tableau de bord agrégé (`dashboard_eleve`).
+
+Chaque section reçoit l'élève déjà résolu et s'exécute en un nombre fixe de requêtes.
+Les sections paginées renvoient la première page (ou celle du curseur) avec un lien
+`next` vers leur propre endpoint.
+"""
+from .cache_contenus import liste_classe
+from .models import Activite, CompletionActivite, Exercice, Fichier, Message, Note, Notification, ReponseExercice
+from .pagination import FichierPagination, MessagePagination, NotePagination, NotificationPagination
+from .serializers import (
+    ActiviteSerializer, ExerciceSerializer, FichierSerializer, MessageSerializer, NoteSerializer,
+    NotificationSerializer, champs_demandes, projeter,
+)
+
+
+# Requêtes des sections, partagées avec les tests de plans d'exécution (main/tests.py).
+
+def requete_fichiers(eleve):
+    return Fichier.objects.filter(classes=eleve.classe, statut='pret')
+
+
+def requete_activites(eleve):
+    return Activite.objects.filter(classes=eleve.classe).order_by('-date_creation')
+
+
+def requete_exercices(eleve):
+    return Exercice.objects.filter(classes=eleve.classe).order_by('-date_creation')
+
+
+def requete_completions(eleve):
+    return CompletionActivite.objects.filter(eleve_id=eleve.id)
+
+
+def requete_reponses(eleve):
+    return ReponseExercice.objects.filter(eleve_id=eleve.id)
+
+
+def requete_notes(eleve):
+    return Note.objects.filter(eleve_id=eleve.id)
+
+
+def requete_messages(eleve):
+    return Message.objects.filter(eleve_id=eleve.id)
+
+
+def requete_notifications(eleve, lu=None):
+    queryset = Notification.objects.filter(destinataire_id=eleve.id)
+    if lu is not None:
+        queryset = queryset.filter(lu=lu)
+    return queryset
+
+
+def pagination_demandee(request):
+    """(curseur, taille de page) demandés dans la query string."""
+    return request.query_params.get('cursor'), request.query_params.get('page_size')
+
+
+def champs_section(request):
+    """`?fields=` / `?omit=` d'un endpoint dédié, en arguments nommés pour une section."""
+    champs, omis = champs_demandes(request)
+    return {'champs': champs, 'omis': omis}
+
+
+def _page(paginator, queryset, serializer_class, request, curseur=None, page_size=None, url=None, champs=None, omis=None):
+    serializer = serializer_class(champs=champs, omis=omis)
+    page = paginator.paginer(projeter(queryset, serializer, garder=paginator.ordering), curseur, page_size)
+    return {
+        'next': paginator.lien_pour_curseur(request, paginator.get_next_cursor(), url),
+        'results': serializer_class(page, many=True, champs=champs, omis=omis).data,
+    }
+
+
+def _variante_champs(champs, omis):
+    # Une liste partielle est mise en cache sous sa propre clé.
+    return f"{','.join(champs or ())}|{','.join(omis or ())}" if champs or omis else ''
+
+
+def fichiers(request, eleve, curseur=None, page_size=None, url=None, champs=None, omis=None):
+    paginator = FichierPagination()
+    page_size = paginator.borner_page_size(page_size)
+
+    def calculer(): # Page commune à toute la classe
+        serializer = FichierSerializer(champs=champs, omis=omis)
+        fichiers = projeter(requete_fichiers(eleve), serializer, garder=paginator.ordering)
+        page = paginator.paginer(fichiers, curseur, page_size)
+        return {
+            'results': [dict(item) for item in FichierSerializer(page, many=True, champs=champs, omis=omis).data],
+            'next_cursor': paginator.get_next_cursor(),
+        }
+
+    variante = f"{curseur or ''}:{page_size}:{_variante_champs(champs, omis)}"
+    partage = liste_classe('fichiers', eleve.classe, calculer, variante=variante)
+    return {
+        'next': paginator.lien_pour_curseur(request, partage['next_cursor'], url),
+        'results': partage['results'],
+    }
+
+
+def _avec_id(champs, omis):
+    """
+    Les données propres à l'élève sont fusionnées par id : il est toujours lu, puis
+    retiré de la réponse s'il n'était pas demandé.
+    """
+    masquer = (champs is not None and 'id' not in champs) or bool(omis and 'id' in omis)
+    if champs is not None and 'id' not in champs:
+        champs = (*champs, 'id')
+    if omis:
+        omis = tuple(c for c in omis if c != 'id')
+    return champs, omis, masquer
+
+
+def _fusionner(partage, champ, valeur, masquer_id):
+    if partage and champ not in partage[0]:
+        lignes = partage
+    else:
+        lignes = [{**item, champ: valeur(item['id'])} for item in partage]
+    if masquer_id:
+        lignes = [{cle: v for cle, v in item.items() if cle != 'id'} for item in lignes]
+    return lignes
+
+
+def activites(request, eleve, champs=None, omis=None):
+    champs, omis, masquer_id = _avec_id(champs, omis)
+
+    def calculer(): # Liste commune à toute la classe, sans la complétion
+        activites = projeter(requete_activites(eleve), ActiviteSerializer(champs=champs, omis=omis))
+        serializer = ActiviteSerializer(
+            activites, many=True, context={'request': request, 'completions': {}}, champs=champs, omis=omis
+        )
+        return [dict(item) for item in serializer.data]
+
+    partage = liste_classe('activites', eleve.classe, calculer, variante=_variante_champs(champs, omis))
+    completions = {}
+    if partage and 'completion_status' in partage[0]:
+        # Toutes les complétions de l'élève en une requête (évite une requête par activité)
+        completions = dict(requete_completions(eleve).values_list('activite_id', 'completee'))
+    return _fusionner(partage, 'completion_status', lambda id: completions.get(id, False), masquer_id)
+
+
+def exercices(request, eleve, champs=None, omis=None):
+    champs, omis, masquer_id = _avec_id(champs, omis)
+
+    def calculer(): # Liste commune à toute la classe, sans la réponse de l'élève
+        exercices = projeter(requete_exercices(eleve), ExerciceSerializer(champs=champs, omis=omis))
+        serializer = ExerciceSerializer(
+            exercices, many=True, context={'request': request, 'reponses': {}}, champs=champs, omis=omis
+        )
+        return [dict(item) for item in serializer.data]
+
+    partage = liste_classe('exercices', eleve.classe, calculer, variante=_variante_champs(champs, omis))
+    reponses = {}
+    if partage and 'reponse_eleve' in partage[0]:
+        # Toutes les réponses de l'élève en une requête (évite une requête par exercice)
+        reponses = {r.exercice_id: r for r in requete_reponses(eleve)}
+    return _fusionner(
+        partage, 'reponse_eleve',
+        lambda id: ExerciceSerializer._reponse_data(reponses[id]) if id in reponses else None,
+        masquer_id
+    )
+
+
+def notes(request, eleve, curseur=None, page_size=None, url=None, champs=None, omis=None):
+    return _page(NotePagination(), requete_notes(eleve), NoteSerializer, request, curseur, page_size, url, champs, omis)
+
+
+def messages(request, eleve, curseur=None, page_size=None, url=None, champs=None, omis=None):
+    return _page(MessagePagination(), requete_messages(eleve), MessageSerializer, request, curseur, page_size, url, champs, omis)
+
+
+def notifications(request, eleve, curseur=None, page_size=None, url=None, lu=None, champs=None, omis=None):
+    return _page(
+        NotificationPagination(), requete_notifications(eleve, lu), NotificationSerializer, request, curseur, page_size, url, champs, omis
+    )
@@ -2,26 +2,113 @@
 from rest_framework import serializers
 from .models import *
 
-class EleveSerializer(serializers.ModelSerializer):
+
+def champs_demandes(request):
+    """
+    Champs demandés par `?fields=a,b` (ne garder que ceux-là) et `?omit=c,d` (les retirer).
+    Retourne (champs, omis), chacun None si absent.
+    """
+    def lire(nom):
+        valeur = request.query_params.get(nom) if request is not None else None
+        if not valeur:
+            return None
+        return tuple(dict.fromkeys(c.strip() for c in valeur.split(',') if c.strip()))
+    return lire('fields'), lire('omit')
+
+
+class ChampsDynamiquesMixin:
+    """
+    Serializer dont on peut restreindre les champs : `champs` (à garder) et `omis` (à retirer),
+    en arguments ou via `champs_demandes(request)`. Les noms inconnus sont ignorés.
+    Voir `projeter` pour limiter d'autant les colonnes lues en base.
+    """
+    def __init__(self, *args, champs=None, omis=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        retires = set(self.fields) - set(champs) if champs is not None else set()
+        retires |= set(omis or ()) & set(self.fields)
+        for nom in retires:
+            self.fields.pop(nom)
+
+
+def projeter(queryset, serializer, garder=()):
+    """
+    Restreint `queryset` aux colonnes dont `serializer` a besoin : les champs concrets qu'il
+    n'affiche pas sont différés (defer), les relations qu'il traverse sont jointes
+    (select_related). La clé primaire, les champs de tri du queryset et ceux de `garder`
+    (tri de la pagination) sont toujours lus.
+    """
+    serializer = getattr(serializer, 'child', serializer)
+    racines = {champ.lstrip('-') for champ in (*queryset.query.order_by, *garder)}
+    jointures = set()
+    for champ in serializer.fields.values():
+        if isinstance(champ, serializers.SerializerMethodField):
+            continue # Les get_* de ce module n'utilisent que obj.id
+        if champ.source == '*':
+            return queryset # Le champ a besoin de l'objet entier
+        racine, _, reste = champ.source.partition('.')
+        racines.add(racine)
+        racines.update(getattr(champ, 'colonnes_lues', ())) # Colonnes lues en plus de la source
+        if reste or isinstance(champ, serializers.BaseSerializer):
+            jointures.add(racine)
+
+    modele = queryset.model
+    relations = {f.name for f in modele._meta.concrete_fields if f.is_relation}
+    jointures &= relations
+    deja_joints = queryset.query.select_related
+    deja_joints = set(deja_joints) if isinstance(deja_joints, dict) else (relations if deja_joints else set())
+    a_differer = [
+        f.name for f in modele._meta.concrete_fields
+        if not f.primary_key and f.name not in racines and f.name not in deja_joints | jointures
+    ]
+    if jointures:
+        queryset = queryset.select_related(*jointures)
+    return queryset.defer(*a_differer) if a_differer else queryset
+
+
+class EleveSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Eleve
-        fields = '__all__'
+        exclude = ['nom_normalise', 'prenom_normalise'] # Formes internes pour la connexion
+
+class EleveResumeSerializer(EleveSerializer):
+    """Élève imbriqué dans une autre ressource : sans le compteur de badges, qui change sans elle."""
+    class Meta(EleveSerializer.Meta):
+        exclude = [*EleveSerializer.Meta.exclude, 'notifications_non_lues']
+
+class FichierUrlField(serializers.FileField):
+    """
+    URL du fichier tirée de `url_publique`, enregistrée à l'envoi, au lieu d'un appel au
+    stockage par ligne. Repli sur le stockage pour les fichiers pas encore renseignés.
+    """
+    colonnes_lues = ('url_publique',)
+
+    def to_representation(self, value):
+        url = getattr(getattr(value, 'instance', None), 'url_publique', '')
+        if not url:
+            return super().to_representation(value)
+        request = self.context.get('request', None)
+        return request.build_absolute_uri(url) if request is not None else url
+
+class FichierSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    fichier = FichierUrlField()
 
-class FichierSerializer(serializers.ModelSerializer):
     class Meta:
         model = Fichier
-        fields = '__all__'
+        exclude = ['classes', 'blob', 'url_publique'] # Ciblage normalisé, blob de stockage et URL servie par `fichier`
 
-class ActiviteSerializer(serializers.ModelSerializer):
+class ActiviteSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     completion_status = serializers.SerializerMethodField()
     
     class Meta:
         model = Activite
-        fields = '__all__' # Conserve tous les champs pour l'enseignant
+        exclude = ['classes', 'blob_joint'] # Conserve tous les champs pour l'enseignant (sauf le ciblage normalisé et le blob)
     
     def get_completion_status(self, obj):
         # Ce champ est plus pertinent pour la vue élève.
         # Pour l'enseignant, on aura une vue dédiée à la progression.
+        completions = self.context.get('completions')
+        if completions is not None: # Complétions chargées en une seule requête par la vue
+            return completions.get(obj.id, False)
         request = self.context.get('request')
         if request and hasattr(request, 'eleve_id'): # Contexte pour élève
             try:
@@ -34,7 +121,7 @@ class ActiviteSerializer(serializers.ModelSerializer):
                 return False
         return None # Retourne None si pas de contexte élève
 
-class CompletionActiviteEleveSerializer(serializers.ModelSerializer):
+class CompletionActiviteEleveSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     eleve_nom = serializers.CharField(source='eleve.nom', read_only=True)
     eleve_prenom = serializers.CharField(source='eleve.prenom', read_only=True)
     eleve_classe = serializers.CharField(source='eleve.classe', read_only=True)
@@ -44,16 +131,20 @@ class CompletionActiviteEleveSerializer(serializers.ModelSerializer):
         fields = ['eleve_id', 'eleve_nom', 'eleve_prenom', 'eleve_classe', 'completee', 'date_completion']
 
 
-class ExerciceSerializer(serializers.ModelSerializer):
+class ExerciceSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     reponse_eleve = serializers.SerializerMethodField()
     
     class Meta:
         model = Exercice
-        fields = '__all__' # Conserve tous les champs pour l'enseignant
+        exclude = ['classes'] # Conserve tous les champs pour l'enseignant (sauf le ciblage normalisé)
     
     def get_reponse_eleve(self, obj):
         # Ce champ est plus pertinent pour la vue élève.
         # Pour l'enseignant, on aura une vue dédiée aux réponses.
+        reponses = self.context.get('reponses')
+        if reponses is not None: # Réponses chargées en une seule requête par la vue
+            reponse = reponses.get(obj.id)
+            return self._reponse_data(reponse) if reponse else None
         request = self.context.get('request')
         if request and hasattr(request, 'eleve_id'): # Contexte pour élève
             try:
@@ -61,23 +152,27 @@ class ExerciceSerializer(serializers.ModelSerializer):
                     eleve_id=request.eleve_id,
                     exercice=obj
                 )
-                return {
-                    'reponse_id': reponse.id,
-                    'reponse': reponse.reponse,
-                    'note': float(reponse.note) if reponse.note else None,
-                    'corrigee': reponse.corrigee
-                }
+                return self._reponse_data(reponse)
             except ReponseExercice.DoesNotExist:
                 return None
         return None # Retourne None si pas de contexte élève
 
+    @staticmethod
+    def _reponse_data(reponse):
+        return {
+            'reponse_id': reponse.id,
+            'reponse': reponse.reponse,
+            'note': float(reponse.note) if reponse.note else None,
+            'corrigee': reponse.corrigee
+        }
 
-class ReponseExerciceSerializer(serializers.ModelSerializer): # Pour soumission par l'élève
+
+class ReponseExerciceSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer): # Pour soumission par l'élève
     class Meta:
         model = ReponseExercice
         fields = '__all__'
 
-class ReponseExerciceDetailSerializer(serializers.ModelSerializer): # Pour la vue enseignant
+class ReponseExerciceDetailSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer): # Pour la vue enseignant
     eleve_nom = serializers.CharField(source='eleve.nom', read_only=True)
     eleve_prenom = serializers.CharField(source='eleve.prenom', read_only=True)
     eleve_classe = serializers.CharField(source='eleve.classe', read_only=True)
@@ -87,23 +182,28 @@ class ReponseExerciceDetailSerializer(serializers.ModelSerializer): # Pour la vu
         fields = ['id', 'eleve', 'eleve_nom', 'eleve_prenom', 'eleve_classe', 'exercice', 'reponse', 'corrigee', 'note', 'date_soumission']
         read_only_fields = ['eleve', 'exercice', 'reponse', 'date_soumission'] # L'enseignant modifie corrigee et note
 
-class NoteSerializer(serializers.ModelSerializer):
-    eleve_details = EleveSerializer(source='eleve', read_only=True) # Pour afficher les détails de l'élève avec la note
+class CorrectionSerializer(serializers.Serializer): # Un élément de la correction groupée
+    id = serializers.IntegerField()
+    note = serializers.DecimalField(max_digits=4, decimal_places=2, min_value=0, max_value=20, allow_null=True, required=False)
+    corrigee = serializers.BooleanField(required=False)
+
+class NoteSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    eleve_details = EleveResumeSerializer(source='eleve', read_only=True) # Pour afficher les détails de l'élève avec la note
     class Meta:
         model = Note
         fields = ['id', 'eleve', 'eleve_details', 'note', 'commentaire', 'date_attribution']
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = '__all__'
 
 class ConversationSerializer(serializers.Serializer): # Pour la liste des conversations de l'enseignant
     eleve_id = serializers.IntegerField()
-    eleve_nom = serializers.CharField()
-    eleve_prenom = serializers.CharField()
-    eleve_classe = serializers.CharField()
+    eleve_nom = serializers.CharField(source='eleve.nom')
+    eleve_prenom = serializers.CharField(source='eleve.prenom')
+    eleve_classe = serializers.CharField(source='eleve.classe')
     dernier_message_contenu = serializers.CharField(allow_null=True)
     dernier_message_date = serializers.DateTimeField(allow_null=True)
     dernier_message_expediteur = serializers.CharField(allow_null=True)
@@ -113,7 +213,7 @@ class ConversationSerializer(serializers.Serializer): # Pour la liste des conver
 
 # ... (tous tes serializers existants sont au-dessus) ...
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # Optionnel: Si tu veux afficher plus de détails que juste l'ID du destinataire.
     # destinataire_details = EleveSerializer(source='destinataire', read_only=True)
 
@@ -0,0 +1,170 @@
+"""
+Stockage local des médias et vue de téléchargement, pour les installations auto-hébergées
+et les tests (DEFAULT_FILE_STORAGE=main.stockage.StockageLocal).
+
+`servir_media` répond aux URLs MEDIA_URL des fichiers et pièces jointes :
+- fichier envoyé par morceaux : sous WSGI par FileResponse (wsgi.file_wrapper peut le
+  transmettre par os.sendfile) ; sous ASGI (Procfile, workers uvicorn) par un itérateur
+  asynchrone qui lit un bloc à la fois dans un thread, sans sendfile — en production,
+  MEDIA_X_ACCEL_REDIRECT reste le moyen d'un envoi sans copie ;
+- requêtes Range (une plage) avec réponse 206, If-Range, 416 hors limites : lecture
+  vidéo et reprise des téléchargements ;
+- noms adressés par contenu (`blobs/...`, voir main/blobs.py) : le contenu d'une URL ne
+  change jamais, d'où un Cache-Control immuable d'un an et l'empreinte comme ETag ;
+- MEDIA_X_ACCEL_REDIRECT (ex. '/media-interne/') : l'envoi est délégué à nginx par
+  X-Accel-Redirect, la vue ne fait plus que les contrôles et les en-têtes.
+Avec un stockage distant (Cloudinary), la vue redirige vers l'URL du stockage.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse,
+)
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .envoi import sous_asgi
+
+PREFIXES_SERVIS = ('blobs/', 'fichiers/', 'activites/') # Jamais les téléversements en cours
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+CACHE_DEFAUT = 'public, max-age=3600'
+TAILLE_BLOC = 256 * 1024 # Lecture par bloc sous ASGI
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_BLOB = re.compile(r'^blobs/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$')
+
+
+class StockageLocal(FileSystemStorage):
+    """
+    FileSystemStorage sous MEDIA_ROOT, fichiers lisibles par tous (0o644) pour que nginx
+    puisse les servir directement avec X-Accel-Redirect.
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('file_permissions_mode', 0o644)
+        kwargs.setdefault('directory_permissions_mode', 0o755)
+        super().__init__(**kwargs)
+
+
+class _Tranche:
+    """
+    Plage d'un fichier ouvert, pour FileResponse sous WSGI : read() s'arrête à la fin de la
+    plage et fileno() permet à wsgi.file_wrapper d'utiliser sendfile (borné par Content-Length).
+    """
+    def __init__(self, fichier, debut, longueur):
+        fichier.seek(debut)
+        self.fichier = fichier
+        self.restant = longueur
+
+    def read(self, taille=-1):
+        taille = self.restant if taille is None or taille < 0 else min(taille, self.restant)
+        donnees = self.fichier.read(taille)
+        self.restant -= len(donnees)
+        return donnees
+
+    def fileno(self):
+        return self.fichier.fileno()
+
+    def close(self):
+        self.fichier.close()
+
+
+async def _blocs(fichier, debut, longueur):
+    """Plage d'un fichier lue bloc par bloc dans un thread, pour une réponse ASGI."""
+    lire = sync_to_async(fichier.read, thread_sensitive=False)
+    try:
+        fichier.seek(debut)
+        while longueur > 0:
+            bloc = await lire(min(TAILLE_BLOC, longueur))
+            if not bloc:
+                return
+            longueur -= len(bloc)
+            yield bloc
+    finally:
+        fichier.close()
+
+
+def plage_demandee(entete, taille):
+    """
+    (debut, fin) inclus pour un en-tête Range à une seule plage ; None si absent ou non
+    géré (plusieurs plages : réponse complète) ; ValueError si la plage est hors du fichier.
+    """
+    correspondance = _RANGE.match((entete or '').strip())
+    if not correspondance:
+        return None
+    debut, fin = correspondance.groups()
+    if not debut and not fin:
+        return None
+    if not debut: # bytes=-500 : les 500 derniers octets
+        debut, fin = max(taille - int(fin), 0), taille - 1
+    else:
+        debut, fin = int(debut), min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        raise ValueError(debut)
+    return debut, fin
+
+
+def _entetes_cache(response, nom, etag, modification):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modification)
+    response['Cache-Control'] = CACHE_IMMUABLE if _BLOB.match(nom) else CACHE_DEFAUT
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def servir_media(request, nom):
+    if not nom.startswith(PREFIXES_SERVIS) or '..' in nom.split('/'):
+        raise Http404('Fichier introuvable.')
+    try:
+        chemin = default_storage.path(nom)
+    except NotImplementedError: # Stockage distant : il sert lui-même ses fichiers
+        return HttpResponseRedirect(default_storage.url(nom))
+    try:
+        stat = os.stat(chemin)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('Fichier introuvable.')
+
+    blob = _BLOB.match(nom)
+    etag = f'"{blob.group(1)}"' if blob else f'"{int(stat.st_mtime)}-{stat.st_size}"'
+    if etag in [valeur.strip() for valeur in request.headers.get('If-None-Match', '').split(',')]:
+        return _entetes_cache(HttpResponseNotModified(), nom, etag, stat.st_mtime)
+    type_contenu = mimetypes.guess_type(nom)[0] or 'application/octet-stream'
+
+    accel = getattr(settings, 'MEDIA_X_ACCEL_REDIRECT', '')
+    if accel: # nginx gère l'envoi (sendfile) et les plages lui-même
+        response = HttpResponse(content_type=type_contenu)
+        response['X-Accel-Redirect'] = accel.rstrip('/') + '/' + quote(nom)
+        return _entetes_cache(response, nom, etag, stat.st_mtime)
+
+    entete_range = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range.strip() != etag and if_range.strip() != http_date(stat.st_mtime):
+        entete_range = None # Le fichier a changé : réponse complète
+    try:
+        plage = plage_demandee(entete_range, stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return _entetes_cache(response, nom, etag, stat.st_mtime)
+
+    debut, fin = plage or (0, stat.st_size - 1)
+    fichier = open(chemin, 'rb')
+    if sous_asgi(request):
+        response = StreamingHttpResponse(
+            _blocs(fichier, debut, fin - debut + 1), status=200 if plage is None else 206, content_type=type_contenu
+        )
+        response['Content-Length'] = fin - debut + 1
+    elif plage is None:
+        response = FileResponse(fichier, content_type=type_contenu)
+    else:
+        response = FileResponse(_Tranche(fichier, debut, fin - debut + 1), status=206, content_type=type_contenu)
+        response['Content-Length'] = fin - debut + 1
+    if plage is not None:
+        response['Content-Range'] = f'bytes {debut}-{fin}/{stat.st_size}'
+    return _entetes_cache(response, nom, etag, stat.st_mtime)
@@ -0,0 +1,349 @@
+"""
+Téléversements par morceaux, reprenables, des fichiers d'enseignants.
+
+Protocole (vues `teacher/uploads/...`) :
+1. POST : déclaration (nom, taille, cible) -> clé du téléversement ;
+2. PUT de morceaux successifs avec `Content-Range: bytes debut-fin/total`. Le début doit
+   être la taille déjà reçue : après une coupure, le client relit l'état (GET) et reprend
+   là où le serveur s'est arrêté (un morceau mal placé est refusé, 409, avec la taille reçue) ;
+3. POST .../complete/ : le Fichier est créé « en attente » et le transfert vers le
+   stockage configuré (Cloudinary en production) part dans un pool de threads.
+
+Les morceaux sont écrits au fil de l'eau dans un fichier local : une requête ne dure que
+le temps d'un morceau, une connexion lente n'occupe plus un worker pour tout le fichier,
+et l'envoi vers le stockage ne bloque plus aucune requête. Comme pour les diffusions,
+TELEVERSEMENTS_THREAD=False confie les transferts à `manage.py transferer_televersements`.
+
+L'empreinte SHA-256 du fichier (déduplication, main/blobs.py) est calculée au fil des
+morceaux par le processus qui les reçoit, puis enregistrée à la fin de la réception :
+le transfert n'a pas à relire le fichier pour la calculer. L'état d'un hachage ne se
+partage pas entre processus ; si les morceaux arrivent sur plusieurs, `stocker()` la
+recalcule au transfert.
+
+Le transfert est pris avec un bail (TELEVERSEMENTS_BAIL), prolongé pendant la lecture du
+fichier partiel. Seul un transfert dont le bail a expiré peut être repris, et le worker ne
+l'achève que s'il détient encore le bail : un transfert n'est pas mené deux fois.
+"""
+import hashlib
+import logging
+import os
+import re
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .blobs import liberer, stocker
+from .cache_contenus import invalider_classes
+from .diffusion import programmer_diffusion
+from .models import Activite, Fichier, Televersement, codes_classes_cibles
+from .versions import incrementer_classes
+
+logger = logging.getLogger(__name__)
+
+MORCEAU_MAX = 8 * 1024 * 1024 # Taille maximale d'un morceau (octets)
+TAILLE_MAX_DEFAUT = 1024 * 1024 * 1024
+TAILLE_LECTURE = 64 * 1024
+BAIL_DEFAUT = 300 # secondes
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+# Hachages en cours dans ce processus : {clé du téléversement: (octets hachés, sha256)}
+_hachages = {}
+_verrou_hachages = threading.Lock()
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'TELEVERSEMENTS_THREADS', 2), thread_name_prefix='televersement'
+)
+
+
+class ErreurTeleversement(Exception):
+    pass
+
+
+class TransfertRepris(Exception):
+    """Le bail a expiré et le transfert a été repris par un autre worker."""
+
+
+class _Bail:
+    """
+    Bail d'un worker sur un transfert « en cours ». Chaque écriture est conditionnelle à la
+    fin de bail posée par ce worker : une reprise par un autre la rend caduque.
+    """
+    def __init__(self, televersement_id):
+        self.televersement_id = televersement_id
+        self.duree = timedelta(seconds=getattr(settings, 'TELEVERSEMENTS_BAIL', BAIL_DEFAUT))
+        self.expire_le = None
+
+    def prendre(self):
+        self.expire_le = timezone.now() + self.duree
+        return Televersement.objects.filter(pk=self.televersement_id, statut='en_attente').update(
+            statut='en_cours', bail_expire_le=self.expire_le
+        )
+
+    def detenu(self):
+        return Televersement.objects.filter(pk=self.televersement_id, statut='en_cours', bail_expire_le=self.expire_le)
+
+    def prolonger(self):
+        """Prolonge le bail une fois son premier tiers écoulé ; TransfertRepris s'il a été perdu."""
+        if self.expire_le - timezone.now() > self.duree * 2 / 3:
+            return
+        expire_le = timezone.now() + self.duree
+        if not self.detenu().update(bail_expire_le=expire_le):
+            raise TransfertRepris(self.televersement_id)
+        self.expire_le = expire_le
+
+
+class _LectureSousBail:
+    """Fichier partiel dont chaque lecture prolonge le bail du transfert."""
+    def __init__(self, fichier, bail):
+        self.fichier = fichier
+        self.bail = bail
+
+    def read(self, *args):
+        self.bail.prolonger()
+        return self.fichier.read(*args)
+
+    def __getattr__(self, nom):
+        return getattr(self.fichier, nom)
+
+
+def _dossier():
+    dossier = Path(getattr(settings, 'TELEVERSEMENTS_DOSSIER', Path(settings.MEDIA_ROOT) / 'televersements'))
+    dossier.mkdir(parents=True, exist_ok=True)
+    return dossier
+
+
+def chemin_partiel(televersement):
+    return _dossier() / f'{televersement.cle}.part'
+
+
+def creer_televersement(nom_fichier, taille, cible='fichier', titre='', classes_cibles='all', activite_id=None):
+    nom_fichier = os.path.basename(nom_fichier or '').strip()
+    if not nom_fichier:
+        raise ErreurTeleversement("nom_fichier est requis.")
+    try:
+        taille = int(taille)
+    except (TypeError, ValueError):
+        raise ErreurTeleversement("taille doit être un nombre d'octets.")
+    taille_max = getattr(settings, 'TELEVERSEMENTS_TAILLE_MAX', TAILLE_MAX_DEFAUT)
+    if not 0 < taille <= taille_max:
+        raise ErreurTeleversement(f"taille doit être comprise entre 1 et {taille_max} octets.")
+    if cible == 'fichier':
+        if not titre:
+            raise ErreurTeleversement("titre est requis pour un fichier.")
+        objet_id = None
+    elif cible == 'activite':
+        if not Activite.objects.filter(pk=activite_id).exists():
+            raise ErreurTeleversement("activite doit désigner une activité existante.")
+        objet_id = activite_id
+    else:
+        raise ErreurTeleversement("cible doit valoir 'fichier' ou 'activite'.")
+
+    televersement = Televersement.objects.create(
+        cle=secrets.token_urlsafe(32), cible=cible, objet_id=objet_id, nom_fichier=nom_fichier[:255],
+        taille=taille, titre=titre[:200], classes_cibles=classes_cibles or 'all',
+    )
+    chemin_partiel(televersement).touch()
+    return televersement
+
+
+def debut_morceau(content_range, taille_recue):
+    """Position du morceau d'après Content-Range ; sans en-tête, le morceau suit ce qui est reçu."""
+    if not content_range:
+        return taille_recue
+    correspondance = _CONTENT_RANGE.match(content_range.strip())
+    if not correspondance:
+        raise ErreurTeleversement("Content-Range invalide (attendu : bytes debut-fin/total).")
+    return int(correspondance.group(1))
+
+
+def recevoir_morceau(televersement, flux, debut, longueur):
+    """
+    Écrit `longueur` octets de `flux` à la position `debut` du fichier partiel, par blocs
+    de TAILLE_LECTURE. L'avancement est enregistré par une mise à jour conditionnelle :
+    deux envois simultanés du même morceau ne comptent qu'une fois.
+    Retourne la taille reçue après écriture.
+    """
+    if televersement.statut != 'reception':
+        raise ErreurTeleversement("Ce téléversement ne reçoit plus de morceaux.")
+    if debut != televersement.taille_recue:
+        return None # Le client doit reprendre à taille_recue
+    if not 0 < longueur <= MORCEAU_MAX or debut + longueur > televersement.taille:
+        raise ErreurTeleversement(f"Morceau de 1 à {MORCEAU_MAX} octets, sans dépasser la taille déclarée.")
+
+    with _verrou_hachages:
+        hachage = _hachages.get(televersement.cle)
+    # Copie : l'état partagé n'avance que si ce morceau est celui qui est compté
+    sha = hachage[1].copy() if hachage and hachage[0] == debut else hashlib.sha256() if debut == 0 else None
+    ecrits = 0
+    with open(chemin_partiel(televersement), 'r+b') as partiel:
+        partiel.seek(debut)
+        while ecrits < longueur:
+            bloc = flux.read(min(TAILLE_LECTURE, longueur - ecrits))
+            if not bloc:
+                break # Connexion interrompue : on garde ce qui est arrivé
+            partiel.write(bloc)
+            if sha is not None:
+                sha.update(bloc)
+            ecrits += len(bloc)
+    if Televersement.objects.filter(pk=televersement.pk, taille_recue=debut).update(taille_recue=debut + ecrits):
+        if sha is not None:
+            with _verrou_hachages:
+                _hachages[televersement.cle] = (debut + ecrits, sha)
+    televersement.refresh_from_db(fields=['taille_recue'])
+    return televersement.taille_recue
+
+
+def terminer_televersement(televersement):
+    """Crée le Fichier « en attente » et programme le transfert. Retourne le Fichier (ou None)."""
+    if televersement.statut != 'reception':
+        raise ErreurTeleversement("Ce téléversement est déjà terminé.")
+    if televersement.taille_recue != televersement.taille:
+        raise ErreurTeleversement(
+            f"Téléversement incomplet : {televersement.taille_recue} octet(s) reçu(s) sur {televersement.taille}."
+        )
+    with _verrou_hachages:
+        hachage = _hachages.pop(televersement.cle, None)
+    if hachage and hachage[0] == televersement.taille:
+        televersement.empreinte = hachage[1].hexdigest()
+    fichier = None
+    with transaction.atomic():
+        if televersement.cible == 'fichier':
+            fichier = Fichier(titre=televersement.titre, classes_cibles=televersement.classes_cibles, statut='en_attente')
+            fichier.save()
+            televersement.objet_id = fichier.pk
+        televersement.statut = 'en_attente'
+        televersement.save(update_fields=['objet_id', 'statut', 'empreinte'])
+        if getattr(settings, 'TELEVERSEMENTS_THREAD', True):
+            transaction.on_commit(lambda: _executor.submit(_transferer_en_arriere_plan, televersement.pk))
+    return fichier
+
+
+def annuler_televersement(televersement):
+    if televersement.statut not in ('reception', 'echoue'):
+        raise ErreurTeleversement("Un transfert est en cours pour ce téléversement.")
+    with _verrou_hachages:
+        _hachages.pop(televersement.cle, None)
+    chemin_partiel(televersement).unlink(missing_ok=True)
+    televersement.delete()
+
+
+def _transferer_en_arriere_plan(televersement_id):
+    try:
+        transferer(televersement_id)
+    except Exception:
+        logger.exception("Échec du transfert du téléversement %s", televersement_id)
+    finally:
+        connection.close()
+
+
+def transferer(televersement_id):
+    """
+    Envoie le fichier assemblé vers le stockage, puis rend le contenu visible : Fichier
+    « prêt » (ETags, caches et notifications des classes comme pour un envoi direct) ou
+    pièce jointe de l'activité. Retourne False si un autre worker a pris le transfert.
+    """
+    bail = _Bail(televersement_id)
+    if not bail.prendre():
+        return False
+    televersement = Televersement.objects.get(pk=televersement_id)
+    modele, type_contenu = (Fichier, 'fichiers') if televersement.cible == 'fichier' else (Activite, 'activites')
+    (champ, champ_blob), = modele.champs_blob
+    blob = None
+    try:
+        objet = modele.objects.get(pk=televersement.objet_id)
+        # Contenu déjà stocké (même SHA-256) : simple référence, aucun envoi.
+        with open(chemin_partiel(televersement), 'rb') as partiel:
+            blob = stocker(
+                File(_LectureSousBail(partiel, bail), name=televersement.nom_fichier), somme=televersement.empreinte or None
+            )
+        with transaction.atomic():
+            if not bail.detenu().update(statut='termine', date_fin=timezone.now(), bail_expire_le=None):
+                raise TransfertRepris(televersement_id)
+            # update() plutôt que save() : pas de resynchronisation des classes ni de réindexation
+            objet.renseigner_metadonnees(champ, blob, televersement.nom_fichier)
+            mise_a_jour = {champ: blob.fichier.name, champ_blob: blob}
+            mise_a_jour.update({nom: getattr(objet, nom) for nom in objet.champs_metadonnees})
+            if modele is Fichier:
+                mise_a_jour['statut'] = 'pret'
+            modele.objects.filter(pk=objet.pk).update(**mise_a_jour)
+            if getattr(objet, f'{champ_blob}_id'):
+                liberer([getattr(objet, f'{champ_blob}_id')]) # Ancienne pièce jointe remplacée
+            codes = codes_classes_cibles(objet.classes_cibles)
+            incrementer_classes(codes)
+            invalider_classes(type_contenu, codes)
+            if modele is Fichier:
+                programmer_diffusion(
+                    objet.classes_cibles,
+                    message=f"Nouveau fichier '{objet.titre}' disponible pour votre classe.",
+                    type_notification='new_file',
+                    lien_relatif="/student/dashboard/files",
+                )
+    except TransfertRepris:
+        logger.warning("Transfert du téléversement %s repris par un autre worker, abandonné", televersement_id)
+        if blob:
+            liberer([blob.pk]) # Référence prise pour rien : le worker qui a repris prend la sienne
+        return False
+    except Exception as exc:
+        if blob:
+            liberer([blob.pk]) # Une reprise reprendra sa propre référence
+        if bail.detenu().update(statut='echoue', erreur=str(exc), bail_expire_le=None) and modele is Fichier:
+            Fichier.objects.filter(pk=televersement.objet_id).update(statut='echoue')
+        raise
+    chemin_partiel(televersement).unlink(missing_ok=True)
+    return True
+
+
+def transferer_en_attente(limite=None):
+    """Transfère les téléversements en attente dans l'ordre d'arrivée. Retourne le nombre traité."""
+    ids = Televersement.objects.filter(statut='en_attente').order_by('id').values_list('id', flat=True)
+    if limite:
+        ids = ids[:limite]
+    traites = 0
+    for televersement_id in list(ids):
+        try:
+            if transferer(televersement_id):
+                traites += 1
+        except Exception:
+            logger.exception("Échec du transfert du téléversement %s", televersement_id)
+    return traites
+
+
+def reprendre_transferts_interrompus():
+    """
+    Remet en attente les transferts « échoués » et ceux restés « en cours » dont le bail a
+    expiré (worker arrêté en plein transfert) ; un transfert qu'un worker vivant mène n'est
+    pas touché. Le fichier partiel est conservé.
+    """
+    interrompus = Q(statut='echoue') | Q(statut='en_cours', bail_expire_le__lt=timezone.now())
+    interrompus |= Q(statut='en_cours', bail_expire_le=None)
+    repris = 0
+    for televersement_id, cible, objet_id in (
+        Televersement.objects.filter(interrompus).exclude(objet_id=None).values_list('id', 'cible', 'objet_id')
+    ):
+        # Reprise conditionnelle : la ligne doit être encore interrompue au moment de l'écriture
+        if Televersement.objects.filter(interrompus, pk=televersement_id).update(
+            statut='en_attente', erreur='', bail_expire_le=None
+        ):
+            repris += 1
+            if cible == 'fichier':
+                Fichier.objects.filter(pk=objet_id).update(statut='en_attente')
+    return repris
+
+
+def purger_receptions_abandonnees(heures):
+    """Supprime les téléversements dont aucun morceau n'est arrivé à terme depuis `heures`."""
+    abandonnes = Televersement.objects.filter(statut='reception', date_creation__lt=timezone.now() - timedelta(hours=heures))
+    nb = 0
+    for televersement in abandonnes.iterator():
+        annuler_televersement(televersement)
+        nb += 1
+    return nb
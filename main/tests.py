@@ -0,0 +1,453 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import cache_contenus, sections_eleve
+from .analytique import eleves_avec_completion
+from .blobs import DELAI_GRACE, stocker
+from . import televersements
+from .evenements import BrokerBase, BrokerLocal
+from .flux import TAILLE_RATTRAPAGE
+from .import_eleves import MODES, importer_eleves
+from .models import (
+    Activite, Blob, CompletionActivite, Conversation, DiffusionNotification, Eleve, Exercice, Fichier, Message, Note,
+    Notification, ReponseExercice, Televersement,
+)
+from .pagination import (
+    ConversationPagination, FichierPagination, MessagePagination, NotePagination, NotificationPagination,
+)
+from .plans import parcours_complets
+from .serializers import (
+    ActiviteSerializer, ConversationSerializer, ExerciceSerializer, FichierSerializer, MessageSerializer,
+    NoteSerializer, NotificationSerializer, projeter,
+)
+from .views import conversations_actives, creer_notification, eleves_filtres
+
+
+def vider_caches():
+    # Versions (ETag) et listes partagées par classe : chaque test part d'un cache froid.
+    for alias in ('default', 'contenus'):
+        caches[alias].clear()
+
+
+class ExercicesEleveRequetesTests(TestCase):
+    """
+    /eleve/<id>/exercices/ s'exécute en un nombre fixe de requêtes, quel que soit le
+    nombre d'exercices, de classes ciblées et de réponses de l'élève.
+    """
+    # Cache froid, sans jeton : classe de l'élève (ETag), élève, exercices, réponses de l'élève.
+    REQUETES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        cls.autre = Eleve.objects.create(nom='Saidi', prenom='Lina', classe='2am1')
+        cls.ajouter_exercices(5)
+
+    @classmethod
+    def ajouter_exercices(cls, nombre):
+        for i in range(nombre):
+            for cibles in ('1am1', '1am1, 2am1', 'all', '3am2'):
+                exercice = Exercice.objects.create(titre=f'Exercice {i} {cibles}', enonce='Énoncé', classes_cibles=cibles)
+                if cibles != '3am2':
+                    ReponseExercice.objects.create(eleve=cls.eleve, exercice=exercice, reponse='42')
+                    ReponseExercice.objects.create(eleve=cls.autre, exercice=exercice, reponse='41')
+
+    def setUp(self):
+        vider_caches()
+
+    def lire(self):
+        return self.client.get(f'/eleve/{self.eleve.id}/exercices/')
+
+    def test_nombre_de_requetes_fixe(self):
+        with self.assertNumQueries(self.REQUETES):
+            response = self.lire()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 15)
+        self.assertTrue(all(item['reponse_eleve']['reponse'] == '42' for item in response.json()))
+
+    def test_independant_du_nombre_d_exercices(self):
+        self.ajouter_exercices(10)
+        with self.assertNumQueries(self.REQUETES):
+            response = self.lire()
+        self.assertEqual(len(response.json()), 45)
+
+    def test_liste_de_classe_en_cache(self):
+        self.lire()
+        # La liste commune vient du cache : seuls l'élève et ses réponses sont relus.
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/eleve/{self.eleve.id}/exercices/', HTTP_IF_NONE_MATCH='"autre"')
+        self.assertEqual(response.status_code, 200)
+
+
+class MessagesEleveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        for contenu in ('Bonjour', 'Rappel'):
+            message = Message.objects.create(eleve=cls.eleve, contenu=contenu, expediteur='enseignant')
+            Conversation.enregistrer_message(message)
+
+    def non_lus(self):
+        return Conversation.objects.get(eleve=self.eleve).non_lus_eleve
+
+    def test_lecture_sans_effet(self):
+        self.assertEqual(self.client.get(f'/eleve/{self.eleve.id}/messages/').status_code, 200)
+        self.assertEqual(self.non_lus(), 2)
+        self.assertFalse(Message.objects.filter(lu=True).exists())
+
+    def test_marquer_lus(self):
+        response = self.client.post(f'/eleve/{self.eleve.id}/messages/lus/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.non_lus(), 0)
+        self.assertFalse(Message.objects.filter(lu=False).exists())
+
+
+class CurseurInvalideTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        for i in range(3):
+            Note.objects.create(eleve=cls.eleve, note='12.50', commentaire=f'Devoir {i}')
+
+    def setUp(self):
+        vider_caches()
+
+    def lire(self, chemin, position):
+        curseur = base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+        return self.client.get(f'/eleve/{self.eleve.id}/{chemin}/', {'cursor': curseur})
+
+    def test_curseurs_forges(self):
+        for chemin in ('notifications', 'notes', 'messages'):
+            for position in (['notadate', 1], [{'a': 1}, 1], [None, 1], ['2024-01-01T00:00:00+00:00', 'x'], [1], 'x'):
+                with self.subTest(chemin=chemin, position=position):
+                    self.assertEqual(self.lire(chemin, position).status_code, 404)
+        self.assertEqual(self.client.get(f'/eleve/{self.eleve.id}/notes/', {'cursor': '%%%'}).status_code, 404)
+
+    def test_curseur_suivant(self):
+        premiere = self.client.get(f'/eleve/{self.eleve.id}/notes/', {'page_size': 2}).json()
+        suivante = self.client.get(premiere['next']).json()
+        self.assertEqual(len(suivante['results']), 1)
+        self.assertIsNone(suivante['next'])
+
+
+class PlansRequetesTests(TestCase):
+    """
+    Les requêtes des endpoints chauds, construites par les fonctions des vues elles-mêmes,
+    utilisent un index (aucun parcours complet de table dans EXPLAIN).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        cls.activite = Activite.objects.create(titre='Lecture', description='Lire le chapitre 2', classes_cibles='1am1')
+        exercice = Exercice.objects.create(titre='Fractions', enonce='Calculer', classes_cibles='1am1')
+        CompletionActivite.objects.create(eleve=cls.eleve, activite=cls.activite, completee=True)
+        ReponseExercice.objects.create(eleve=cls.eleve, exercice=exercice, reponse='3/4')
+        Note.objects.create(eleve=cls.eleve, note='15.00')
+        message = Message.objects.create(eleve=cls.eleve, contenu='Bonjour', expediteur='eleve')
+        Conversation.enregistrer_message(message)
+        Notification.objects.create(destinataire=cls.eleve, message='Nouveau fichier')
+
+    def page(self, pagination, queryset, serializer_class):
+        """Page suivant un curseur (date, id), comme sections_eleve._page : projection puis pagination par clé."""
+        paginator = pagination()
+        curseur = paginator.encode_cursor([timezone.now().isoformat(), 1])
+        return paginator.requete_page(projeter(queryset, serializer_class(), garder=paginator.ordering), curseur)
+
+    def requetes(self):
+        eleve = self.eleve
+        return {
+            'fichiers_eleve': self.page(FichierPagination, sections_eleve.requete_fichiers(eleve), FichierSerializer),
+            'activites_eleve': projeter(sections_eleve.requete_activites(eleve), ActiviteSerializer()),
+            'exercices_eleve': projeter(sections_eleve.requete_exercices(eleve), ExerciceSerializer()),
+            'completions_eleve': sections_eleve.requete_completions(eleve),
+            'reponses_eleve': sections_eleve.requete_reponses(eleve),
+            'notes_eleve': self.page(NotePagination, sections_eleve.requete_notes(eleve), NoteSerializer),
+            'messages_eleve': self.page(MessagePagination, sections_eleve.requete_messages(eleve), MessageSerializer),
+            'notifications_eleve': self.page(
+                NotificationPagination, sections_eleve.requete_notifications(eleve), NotificationSerializer
+            ),
+            'notifications_non_lues': self.page(
+                NotificationPagination, sections_eleve.requete_notifications(eleve, lu=False), NotificationSerializer
+            ),
+            'conversations': self.page(ConversationPagination, conversations_actives(), ConversationSerializer),
+            'eleves_classe': eleves_filtres(classe='1am1'),
+            'progression_activite': eleves_avec_completion(self.activite.pk, ['1am1']),
+        }
+
+    def test_aucun_parcours_complet(self):
+        for nom, queryset in self.requetes().items():
+            with self.subTest(requete=nom):
+                plan, parcours = parcours_complets(queryset)
+                self.assertEqual(parcours, [], f"Parcours complet de table :\n{plan}")
+
+
+class CompteurNotificationsTests(TestCase):
+    def test_sauvegarde_complete_garde_le_compteur(self):
+        eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        perime = Eleve.objects.get(pk=eleve.pk)
+        creer_notification(eleve, 'Nouvelle note', 'grade_updated')
+        perime.classe = '1am2'
+        perime.save()
+        eleve.refresh_from_db()
+        self.assertEqual((eleve.classe, eleve.notifications_non_lues), ('1am2', 1))
+
+    def test_note_sans_compteur(self):
+        eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        Note.objects.create(eleve=eleve, note='12.00')
+        vider_caches()
+        resultats = self.client.get(f'/eleve/{eleve.id}/notes/').json()['results']
+        self.assertNotIn('notifications_non_lues', resultats[0]['eleve_details'])
+
+
+class RattrapageNotificationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        Notification.objects.bulk_create([
+            Notification(destinataire=cls.eleve, message=f'Notification {i}') for i in range(TAILLE_RATTRAPAGE + 10)
+        ])
+
+    def setUp(self):
+        # Pas de tâche de lecture en base pendant le test (transaction non validée)
+        broker = mock.patch('main.flux.get_broker', return_value=BrokerLocal())
+        broker.start()
+        self.addCleanup(broker.stop)
+
+    async def test_pages_croissantes(self):
+        depuis, recues, plus = 0, [], True
+        while plus:
+            response = await self.async_client.get(f'/eleve/{self.eleve.id}/flux/attente/', {'depuis': depuis, 'timeout': 0})
+            donnees = json.loads(response.content)
+            ids = [evenement['notification']['id'] for evenement in donnees['evenements']]
+            recues += ids
+            depuis, plus = ids[-1], donnees['plus']
+        attendues = [n.id async for n in Notification.objects.filter(destinataire=self.eleve).order_by('id')]
+        self.assertEqual(recues, attendues)
+
+
+class TacheBrokerBaseTests(SimpleTestCase):
+    async def test_lecture_seulement_avec_des_abonnes(self):
+        broker = BrokerBase()
+        with mock.patch.object(BrokerBase, '_lire', return_value=[]) as lire:
+            self.assertIsNone(broker._tache)
+            premier, second = broker.abonner(1), broker.abonner(2)
+            tache = broker._tache
+            await asyncio.sleep(0.05)
+            broker.desabonner(premier)
+            self.assertFalse(tache.done())
+            broker.desabonner(second)
+            await asyncio.sleep(0.05)
+            self.assertTrue(tache.cancelled())
+            self.assertIsNone(broker._tache)
+        self.assertTrue(lire.called)
+
+
+class ImportElevesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+
+    def importer(self, lignes, mode):
+        return importer_eleves(enumerate(lignes, start=2), mode=mode)
+
+    def test_meme_eleve_dans_les_deux_modes(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                rapport = self.importer([{'nom': 'ben ali', 'prenom': 'AMINE', 'classe': '1AM1'}], mode)
+                self.assertEqual((rapport.creees, rapport.ignorees), (0, 1))
+                self.assertEqual(Eleve.objects.count(), 1)
+
+    def test_connexion_avec_homonymes(self):
+        self.importer([{'nom': 'Ben Ali', 'prenom': 'Amine', 'classe': '2am3'}], 'skip')
+        response = self.client.post('/login/eleve/', {'nom': 'ben ali', 'prenom': 'amine'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['classe_requise'])
+        response = self.client.post('/login/eleve/', {'nom': 'ben ali', 'prenom': 'amine', 'classe': '1AM1'})
+        self.assertEqual(response.json()['eleve']['id'], self.eleve.id)
+
+
+    def test_homonyme_d_une_autre_classe_signale(self):
+        rapport = self.importer([{'nom': 'Ben Ali', 'prenom': 'Amine', 'classe': '2am3'}], 'update')
+        self.assertEqual((rapport.creees, rapport.deplacees, rapport.nb_conflits), (0, 0, 1))
+        self.assertEqual(rapport.conflits[0]['existants'], [{'id': self.eleve.id, 'classe': '1am1'}])
+        self.eleve.refresh_from_db()
+        self.assertEqual(self.eleve.classe, '1am1')
+
+    def test_deplacement_explicite(self):
+        rapport = importer_eleves([(2, {'nom': 'Ben Ali', 'prenom': 'Amine', 'classe': '2am3'})], 'update', deplacer=True)
+        self.assertEqual(rapport.deplacees, 1)
+        self.eleve.refresh_from_db()
+        self.assertEqual(self.eleve.classe, '2am3')
+
+
+class ConnexionEleveTests(TestCase):
+    def test_accents_et_casse_ignores(self):
+        eleve = Eleve.objects.create(nom='Benaïssa', prenom='Hélène', classe='3am2')
+        response = self.client.post('/login/eleve/', {'nom': 'BENAISSA', 'prenom': ' helene '})
+        self.assertEqual(response.json()['eleve']['id'], eleve.id)
+
+    def test_jeton_invalide_ignore(self):
+        eleve = Eleve.objects.create(nom='Benaïssa', prenom='Hélène', classe='3am2')
+        entete = {'Authorization': 'Eleve jeton-perime'}
+        response = self.client.post('/login/eleve/', {'nom': 'Benaïssa', 'prenom': 'Hélène'}, headers=entete)
+        self.assertEqual(response.status_code, 200)
+        vider_caches()
+        self.assertEqual(self.client.get(f'/eleve/{eleve.id}/notes/', headers=entete).status_code, 200)
+
+
+class NettoyageBlobsTests(TestCase):
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = override_settings(DEFAULT_FILE_STORAGE='main.stockage.StockageLocal', MEDIA_ROOT=dossier.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_envoi_en_cours_conserve(self):
+        # Référence prise par stocker(), contenu pas encore enregistré
+        blob = stocker(ContentFile(b'%PDF-1.4 cours', name='cours.pdf'))
+        call_command('nettoyer_blobs', stdout=io.StringIO())
+        blob.refresh_from_db()
+        self.assertEqual(blob.nb_references, 1)
+        self.assertTrue(default_storage.exists(blob.fichier.name))
+
+    def test_envoi_direct_sans_relecture(self):
+        contenu = b'%PDF-1.4 direct'
+        with mock.patch('main.blobs.empreinte') as relecture:
+            response = self.client.post('/fichiers/', {
+                'titre': 'Cours', 'classes_cibles': '1am1', 'fichier': SimpleUploadedFile('cours.pdf', contenu),
+            })
+        self.assertEqual(response.status_code, 201, response.content)
+        relecture.assert_not_called()
+        self.assertEqual(Blob.objects.get().empreinte, hashlib.sha256(contenu).hexdigest())
+
+    def test_orphelin_ancien_supprime(self):
+        blob = stocker(ContentFile(b'%PDF-1.4 ancien', name='ancien.pdf'))
+        Blob.objects.filter(pk=blob.pk).update(date_reference=timezone.now() - DELAI_GRACE * 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('nettoyer_blobs', stdout=io.StringIO())
+        self.assertFalse(Blob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(default_storage.exists(blob.fichier.name))
+
+
+class ReponsesEnFluxAsgiTests(TestCase):
+    """Sous ASGI, exports et médias sont envoyés par un itérateur asynchrone, morceau par morceau."""
+    @classmethod
+    def setUpTestData(cls):
+        eleve = Eleve.objects.create(nom='Ben Ali', prenom='Amine', classe='1am1')
+        Note.objects.bulk_create([Note(eleve=eleve, note='12.00', commentaire=f'Devoir {i}') for i in range(5)])
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = override_settings(DEFAULT_FILE_STORAGE='main.stockage.StockageLocal', MEDIA_ROOT=dossier.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    async def contenu(self, response):
+        self.assertTrue(response.is_async)
+        return b''.join([morceau async for morceau in response.streaming_content])
+
+    async def test_export(self):
+        response = await self.async_client.get('/teacher/exports/notes.jsonl')
+        lignes = (await self.contenu(response)).decode().splitlines()
+        self.assertEqual([json.loads(ligne)['commentaire'] for ligne in lignes], [f'Devoir {i}' for i in range(5)])
+
+    async def test_media_avec_plage(self):
+        nom = default_storage.save('fichiers/cours.txt', ContentFile(b'0123456789'))
+        response = await self.async_client.get(f'/media/{nom}', headers={'Range': 'bytes=2-5'})
+        self.assertEqual((response.status_code, response['Content-Length']), (206, '4'))
+        self.assertEqual(await self.contenu(response), b'2345')
+
+
+class RepriseTransfertsTests(TestCase):
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = override_settings(
+            DEFAULT_FILE_STORAGE='main.stockage.StockageLocal', MEDIA_ROOT=dossier.name, TELEVERSEMENTS_THREAD=False,
+            TELEVERSEMENTS_DOSSIER=dossier.name,
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.televersement = televersements.creer_televersement('cours.txt', 10, titre='Cours', classes_cibles='1am1')
+        televersements.recevoir_morceau(self.televersement, io.BytesIO(b'0123456789'), 0, 10)
+        televersements.terminer_televersement(self.televersement)
+
+    def interrompre(self, bail_expire_le):
+        Televersement.objects.filter(pk=self.televersement.pk).update(statut='en_cours', bail_expire_le=bail_expire_le)
+
+    def test_transfert_vivant_non_repris(self):
+        self.interrompre(timezone.now() + DELAI_GRACE)
+        self.assertEqual(televersements.reprendre_transferts_interrompus(), 0)
+        self.interrompre(timezone.now() - DELAI_GRACE)
+        self.assertEqual(televersements.reprendre_transferts_interrompus(), 1)
+        self.assertTrue(televersements.transferer(self.televersement.pk))
+        self.assertEqual(Fichier.objects.get(pk=self.televersement.objet_id).statut, 'pret')
+
+    def test_bail_perdu_pendant_le_transfert(self):
+        def stocker_puis_reprise(fichier, **kwargs):
+            blob = stocker(fichier, **kwargs)
+            # Un autre worker reprend le transfert entre-temps
+            self.interrompre(timezone.now() + DELAI_GRACE)
+            return blob
+
+        with mock.patch('main.televersements.stocker', side_effect=stocker_puis_reprise):
+            self.assertFalse(televersements.transferer(self.televersement.pk))
+        self.assertFalse(Blob.objects.filter(nb_references__gt=0).exists())
+        self.assertFalse(DiffusionNotification.objects.exists())
+        self.assertEqual(Fichier.objects.get(pk=self.televersement.objet_id).statut, 'en_attente')
+
+    def test_empreinte_calculee_a_la_reception(self):
+        self.televersement.refresh_from_db()
+        self.assertEqual(self.televersement.empreinte, hashlib.sha256(b'0123456789').hexdigest())
+        with mock.patch('main.blobs.empreinte') as relecture:
+            self.assertTrue(televersements.transferer(self.televersement.pk))
+        relecture.assert_not_called()
+        self.assertEqual(Blob.objects.get().empreinte, self.televersement.empreinte)
+
+
+class GenerationsContenusTests(TestCase):
+    def setUp(self):
+        vider_caches()
+
+    def test_generation_evincee_ne_ressert_pas_l_ancienne_liste(self):
+        self.assertEqual(cache_contenus.liste_classe('fichiers', '1am1', lambda: ['ancienne']), ['ancienne'])
+        # Génération évincée (LocMem plein) : la liste stockée sous l'ancienne génération est toujours là
+        cache_contenus._cache().delete(cache_contenus._cle_generation('fichiers', '1am1'))
+        self.assertEqual(cache_contenus.liste_classe('fichiers', '1am1', lambda: ['nouvelle']), ['nouvelle'])
+
+
+class AnalytiqueCiblageTests(TestCase):
+    def setUp(self):
+        vider_caches()
+
+    def classes_analytique(self, chemin):
+        return [ligne['classe'] for ligne in self.client.get(chemin).json()['classes']]
+
+    def test_changement_de_ciblage(self):
+        exercice = Exercice.objects.create(titre='Fractions', enonce='Calculer', classes_cibles='1am1')
+        activite = Activite.objects.create(titre='Lecture', description='Chapitre 2', classes_cibles='1am1')
+        chemins = {
+            f'/exercices/{exercice.pk}/': f'/exercices/{exercice.pk}/analytics/',
+            f'/activites/{activite.pk}/': f'/activites/{activite.pk}/progress/?summary=1',
+        }
+        for chemin, analytique in chemins.items():
+            with self.subTest(chemin=chemin):
+                self.assertEqual(self.classes_analytique(analytique), ['1am1'])
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.patch(chemin, {'classes_cibles': '1am1, 2am3'}, content_type='application/json')
+                self.assertEqual(sorted(self.classes_analytique(analytique)), ['1am1', '2am3'])
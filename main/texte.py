@@ -0,0 +1,111 @@
+"""
+Normalisation des textes saisis (noms d'élèves, contenus...) pour les comparaisons, les index et la recherche.
+"""
+import unicodedata
+
+
+def normaliser_nom(valeur):
+    """
+    Forme de comparaison d'un nom : signes combinants retirés (accents, harakat), casse
+    ignorée, formes Unicode unifiées, espaces superflus retirés. Équivaut au `__iexact`
+    utilisé auparavant par la connexion sous la collation MySQL `*_ai_ci` (« Hélène »
+    = « helene »), mais calculé à l'écriture pour être servi par un index.
+    """
+    decompose = unicodedata.normalize('NFKD', valeur or '')
+    sans_marques = ''.join(c for c in decompose if unicodedata.category(c) != 'Mn')
+    return ' '.join(unicodedata.normalize('NFKC', sans_marques.casefold()).split())
+
+
+# Variantes arabes ramenées à une forme de base (les hamzas et maddas portées par ا, و, ي
+# sont des signes combinants, déjà retirés par la décomposition NFKD).
+_PLIAGE = str.maketrans({
+    'ٱ': 'ا', # alif wasla
+    'ة': 'ه', # tā' marbūṭa
+    'ى': 'ي', # alif maqṣūra
+    'ـ': None, # tatweel
+    'œ': 'oe', 'æ': 'ae',
+    **{chr(0x0660 + i): str(i) for i in range(10)}, # chiffres arabo-indiens
+    **{chr(0x06F0 + i): str(i) for i in range(10)}, # chiffres persans
+})
+
+
+def replier(valeur):
+    """
+    Forme de recherche : casse, accents français, diacritiques arabes (harakat, shadda,
+    hamza, madda), variantes d'alif / tā' marbūṭa / alif maqṣūra et tatweel neutralisés.
+    """
+    decompose = unicodedata.normalize('NFKD', (valeur or '').casefold())
+    sans_marques = ''.join(c for c in decompose if not unicodedata.category(c).startswith('M'))
+    return sans_marques.translate(_PLIAGE)
+
+
+def mots(valeur):
+    """Mots repliés (lettres et chiffres) de la valeur, dans l'ordre, répétitions comprises."""
+    resultat, courant = [], []
+    for c in replier(valeur) + ' ':
+        if c.isalnum():
+            courant.append(c)
+        elif courant:
+            resultat.append(''.join(courant))
+            courant = []
+    return resultat
+
+
+def termes(*valeurs):
+    """Mots repliés (lettres et chiffres) des valeurs, dans l'ordre, sans doublons."""
+    return list(dict.fromkeys(mot for valeur in valeurs for mot in mots(valeur)))
+
+
+# Recherche plein texte des contenus : mots vides français et arabes, stockés repliés.
+MOTS_VIDES = frozenset(replier(mot) for mot in (
+    'le la les un une des de du et ou en au aux ce ces cet cette qui que qu quoi dont '
+    'est sont par pour sur dans avec sans ne pas plus se sa son ses leur leurs il elle '
+    'ils elles on nous vous je tu'
+).split() + (
+    'في من إلى على عن أن إن أو ثم هذا هذه ذلك تلك التي الذي الذين ما لا لم لن قد كل مع هو هي هم'
+).split())
+
+# Proclitiques arabes retirés (article, et conjonctions / prépositions accolées à l'article).
+_PROCLITIQUES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+
+
+def _est_arabe(mot):
+    return '\u0621' <= mot[0] <= '\u064a'
+
+
+def racine(mot):
+    """
+    Forme indexée d'un mot replié : article arabe retiré (« الرياضيات » -> « رياضيات »),
+    pluriel français en -s / -x retiré (« exercices » -> « exercice »). Volontairement
+    léger : la même transformation s'applique au texte et à la saisie.
+    """
+    if _est_arabe(mot):
+        for prefixe in _PROCLITIQUES:
+            if mot.startswith(prefixe) and len(mot) - len(prefixe) >= 2:
+                return mot[len(prefixe):]
+        return mot
+    if len(mot) > 3 and mot[-1] in 'sx' and mot[-2] != mot[-1]:
+        return mot[:-1]
+    return mot
+
+
+def termes_recherche(valeur):
+    """Termes d'une saisie ou d'un texte : mots repliés, sans mots vides ni lettres isolées."""
+    return list(dict.fromkeys(
+        racine(mot) for mot in mots(valeur) if len(mot) > 1 and mot not in MOTS_VIDES
+    ))
+
+
+def termes_ponderes(*champs):
+    """
+    Index d'un contenu : {terme: poids} pour des couples (texte, poids du champ). Le poids
+    d'un terme cumule ses occurrences multipliées par le poids de chaque champ (un mot du
+    titre compte plus qu'un mot de l'énoncé).
+    """
+    poids = {}
+    for texte, poids_champ in champs:
+        for mot in mots(texte):
+            if len(mot) > 1 and mot not in MOTS_VIDES:
+                terme = racine(mot)[:100]
+                poids[terme] = poids.get(terme, 0) + poids_champ
+    return {terme: min(valeur, 32767) for terme, valeur in poids.items()}
@@ -41,6 +41,7 @@ urlpatterns = [
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views # Assure-toi que views est bien importé
+from . import flux
 
 router = DefaultRouter()
 router.register(r'eleves', views.EleveViewSet)
@@ -64,6 +65,7 @@ urlpatterns = [
     path('eleve/<int:eleve_id>/exercices/', views.exercices_eleve, name='exercices_eleve'),
     path('eleve/<int:eleve_id>/notes/', views.note_eleve, name='note_eleve'),
     path('eleve/<int:eleve_id>/messages/', views.messages_eleve, name='messages_eleve_pour_eleve'),
+    path('eleve/<int:eleve_id>/messages/lus/', views.marquer_messages_lus, name='marquer_messages_lus'),
 
     # Actions élèves
     path('completer-activite/', views.completer_activite, name='completer_activite'),
@@ -75,11 +77,23 @@ urlpatterns = [
     # Endpoints spécifiques à l'enseignant
     path('teacher/conversations/', views.teacher_conversations, name='teacher_conversations'),
     path('teacher/messages/<int:eleve_id>/', views.messages_eleve, name='teacher_messages_for_eleve'),
+    path('teacher/cache-contenus/', views.cache_contenus_stats, name='cache_contenus_stats'),
+    path('teacher/exports/<slug:type_export>.<slug:format_export>', views.exporter, name='exporter'),
+    path('teacher/recherche/', views.recherche_contenus, name='recherche_contenus'),
+    path('teacher/uploads/', views.televersement_init, name='televersement_init'),
+    path('teacher/uploads/<str:cle>/', views.televersement_morceaux, name='televersement_morceaux'),
+    path('teacher/uploads/<str:cle>/complete/', views.televersement_terminer, name='televersement_terminer'),
 
     # --- AJOUTER LES URLS POUR LES NOTIFICATIONS CI-DESSOUS ---
     path('eleve/<int:eleve_id>/notifications/', views.get_eleve_notifications, name='get_eleve_notifications'),
     path('eleve/<int:eleve_id>/notifications/<int:notification_id>/mark-as-read/', views.mark_notification_as_read, name='mark_notification_as_read'),
     path('eleve/<int:eleve_id>/notifications/mark-all-as-read/', views.mark_all_notifications_as_read, name='mark_all_notifications_as_read'),
     # --- FIN DE L'AJOUT ---
+    path('eleve/<int:eleve_id>/badges/', views.badges_eleve, name='badges_eleve'),
+    path('eleve/<int:eleve_id>/dashboard/', views.dashboard_eleve, name='dashboard_eleve'),
+
+    # Flux temps réel (vues asynchrones, à servir via eduinfo/asgi.py)
+    path('eleve/<int:eleve_id>/flux/', flux.flux_eleve, name='flux_eleve'),
+    path('eleve/<int:eleve_id>/flux/attente/', flux.attente_eleve, name='attente_eleve'),
 ]
 # --- FIN DES MODIFICATIONS ---
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Numéros de version par classe et par élève, conservés dans le cache Django.
+
+Chaque écriture qui modifie ce qu'un élève voit incrémente la version concernée
+(après commit). Les endpoints élèves en dérivent un ETag fort et répondent 304 à
+un `If-None-Match` identique sans aucune requête SQL : un tableau de bord inchangé
+ne coûte qu'une lecture groupée du cache.
+
+Avec plusieurs processus, le cache doit être partagé (voir CACHES dans settings.py),
+sinon un processus pourrait répondre 304 avec une version périmée.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .authentification import session_eleve
+from .models import CLASSES_CHOICES, Eleve
+
+
+def _cle_classe(code):
+    return f'version:classe:{code}'
+
+
+def _cle_eleve(eleve_id):
+    return f'version:eleve:{eleve_id}'
+
+
+def _cle_classe_de_eleve(eleve_id):
+    return f'eleve:{eleve_id}:classe'
+
+
+def _nouvelle_version():
+    # Jamais réutilisée après un vidage du cache, contrairement à un compteur repartant de 1.
+    return time.time_ns()
+
+
+def _incrementer(cle):
+    try:
+        cache.incr(cle)
+    except ValueError: # Clé absente ou expirée
+        cache.set(cle, _nouvelle_version(), None)
+
+
+def incrementer_classes(codes):
+    """À appeler après une écriture visible par les élèves des classes `codes`."""
+    cles = [_cle_classe(code) for code in set(codes)]
+    transaction.on_commit(lambda: [_incrementer(cle) for cle in cles])
+
+
+def incrementer_eleve(eleve_id):
+    """À appeler après une écriture sur les données personnelles d'un élève."""
+    cle = _cle_eleve(eleve_id)
+    transaction.on_commit(lambda: _incrementer(cle))
+
+
+def oublier_eleve(eleve_id):
+    """L'élève a changé de classe ou a été supprimé."""
+    cles = [_cle_eleve(eleve_id), _cle_classe_de_eleve(eleve_id)]
+    transaction.on_commit(lambda: cache.delete_many(cles))
+
+
+def versions_eleve(eleve_id, classe=None):
+    """
+    Retourne (classe, version de la classe, version de l'élève), ou None si l'élève
+    n'existe pas. Une seule lecture groupée du cache quand tout y est déjà.
+    `classe` (issue du jeton de session) évite de la chercher en cache ou en base.
+    """
+    cles_classes = {code: _cle_classe(code) for code, _ in CLASSES_CHOICES}
+    cle_eleve, cle_classe_eleve = _cle_eleve(eleve_id), _cle_classe_de_eleve(eleve_id)
+    valeurs = cache.get_many([cle_eleve, cle_classe_eleve, *cles_classes.values()])
+
+    classe = classe or valeurs.get(cle_classe_eleve)
+    if classe is None:
+        classe = Eleve.objects.filter(id=eleve_id).values_list('classe', flat=True).first()
+        if classe is None:
+            return None
+        cache.set(cle_classe_eleve, classe, None)
+
+    version_eleve = valeurs.get(cle_eleve)
+    if version_eleve is None:
+        cache.add(cle_eleve, _nouvelle_version(), None)
+        version_eleve = cache.get(cle_eleve)
+    cle_version_classe = cles_classes.get(classe, _cle_classe(classe))
+    version_classe = valeurs.get(cle_version_classe)
+    if version_classe is None:
+        cache.add(cle_version_classe, _nouvelle_version(), None)
+        version_classe = cache.get(cle_version_classe)
+    return classe, version_classe, version_eleve
+
+
+def etag_eleve(portee, par_classe=True, par_eleve=True):
+    """
+    Décorateur des vues `/eleve/<eleve_id>/...` : calcule l'ETag à partir des versions
+    avant tout accès à l'ORM et répond 304 si le client a déjà cette version.
+    `portee` distingue les endpoints ; l'URL complète (curseur, filtres) entre dans l'ETag.
+    """
+    def decorateur(vue):
+        @wraps(vue)
+        def wrapper(request, eleve_id, *args, **kwargs):
+            session = session_eleve(request, eleve_id)
+            versions = versions_eleve(eleve_id, session.classe if session else None)
+            if versions is None:
+                return vue(request, eleve_id, *args, **kwargs) # 404 géré par la vue
+            classe, version_classe, version_eleve = versions
+            empreinte = '|'.join([
+                portee, request.get_full_path(), classe,
+                str(version_classe) if par_classe else '',
+                str(version_eleve) if par_eleve else '',
+            ])
+            etag = '"%s"' % hashlib.md5(empreinte.encode('utf-8')).hexdigest()
+
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = vue(request, eleve_id, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache' # Toujours revalider auprès du serveur
+            return response
+        return wrapper
+    return decorateur
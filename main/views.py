@@ -1,67 +1,152 @@
 # --- START OF FILE app/backend/main/views.py ---
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action, permission_classes as dec_permission_classes
+from rest_framework.decorators import (
+    api_view, action, authentication_classes as dec_authentication_classes, permission_classes as dec_permission_classes,
+)
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Max, Count, Case, When # BooleanField n'est pas utilisé ici directement
+from django.db import connection, transaction
+from django.urls import reverse
+from django.db.models import Case, F, Value, When
 
 # Assure-toi que tous les modèles et serializers nécessaires sont importés.
 # L'import * est pratique mais lister explicitement est parfois plus clair pour le débogage.
-from .models import Eleve, Fichier, Activite, Exercice, Note, Message, Notification, CompletionActivite, ReponseExercice
+from .models import Eleve, Fichier, Activite, Exercice, Note, Message, Notification, CompletionActivite, ReponseExercice, Conversation
+from .models import Televersement
+from .models import codes_classes_cibles
+from .texte import normaliser_nom
 from .serializers import (
     EleveSerializer, FichierSerializer, ActiviteSerializer, ExerciceSerializer,
-    ReponseExerciceSerializer, ReponseExerciceDetailSerializer, NoteSerializer,
-    MessageSerializer, ConversationSerializer, NotificationSerializer # Ajout de NotificationSerializer
+    ReponseExerciceSerializer, ReponseExerciceDetailSerializer, CorrectionSerializer, NoteSerializer,
+    MessageSerializer, ConversationSerializer, NotificationSerializer, # Ajout de NotificationSerializer
+    champs_demandes, projeter
+)
+from .authentification import creer_jeton, session_eleve
+from .diffusion import programmer_diffusion
+from .envoi import contenu_flux
+from .exports import FORMATS as FORMATS_EXPORT, ErreurExport, generer_export
+from .recherche import CONTENUS as TYPES_RECHERCHE, rechercher_contenus, rechercher_eleves, resumer_resultats
+from .import_eleves import ErreurImport, importer_eleves, lire_lignes
+from .televersements import (
+    MORCEAU_MAX, ErreurTeleversement, annuler_televersement, creer_televersement, debut_morceau, recevoir_morceau,
+    terminer_televersement,
+)
+from .evenements import evenement_message, publier_apres_commit, publier_notifications
+from .analytique import (
+    LARGEURS_TRANCHES, analytique_exercice, analytique_notes, eleves_avec_completion, invalider_activite,
+    invalider_exercice, invalider_notes, resume_progression,
 )
+from .versions import etag_eleve, incrementer_classes, incrementer_eleve
+from .cache_contenus import invalider_classes, statistiques as statistiques_cache_contenus
+from .pagination import ConversationPagination
+from . import sections_eleve
+from .sections_eleve import champs_section, pagination_demandee
+
+DASHBOARD_THREADS_MAX = 4
+CORRECTIONS_MAX = 500
+
+def largeur_tranches(request):
+    """Largeur des tranches d'histogramme demandée par `?tranche=` (2 par défaut), ou None si invalide."""
+    try:
+        largeur = int(request.query_params.get('tranche', 2))
+    except ValueError:
+        return None
+    return largeur if largeur in LARGEURS_TRANCHES else None
+
+def eleve_de_requete(request, eleve_id, queryset=Eleve):
+    """
+    Élève désigné par l'URL. Si le jeton de session de la requête le désigne, l'instance
+    (id et classe seulement) est construite sans requête ; sinon l'élève est lu en base.
+    """
+    session = session_eleve(request, eleve_id)
+    if session is not None:
+        return session.eleve()
+    return get_object_or_404(queryset, id=eleve_id)
 
 # --- FONCTION HELPER POUR LES NOTIFICATIONS (Partie 5.1) ---
 def creer_notifications_pour_classes(classes_cibles_str, message_template, type_notification, lien_relatif_template=None, **kwargs):
     """
-    Crée des notifications pour les élèves des classes cibles.
+    Programme des notifications pour les élèves des classes cibles.
+    Le message est formaté une seule fois ; les notifications sont écrites par lots
+    en arrière-plan (voir main/diffusion.py), la requête ne dépend donc pas du nombre d'élèves.
     """
-    classes_list = [c.strip().lower() for c in classes_cibles_str.split(',') if c.strip()]
-    eleves_a_notifier = []
-
-    if not classes_list:
-        return
+    return programmer_diffusion(
+        classes_cibles_str,
+        message=message_template.format(**kwargs),
+        type_notification=type_notification,
+        lien_relatif=lien_relatif_template.format(**kwargs) if lien_relatif_template else None,
+    )
 
-    if 'all' in classes_list:
-        eleves_a_notifier = Eleve.objects.all()
-    else:
-        eleves_a_notifier = Eleve.objects.filter(classe__in=classes_list)
+def creer_notification(destinataire, message, type_notification, lien_relatif=None):
+    """
+    Crée une notification pour un seul élève et incrémente son compteur de non lues
+    dans la même transaction.
+    """
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            destinataire=destinataire,
+            message=message,
+            type_notification=type_notification,
+            lien_relatif=lien_relatif
+        )
+        Eleve.objects.filter(pk=destinataire.pk).update(notifications_non_lues=F('notifications_non_lues') + 1)
+        publier_notifications([notification])
+    return notification
 
-    notifications_a_creer = []
-    for eleve in eleves_a_notifier:
-        message_final = message_template.format(**kwargs)
-        lien_final = lien_relatif_template.format(**kwargs) if lien_relatif_template else None
-        
-        notifications_a_creer.append(
-            Notification(
-                destinataire=eleve,
-                message=message_final,
-                type_notification=type_notification,
-                lien_relatif=lien_final
+def creer_notifications_groupees(notifications):
+    """
+    Enregistre des instances de Notification non sauvegardées (plusieurs possibles par élève)
+    avec un seul bulk_create et un seul UPDATE des compteurs de non lues.
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications)
+        par_nombre = defaultdict(list) # nombre de nouvelles notifications -> élèves
+        for eleve_id, nombre in Counter(n.destinataire_id for n in notifications).items():
+            par_nombre[nombre].append(eleve_id)
+        Eleve.objects.filter(id__in=[i for ids in par_nombre.values() for i in ids]).update(
+            notifications_non_lues=F('notifications_non_lues') + Case(
+                *[When(id__in=ids, then=Value(nombre)) for nombre, ids in par_nombre.items()],
+                default=Value(0)
             )
         )
-    
-    if notifications_a_creer:
-        Notification.objects.bulk_create(notifications_a_creer)
+        publier_notifications(notifications)
+    return notifications
 # --- FIN DE LA FONCTION HELPER ---
 
 
 @api_view(['POST'])
+@dec_authentication_classes([]) # Aucun jeton lu : une session périmée n'empêche pas de se reconnecter
 @dec_permission_classes([AllowAny])
 def login_eleve(request):
     nom = request.data.get('nom')
     prenom = request.data.get('prenom')
+    classe = request.data.get('classe') # Facultative : départage des homonymes
+    # Colonnes normalisées indexées (équivalent de nom__iexact / prenom__iexact)
+    eleves = Eleve.objects.filter(nom_normalise=normaliser_nom(nom), prenom_normalise=normaliser_nom(prenom))
+    if classe:
+        eleves = eleves.filter(classe=str(classe).replace(' ', '').lower())
     try:
-        eleve = Eleve.objects.get(nom__iexact=nom, prenom__iexact=prenom)
-        return Response({'success': True, 'eleve': EleveSerializer(eleve).data})
+        eleve = eleves.get()
+        return Response({'success': True, 'eleve': EleveSerializer(eleve).data, 'token': creer_jeton(eleve)})
     except Eleve.DoesNotExist:
         return Response({'success': False, 'message': 'التلميذ غير موجود'}, status=status.HTTP_400_BAD_REQUEST)
+    except Eleve.MultipleObjectsReturned:
+        return Response(
+            {'success': False, 'message': 'يوجد أكثر من تلميذ بهذا الاسم، يرجى تحديد القسم', 'classe_requise': True},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 @api_view(['POST'])
+@dec_authentication_classes([]) # Aucun jeton lu : une session périmée n'empêche pas de se reconnecter
 @dec_permission_classes([AllowAny])
 def login_enseignant(request):
     password = request.data.get('password')
@@ -70,26 +155,101 @@ def login_enseignant(request):
     else:
         return Response({'success': False, 'message': 'كلمة المرور خاطئة'}, status=status.HTTP_400_BAD_REQUEST)
 
-class EleveViewSet(viewsets.ModelViewSet):
+class ChampsDynamiquesViewSetMixin:
+    """
+    `?fields=` / `?omit=` sur les lectures (list, retrieve) : le serializer ne garde que
+    les champs demandés et le queryset ne lit que les colonnes correspondantes.
+    """
+    def lecture_partielle(self):
+        return self.request.method == 'GET' and self.action in ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        if self.lecture_partielle():
+            kwargs['champs'], kwargs['omis'] = champs_demandes(self.request)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.lecture_partielle():
+            queryset = projeter(queryset, self.get_serializer())
+        return queryset
+
+def eleves_filtres(classe=None, search=None):
+    queryset = Eleve.objects.all().order_by('classe', 'nom', 'prenom')
+    if classe:
+        queryset = queryset.filter(classe=classe)
+    if search:
+        # Préfixes de mots, sans accents ni diacritiques, servis par l'index TermeEleve
+        queryset = rechercher_eleves(search, queryset)
+    return queryset
+
+class EleveViewSet(ChampsDynamiquesViewSetMixin, viewsets.ModelViewSet):
     queryset = Eleve.objects.all().order_by('classe', 'nom', 'prenom')
     serializer_class = EleveSerializer
     def get_queryset(self):
-        queryset = Eleve.objects.all().order_by('classe', 'nom', 'prenom')
-        classe = self.request.query_params.get('classe', None)
-        search = self.request.query_params.get('search', None)
-        if classe:
-            queryset = queryset.filter(classe=classe)
-        if search:
-            queryset = queryset.filter(Q(nom__icontains=search) | Q(prenom__icontains=search))
-        return queryset
+        return eleves_filtres(self.request.query_params.get('classe', None), self.request.query_params.get('search', None))
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def importer(self, request):
+        """
+        Import d'une liste d'élèves : fichier CSV ou XLSX dans le champ `fichier`,
+        `mode` = skip (défaut) ou update, `deplacer` = true pour déplacer (mode update) les
+        élèves de même nom d'une autre classe au lieu de les signaler. Voir main/import_eleves.py.
+        """
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response({'error': 'Le champ fichier est requis.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rapport = importer_eleves(
+                lire_lignes(fichier, fichier.name), mode=request.data.get('mode', 'skip'),
+                deplacer=request.data.get('deplacer') in ('1', 'true'),
+            )
+        except ErreurImport as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rapport.as_dict(), status=status.HTTP_200_OK)
+
+class ContenuVersionneMixin:
+    """
+    Après chaque écriture sur un contenu, signale les classes ciblées (anciennes et
+    nouvelles) : leurs ETags changent et leurs listes en cache sont invalidées, ainsi que
+    les statistiques du contenu (calculées sur ses classes ciblées, main/analytique.py).
+    La création est gérée dans le perform_create de chaque ViewSet.
+    """
+    type_contenu = None # 'fichiers', 'activites' ou 'exercices' (voir main/cache_contenus.py)
+    invalider_analytique = None # staticmethod(invalider_exercice) ou staticmethod(invalider_activite)
+
+    def contenu_modifie(self, codes, pk=None):
+        incrementer_classes(codes)
+        invalider_classes(self.type_contenu, codes)
+        if pk is not None and self.invalider_analytique:
+            self.invalider_analytique(pk)
+
+    def perform_update(self, serializer):
+        anciennes = codes_classes_cibles(serializer.instance.classes_cibles)
+        instance = serializer.save()
+        self.contenu_modifie(anciennes + codes_classes_cibles(instance.classes_cibles), instance.pk)
 
-class FichierViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        codes, pk = codes_classes_cibles(instance.classes_cibles), instance.pk
+        instance.delete()
+        self.contenu_modifie(codes, pk)
+
+class FichierViewSet(ChampsDynamiquesViewSetMixin, ContenuVersionneMixin, viewsets.ModelViewSet):
     queryset = Fichier.objects.all().order_by('-date_upload')
     serializer_class = FichierSerializer
+    type_contenu = 'fichiers'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        type_mime = self.request.query_params.get('type_mime')
+        if type_mime: # ?type_mime=application/pdf, servi par l'index de la colonne
+            queryset = queryset.filter(type_mime=type_mime)
+        return queryset
 
     # --- MODIFICATION (Partie 5.2) ---
     def perform_create(self, serializer):
         fichier_instance = serializer.save()
+        self.contenu_modifie(codes_classes_cibles(fichier_instance.classes_cibles))
         creer_notifications_pour_classes(
             classes_cibles_str=fichier_instance.classes_cibles,
             message_template="Nouveau fichier '{titre}' disponible pour votre classe.",
@@ -99,44 +259,97 @@ class FichierViewSet(viewsets.ModelViewSet):
         )
     # --- FIN MODIFICATION ---
 
+def etat_televersement(televersement):
+    return {
+        'cle': televersement.cle, 'statut': televersement.statut, 'cible': televersement.cible,
+        'objet_id': televersement.objet_id, 'nom_fichier': televersement.nom_fichier,
+        'taille': televersement.taille, 'taille_recue': televersement.taille_recue,
+        'morceau_max': MORCEAU_MAX, 'erreur': televersement.erreur,
+    }
+
+@api_view(['POST'])
+@dec_permission_classes([AllowAny])
+def televersement_init(request):
+    """
+    Début d'un téléversement par morceaux (main/televersements.py) : nom_fichier, taille,
+    cible ('fichier' avec titre et classes_cibles, ou 'activite' avec activite).
+    """
+    try:
+        televersement = creer_televersement(
+            request.data.get('nom_fichier'), request.data.get('taille'),
+            cible=request.data.get('cible', 'fichier'), titre=request.data.get('titre', ''),
+            classes_cibles=request.data.get('classes_cibles', 'all'), activite_id=request.data.get('activite'),
+        )
+    except ErreurTeleversement as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(etat_televersement(televersement), status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@dec_permission_classes([AllowAny])
+def televersement_morceaux(request, cle):
+    """GET : état (taille_recue pour reprendre) ; PUT : un morceau brut ; DELETE : abandon."""
+    televersement = get_object_or_404(Televersement, cle=cle)
+    try:
+        if request.method == 'DELETE':
+            annuler_televersement(televersement)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'PUT':
+            debut = debut_morceau(request.headers.get('Content-Range'), televersement.taille_recue)
+            longueur = int(request.headers.get('Content-Length') or 0)
+            # Corps lu par blocs depuis le flux de la requête, jamais chargé en entier.
+            if recevoir_morceau(televersement, request.stream, debut, longueur) is None:
+                return Response({'error': 'Position inattendue, reprendre à taille_recue.', **etat_televersement(televersement)},
+                                status=status.HTTP_409_CONFLICT)
+    except ErreurTeleversement as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(etat_televersement(televersement))
+
+@api_view(['POST'])
+@dec_permission_classes([AllowAny])
+def televersement_terminer(request, cle):
+    """Fichier créé « en attente », transfert vers le stockage en arrière-plan (202)."""
+    televersement = get_object_or_404(Televersement, cle=cle)
+    try:
+        fichier = terminer_televersement(televersement)
+    except ErreurTeleversement as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    donnees = etat_televersement(televersement)
+    if fichier is not None:
+        donnees['fichier'] = FichierSerializer(fichier, context={'request': request}).data
+    return Response(donnees, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
+@etag_eleve('fichiers', par_eleve=False)
 def fichiers_eleve(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    fichiers = Fichier.objects.filter(
-        Q(classes_cibles__iexact='all') | Q(classes_cibles__icontains=eleve.classe)
-    ).order_by('-date_upload')
-    serializer = FichierSerializer(fichiers, many=True)
-    return Response(serializer.data)
-
-class ActiviteViewSet(viewsets.ModelViewSet):
+    eleve = eleve_de_requete(request, eleve_id)
+    return Response(sections_eleve.fichiers(request, eleve, *pagination_demandee(request), **champs_section(request)))
+
+
+class ActiviteViewSet(ChampsDynamiquesViewSetMixin, ContenuVersionneMixin, viewsets.ModelViewSet):
     queryset = Activite.objects.all().order_by('-date_creation')
     serializer_class = ActiviteSerializer
+    type_contenu = 'activites'
+    invalider_analytique = staticmethod(invalider_activite)
 
     @action(detail=True, methods=['get'])
     def progress(self, request, pk=None):
         activite = self.get_object()
-        cibles_str = activite.classes_cibles.lower()
-        classes_cibles_list = [c.strip() for c in cibles_str.split(',') if c.strip()]
-        if 'all' in classes_cibles_list:
-            eleves_concernes = Eleve.objects.all()
-        else:
-            eleves_concernes = Eleve.objects.filter(classe__in=classes_cibles_list)
-        completions = CompletionActivite.objects.filter(activite=activite, eleve__in=eleves_concernes).select_related('eleve')
-        completions_dict = {comp.eleve.id: comp for comp in completions}
-        progression_data = []
-        for eleve_obj in eleves_concernes: # Renommé 'eleve' en 'eleve_obj' pour éviter conflit avec module 'eleve'
-            completion_obj = completions_dict.get(eleve_obj.id)
-            progression_data.append({
-                'eleve_id': eleve_obj.id, 'eleve_nom': eleve_obj.nom, 'eleve_prenom': eleve_obj.prenom,
-                'eleve_classe': eleve_obj.classe, 'completee': completion_obj.completee if completion_obj else False,
-                'date_completion': completion_obj.date_completion if completion_obj else None,
-            })
-        return Response(sorted(progression_data, key=lambda x: (x['eleve_classe'], x['eleve_nom'])))
+        if request.query_params.get('summary') in ('1', 'true'):
+            return Response(resume_progression(activite))
+        # Une seule requête : LEFT JOIN sur les complétions, tri en base.
+        progression = eleves_avec_completion(activite.pk, activite.classes.values('code')).order_by(
+            'classe', 'nom', 'prenom'
+        ).values(
+            'completee', 'date_completion',
+            eleve_id=F('id'), eleve_nom=F('nom'), eleve_prenom=F('prenom'), eleve_classe=F('classe'),
+        )
+        return Response(list(progression))
 
     # --- MODIFICATION (Partie 5.2) ---
     def perform_create(self, serializer):
         activite_instance = serializer.save()
+        self.contenu_modifie(codes_classes_cibles(activite_instance.classes_cibles))
         creer_notifications_pour_classes(
             classes_cibles_str=activite_instance.classes_cibles,
             message_template="Nouvelle activité '{titre}' assignée.",
@@ -150,14 +363,10 @@ class ActiviteViewSet(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
+@etag_eleve('activites')
 def activites_eleve(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    activites = Activite.objects.filter(
-        Q(classes_cibles__iexact='all') | Q(classes_cibles__icontains=eleve.classe)
-    ).order_by('-date_creation')
-    setattr(request, 'eleve_id', eleve_id) 
-    serializer = ActiviteSerializer(activites, many=True, context={'request': request})
-    return Response(serializer.data)
+    eleve = eleve_de_requete(request, eleve_id)
+    return Response(sections_eleve.activites(request, eleve, **champs_section(request)))
 
 @api_view(['POST'])
 @dec_permission_classes([AllowAny])
@@ -172,28 +381,39 @@ def completer_activite(request):
     if not created and not completion.completee:
         completion.completee = True
         completion.save()
+    incrementer_eleve(eleve_id)
+    invalider_activite(activite_id)
     return Response({'success': True, 'message': 'Activité marquée comme complétée.'})
 
-class ExerciceViewSet(viewsets.ModelViewSet):
+class ExerciceViewSet(ChampsDynamiquesViewSetMixin, ContenuVersionneMixin, viewsets.ModelViewSet):
     queryset = Exercice.objects.all().order_by('-date_creation')
     serializer_class = ExerciceSerializer
+    type_contenu = 'exercices'
+    invalider_analytique = staticmethod(invalider_exercice)
 
     @action(detail=True, methods=['get'])
     def responses(self, request, pk=None):
         exercice = self.get_object()
-        cibles_str = exercice.classes_cibles.lower()
-        classes_cibles_list = [c.strip() for c in cibles_str.split(',') if c.strip()]
-        if 'all' in classes_cibles_list:
-            eleves_concernes = Eleve.objects.all()
-        else:
-            eleves_concernes = Eleve.objects.filter(classe__in=classes_cibles_list)
+        eleves_concernes = Eleve.objects.filter(classe__in=exercice.classes.values('code'))
         reponses = ReponseExercice.objects.filter(exercice=exercice, eleve__in=eleves_concernes).select_related('eleve').order_by('eleve__classe', 'eleve__nom')
-        serializer = ReponseExerciceDetailSerializer(reponses, many=True)
+        champs, omis = champs_demandes(request)
+        reponses = projeter(reponses, ReponseExerciceDetailSerializer(champs=champs, omis=omis))
+        serializer = ReponseExerciceDetailSerializer(reponses, many=True, champs=champs, omis=omis)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """Taux de soumission par classe et statistiques des notes, calculés en SQL."""
+        exercice = self.get_object()
+        largeur = largeur_tranches(request)
+        if largeur is None:
+            return Response({'error': f"tranche doit valoir {', '.join(map(str, LARGEURS_TRANCHES))}."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytique_exercice(exercice, largeur))
+
     # --- MODIFICATION (Partie 5.2) ---
     def perform_create(self, serializer):
         exercice_instance = serializer.save()
+        self.contenu_modifie(codes_classes_cibles(exercice_instance.classes_cibles))
         creer_notifications_pour_classes(
             classes_cibles_str=exercice_instance.classes_cibles,
             message_template="Nouvel exercice '{titre}' disponible.",
@@ -207,14 +427,10 @@ class ExerciceViewSet(viewsets.ModelViewSet):
 
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
+@etag_eleve('exercices')
 def exercices_eleve(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    exercices = Exercice.objects.filter(
-        Q(classes_cibles__iexact='all') | Q(classes_cibles__icontains=eleve.classe)
-    ).order_by('-date_creation')
-    setattr(request, 'eleve_id', eleve_id)
-    serializer = ExerciceSerializer(exercices, many=True, context={'request': request})
-    return Response(serializer.data)
+    eleve = eleve_de_requete(request, eleve_id)
+    return Response(sections_eleve.exercices(request, eleve, **champs_section(request)))
 
 @api_view(['POST'])
 @dec_permission_classes([AllowAny])
@@ -228,12 +444,92 @@ def soumettre_reponse(request):
         eleve_id=eleve_id, exercice_id=exercice_id,
         defaults={'reponse': reponse_text, 'corrigee': False, 'note': None}
     )
+    incrementer_eleve(eleve_id)
+    invalider_exercice(exercice_id)
     return Response({'success': True, 'message': 'Réponse soumise.'})
 
-class ReponseExerciceViewSet(viewsets.ModelViewSet):
+class ReponseExerciceViewSet(ChampsDynamiquesViewSetMixin, viewsets.ModelViewSet):
     queryset = ReponseExercice.objects.all()
     serializer_class = ReponseExerciceDetailSerializer
 
+    def perform_create(self, serializer):
+        reponse = serializer.save()
+        incrementer_eleve(reponse.eleve_id)
+        invalider_exercice(reponse.exercice_id)
+
+    def perform_destroy(self, instance):
+        eleve_id, exercice_id = instance.eleve_id, instance.exercice_id
+        instance.delete()
+        incrementer_eleve(eleve_id)
+        invalider_exercice(exercice_id)
+
+    @action(detail=False, methods=['post'], url_path='bulk-grade')
+    def bulk_grade(self, request):
+        """
+        Correction groupée : `[{"id": 1, "note": "14.5", "corrigee": true}, ...]` (ou `{"corrections": [...]}`).
+        Un nombre fixe de requêtes quel que soit le nombre de réponses ; résultat par élément.
+        """
+        elements = request.data.get('corrections') if isinstance(request.data, dict) else request.data
+        if not isinstance(elements, list) or not elements:
+            return Response({'error': 'Une liste non vide de corrections est requise.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(elements) > CORRECTIONS_MAX:
+            return Response({'error': f'{CORRECTIONS_MAX} corrections au maximum par requête.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultats, corrections = [], {}
+        for element in elements:
+            item = CorrectionSerializer(data=element)
+            if not item.is_valid():
+                resultats.append({'id': element.get('id') if isinstance(element, dict) else None, 'status': 'invalide', 'erreurs': item.errors})
+            elif item.validated_data['id'] in corrections:
+                resultats.append({'id': item.validated_data['id'], 'status': 'invalide', 'erreurs': {'id': ['Réponse présente plusieurs fois.']}})
+            else:
+                corrections[item.validated_data['id']] = item.validated_data
+                resultats.append({'id': item.validated_data['id'], 'status': None})
+
+        with transaction.atomic():
+            reponses = {
+                r.pk: r for r in ReponseExercice.objects.select_for_update(of=('self',)).select_related('exercice').only(
+                    'id', 'eleve_id', 'exercice_id', 'exercice__titre', 'corrigee', 'note'
+                ).filter(pk__in=corrections)
+            }
+            modifiees, notifications = [], []
+            for resultat in resultats:
+                if resultat['status'] is not None:
+                    continue
+                reponse = reponses.get(resultat['id'])
+                if reponse is None:
+                    resultat['status'] = 'introuvable'
+                    continue
+                correction = corrections[reponse.pk]
+                ancienne_corrigee = reponse.corrigee
+                if 'note' in correction:
+                    reponse.note = correction['note']
+                if 'corrigee' in correction:
+                    reponse.corrigee = correction['corrigee']
+                modifiees.append(reponse)
+                resultat.update(status='ok', note=reponse.note, corrigee=reponse.corrigee)
+                # Même règle que perform_update : notifier quand la réponse vient d'être corrigée avec une note.
+                if not ancienne_corrigee and reponse.corrigee and reponse.note is not None:
+                    notifications.append(Notification(
+                        destinataire_id=reponse.eleve_id,
+                        message=f"Votre réponse à l'exercice '{reponse.exercice.titre}' a été notée : {reponse.note}/20.",
+                        type_notification='grade_updated',
+                        lien_relatif="/student/dashboard/exercises"
+                    ))
+            if modifiees:
+                ReponseExercice.objects.bulk_update(modifiees, ['note', 'corrigee'])
+                creer_notifications_groupees(notifications)
+                for eleve_id in {r.eleve_id for r in modifiees}:
+                    incrementer_eleve(eleve_id)
+                for exercice_id in {r.exercice_id for r in modifiees}:
+                    invalider_exercice(exercice_id)
+
+        return Response({
+            'corrigees': len(modifiees),
+            'notifications': len(notifications),
+            'resultats': resultats,
+        }, status=status.HTTP_200_OK)
+
     # --- MODIFICATION (Partie 5.4 - Optionnel mais inclus) ---
     def perform_update(self, serializer):
         # Récupère l'instance avant la mise à jour pour comparer l'état 'corrigee'
@@ -244,12 +540,16 @@ class ReponseExerciceViewSet(viewsets.ModelViewSet):
         # Une approche plus simple: si 'note' est dans les données validées et 'corrigee' est True.
         
         old_corrigee_status = ReponseExercice.objects.get(pk=serializer.instance.pk).corrigee
+        ancien_exercice_id = serializer.instance.exercice_id
         
         reponse_instance_apres_update = serializer.save()
+        incrementer_eleve(reponse_instance_apres_update.eleve_id)
+        invalider_exercice(ancien_exercice_id)
+        invalider_exercice(reponse_instance_apres_update.exercice_id)
 
         # Notifier si la réponse vient d'être marquée comme corrigée ET qu'une note est présente
         if not old_corrigee_status and reponse_instance_apres_update.corrigee and reponse_instance_apres_update.note is not None:
-            Notification.objects.create(
+            creer_notification(
                 destinataire=reponse_instance_apres_update.eleve,
                 message=f"Votre réponse à l'exercice '{reponse_instance_apres_update.exercice.titre}' a été notée : {reponse_instance_apres_update.note}/20.",
                 type_notification='grade_updated',
@@ -259,7 +559,7 @@ class ReponseExerciceViewSet(viewsets.ModelViewSet):
     # --- FIN MODIFICATION ---
 
 
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(ChampsDynamiquesViewSetMixin, viewsets.ModelViewSet):
     queryset = Note.objects.all().order_by('-date_attribution')
     serializer_class = NoteSerializer
     def get_queryset(self):
@@ -271,65 +571,102 @@ class NoteViewSet(viewsets.ModelViewSet):
         if classe:
             queryset = queryset.filter(eleve__classe=classe)
         return queryset
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """Statistiques des notes générales, globales et par classe (`?classe=` pour filtrer)."""
+        largeur = largeur_tranches(request)
+        if largeur is None:
+            return Response({'error': f"tranche doit valoir {', '.join(map(str, LARGEURS_TRANCHES))}."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytique_notes(request.query_params.get('classe') or None, largeur))
     
     # Optionnel: Notifier l'élève quand une note générale est ajoutée
     def perform_create(self, serializer):
         note_instance = serializer.save()
-        Notification.objects.create(
+        incrementer_eleve(note_instance.eleve_id)
+        invalider_notes()
+        creer_notification(
             destinataire=note_instance.eleve,
             message=f"Une nouvelle note générale a été publiée : {note_instance.note}/20. Commentaire: {note_instance.commentaire[:30]}...",
             type_notification='grade_updated', # Peut-être un type 'new_general_note' ?
             lien_relatif=f"/student/dashboard/grades"
         )
 
+    def perform_update(self, serializer):
+        ancien_eleve_id = serializer.instance.eleve_id
+        note_instance = serializer.save()
+        incrementer_eleve(ancien_eleve_id)
+        incrementer_eleve(note_instance.eleve_id)
+        invalider_notes()
+
+    def perform_destroy(self, instance):
+        eleve_id = instance.eleve_id
+        instance.delete()
+        incrementer_eleve(eleve_id)
+        invalider_notes()
+
 
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
+@etag_eleve('notes', par_classe=False)
 def note_eleve(request, eleve_id):
-    notes = Note.objects.filter(eleve_id=eleve_id).order_by('-date_attribution')
-    if not notes.exists():
-         return Response([], status=status.HTTP_200_OK)
-    serializer = NoteSerializer(notes, many=True)
-    return Response(serializer.data)
+    eleve = eleve_de_requete(request, eleve_id, Eleve.objects.only('id'))
+    return Response(sections_eleve.notes(request, eleve, *pagination_demandee(request), **champs_section(request)))
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(ChampsDynamiquesViewSetMixin, viewsets.ModelViewSet):
     queryset = Message.objects.all().order_by('-date_envoi')
     serializer_class = MessageSerializer
 
+    # Les résumés de conversation sont reconstruits après toute modification directe.
+    def perform_create(self, serializer):
+        message_instance = serializer.save()
+        Conversation.recalculer(message_instance.eleve_id)
+
+    def perform_update(self, serializer):
+        ancien_eleve_id = serializer.instance.eleve_id
+        message_instance = serializer.save()
+        Conversation.recalculer(message_instance.eleve_id)
+        if ancien_eleve_id != message_instance.eleve_id:
+            Conversation.recalculer(ancien_eleve_id)
+
+    def perform_destroy(self, instance):
+        eleve_id = instance.eleve_id
+        instance.delete()
+        Conversation.recalculer(eleve_id)
+
+def conversations_actives():
+    # Une seule requête indexée sur la table de résumés, quel que soit le volume de messages.
+    return Conversation.objects.filter(dernier_message_date__isnull=False).select_related('eleve')
+
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
 def teacher_conversations(request):
-    eleves_converses = Eleve.objects.annotate(
-        dernier_message_date=Max('message__date_envoi'),
-        non_lus_enseignant=Count(Case(When(message__expediteur='eleve', message__lu=False, then=1)))
-    ).filter(message__isnull=False).distinct().order_by('-dernier_message_date')
-    data = []
-    for eleve_obj in eleves_converses: # Renommé 'eleve' en 'eleve_obj'
-        dernier_message_obj = Message.objects.filter(eleve=eleve_obj).latest('date_envoi')
-        data.append({
-            'eleve_id': eleve_obj.id, 'eleve_nom': eleve_obj.nom, 'eleve_prenom': eleve_obj.prenom,
-            'eleve_classe': eleve_obj.classe,
-            'dernier_message_contenu': dernier_message_obj.contenu[:50] + '...' if dernier_message_obj.contenu and len(dernier_message_obj.contenu) > 50 else dernier_message_obj.contenu,
-            'dernier_message_date': dernier_message_obj.date_envoi,
-            'dernier_message_expediteur': dernier_message_obj.expediteur,
-            'non_lus_enseignant': eleve_obj.non_lus_enseignant
-        })
-    serializer = ConversationSerializer(data, many=True)
-    return Response(serializer.data)
+    paginator = ConversationPagination()
+    page = paginator.paginate_queryset(conversations_actives(), request)
+    serializer = ConversationSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
 def messages_eleve(request, eleve_id):
-    get_object_or_404(Eleve, id=eleve_id)
+    eleve = eleve_de_requete(request, eleve_id)
     # Marquer comme lu par l'enseignant si c'est lui qui consulte.
     # Pour cette démo, on suppose que si l'URL contient '/teacher/', c'est l'enseignant.
     # Ceci est une simplification. Une vraie solution utiliserait l'authentification.
     if '/teacher/' in request.path: # Simple vérification de l'URL
-         Message.objects.filter(eleve_id=eleve_id, expediteur='eleve', lu=False).update(lu=True)
+        Conversation.marquer_lus(eleve_id, expediteur='eleve')
     
-    messages = Message.objects.filter(eleve_id=eleve_id).order_by('date_envoi')
-    serializer = MessageSerializer(messages, many=True)
-    return Response(serializer.data)
+    return Response(sections_eleve.messages(request, eleve, *pagination_demandee(request), **champs_section(request)))
+
+@api_view(['POST'])
+@dec_permission_classes([AllowAny])
+def marquer_messages_lus(request, eleve_id):
+    """L'élève a lu les messages de l'enseignant (action explicite, la lecture de la liste ne modifie rien)."""
+    eleve = eleve_de_requete(request, eleve_id)
+    nb = Conversation.marquer_lus(eleve.id, expediteur='enseignant')
+    if nb:
+        incrementer_eleve(eleve.id)
+    return Response({'status': f'{nb} message(s) marqué(s) comme lu(s)'}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @dec_permission_classes([AllowAny])
@@ -345,17 +682,20 @@ def envoyer_message(request): # --- MODIFICATION (Partie 5.3) ---
 
     serializer = MessageSerializer(data=request.data)
     if serializer.is_valid():
-        message_instance = serializer.save()
-
-        if expediteur == 'enseignant': # Si c'est l'enseignant qui envoie
-            Notification.objects.create(
-                destinataire=eleve_obj,
-                message=f"Nouveau message de l'enseignant: \"{message_instance.contenu[:30]}...\"", # Message plus court
-                type_notification='new_message',
-                lien_relatif=f"/student/dashboard/messages"
-            )
-        # Si c'est l'élève qui envoie, on pourrait aussi notifier l'enseignant,
-        # mais cela sort du cadre du système de notification pour l'élève.
+        with transaction.atomic():
+            message_instance = serializer.save()
+            Conversation.enregistrer_message(message_instance)
+            publier_apres_commit(message_instance.eleve_id, evenement_message(message_instance))
+
+            if expediteur == 'enseignant': # Si c'est l'enseignant qui envoie
+                creer_notification(
+                    destinataire=eleve_obj,
+                    message=f"Nouveau message de l'enseignant: \"{message_instance.contenu[:30]}...\"", # Message plus court
+                    type_notification='new_message',
+                    lien_relatif=f"/student/dashboard/messages"
+                )
+            # Si c'est l'élève qui envoie, on pourrait aussi notifier l'enseignant,
+            # mais cela sort du cadre du système de notification pour l'élève.
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -366,33 +706,164 @@ def envoyer_message(request): # --- MODIFICATION (Partie 5.3) ---
 @api_view(['GET'])
 @dec_permission_classes([AllowAny])
 def get_eleve_notifications(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    notifications = Notification.objects.filter(destinataire=eleve)
+    eleve = eleve_de_requete(request, eleve_id)
     lu_filter = request.query_params.get('lu')
-    if lu_filter is not None:
-        notifications = notifications.filter(lu=lu_filter.lower() == 'true')
-    notifications = notifications.order_by('-date_creation')
-    serializer = NotificationSerializer(notifications, many=True)
-    return Response(serializer.data)
+    lu = lu_filter.lower() == 'true' if lu_filter is not None else None
+    return Response(sections_eleve.notifications(request, eleve, *pagination_demandee(request), lu=lu, **champs_section(request)))
 
 @api_view(['POST'])
 @dec_permission_classes([AllowAny])
 def mark_notification_as_read(request, eleve_id, notification_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    notification = get_object_or_404(Notification, id=notification_id, destinataire=eleve)
-    if not notification.lu:
-        notification.lu = True
-        notification.save()
+    eleve = eleve_de_requete(request, eleve_id)
+    get_object_or_404(Notification, id=notification_id, destinataire_id=eleve.id)
+    with transaction.atomic():
+        # Mise à jour conditionnelle : deux requêtes simultanées ne décrémentent qu'une fois.
+        marquee = Notification.objects.filter(id=notification_id, lu=False).update(lu=True)
+        if marquee:
+            Eleve.objects.filter(pk=eleve.pk).update(notifications_non_lues=F('notifications_non_lues') - 1)
+    if marquee:
         return Response({'status': 'notification marquée comme lue'}, status=status.HTTP_200_OK)
     return Response({'status': 'notification déjà lue'}, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @dec_permission_classes([AllowAny])
 def mark_all_notifications_as_read(request, eleve_id):
-    eleve = get_object_or_404(Eleve, id=eleve_id)
-    updated_count = Notification.objects.filter(destinataire=eleve, lu=False).update(lu=True)
+    eleve = eleve_de_requete(request, eleve_id)
+    with transaction.atomic():
+        updated_count = Notification.objects.filter(destinataire=eleve, lu=False).update(lu=True)
+        if updated_count:
+            Eleve.objects.filter(pk=eleve.pk).update(notifications_non_lues=F('notifications_non_lues') - updated_count)
     if updated_count > 0:
         return Response({'status': f'{updated_count} notifications marquées comme lues'}, status=status.HTTP_200_OK)
     return Response({'status': 'aucune notification non lue à marquer'}, status=status.HTTP_200_OK)
 
-# --- END OF FILE app/backend/main/views.py ---
\ No newline at end of file
+@api_view(['GET'])
+@dec_permission_classes([AllowAny])
+def cache_contenus_stats(request):
+    """Statistiques hits/misses du cache des listes de contenus par classe."""
+    return Response(statistiques_cache_contenus())
+
+@api_view(['GET'])
+@dec_permission_classes([AllowAny])
+def badges_eleve(request, eleve_id):
+    """Compteurs de non lus pour les badges du frontend : une seule lecture par clé primaire."""
+    eleve = get_object_or_404(
+        Eleve.objects.select_related('conversation').only('id', 'notifications_non_lues', 'conversation__non_lus_eleve'),
+        id=eleve_id
+    )
+    conversation = getattr(eleve, 'conversation', None)
+    return Response({
+        'notifications_non_lues': eleve.notifications_non_lues,
+        'messages_non_lus': conversation.non_lus_eleve if conversation else 0,
+    })
+
+SECTIONS_DASHBOARD = {
+    # section: (construction, nom de l'URL de l'endpoint dédié pour le lien `next`, paginée)
+    'fichiers': (sections_eleve.fichiers, 'fichiers_eleve', True),
+    'activites': (sections_eleve.activites, 'activites_eleve', False),
+    'exercices': (sections_eleve.exercices, 'exercices_eleve', False),
+    'notes': (sections_eleve.notes, 'note_eleve', True),
+    'messages': (sections_eleve.messages, 'messages_eleve_pour_eleve', True),
+    'notifications': (sections_eleve.notifications, 'get_eleve_notifications', True),
+}
+
+def _section_dashboard(nom, request, eleve, parallele=False):
+    construire, nom_url, paginee = SECTIONS_DASHBOARD[nom]
+    try:
+        if paginee:
+            url = request.build_absolute_uri(reverse(nom_url, args=[eleve.id]))
+            return construire(request, eleve, url=url)
+        return construire(request, eleve)
+    finally:
+        if parallele:
+            connection.close() # Chaque thread a sa propre connexion, à ne pas laisser ouverte
+
+@api_view(['GET'])
+@dec_permission_classes([AllowAny])
+def dashboard_eleve(request, eleve_id):
+    """
+    Toutes les données de l'espace élève en une réponse : `?sections=fichiers,notes,...`
+    (toutes par défaut). Les sections paginées renvoient leur première page et un lien
+    `next` vers leur endpoint dédié. `?parallele=1` évalue les sections dans des threads.
+    Contrairement à `messages_eleve`, la section messages ne les marque pas comme lus.
+    `?fields=` / `?omit=` ne s'appliquent qu'aux endpoints dédiés, pas aux sections.
+    """
+    demandees = request.query_params.get('sections')
+    if demandees:
+        sections = [s.strip() for s in demandees.split(',') if s.strip()]
+        inconnues = [s for s in sections if s not in SECTIONS_DASHBOARD]
+        if inconnues:
+            return Response(
+                {'error': f"Sections inconnues : {', '.join(inconnues)}", 'sections': list(SECTIONS_DASHBOARD)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        sections = list(dict.fromkeys(sections))
+    else:
+        sections = list(SECTIONS_DASHBOARD)
+
+    eleve = get_object_or_404(Eleve, id=eleve_id) # Résolu une seule fois pour toutes les sections
+    data = {'eleve': EleveSerializer(eleve).data}
+    if request.query_params.get('parallele') in ('1', 'true') and len(sections) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(sections), DASHBOARD_THREADS_MAX)) as executor:
+            futures = {nom: executor.submit(_section_dashboard, nom, request, eleve, True) for nom in sections}
+            data.update({nom: future.result() for nom, future in futures.items()})
+    else:
+        data.update({nom: _section_dashboard(nom, request, eleve) for nom in sections})
+    return Response(data)
+
+@api_view(['GET'])
+@dec_permission_classes([AllowAny])
+def exporter(request, type_export, format_export):
+    """
+    Export en flux : /teacher/exports/<notes|reponses|progression>.<csv|jsonl>
+    avec les filtres ?classe=&depuis=&jusqu_a= (voir main/exports.py).
+    """
+    try:
+        morceaux = generer_export(type_export, format_export, request.query_params)
+    except ErreurExport as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(contenu_flux(request, morceaux), content_type=FORMATS_EXPORT[format_export])
+    response['Content-Disposition'] = f'attachment; filename="{type_export}.{format_export}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+RECHERCHE_PAGE_SIZE = 20
+RECHERCHE_PAGE_SIZE_MAX = 50
+
+@api_view(['GET'])
+@dec_permission_classes([AllowAny])
+def recherche_contenus(request):
+    """
+    Recherche plein texte des enseignants : /teacher/recherche/?q=...&classe=1am1
+    &types=exercice,message&page=2&page_size=20 (voir main/recherche.py). Résultats
+    classés par pertinence ; `next` / `previous` suivent la pagination par page.
+    """
+    saisie = request.query_params.get('q', '').strip()
+    if not saisie:
+        return Response({'error': 'Paramètre q requis.'}, status=status.HTTP_400_BAD_REQUEST)
+    types = [t for t in request.query_params.get('types', '').split(',') if t]
+    inconnus = [t for t in types if t not in TYPES_RECHERCHE]
+    if inconnus:
+        return Response({'error': f"Types inconnus : {', '.join(inconnus)} (attendu : {', '.join(TYPES_RECHERCHE)})."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', RECHERCHE_PAGE_SIZE)), 1), RECHERCHE_PAGE_SIZE_MAX)
+    except ValueError:
+        return Response({'error': 'page et page_size doivent être des entiers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Une ligne de plus que la page pour savoir s'il y a une suite, sans COUNT.
+    resultats = rechercher_contenus(saisie, types=types, classe=request.query_params.get('classe'),
+                                    debut=(page - 1) * page_size, limite=page_size + 1)
+    suite = len(resultats) > page_size
+    url = request.build_absolute_uri()
+    precedente = None
+    if page > 1:
+        precedente = remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+    return Response({
+        'next': replace_query_param(url, 'page', page + 1) if suite else None,
+        'previous': precedente,
+        'results': resumer_resultats(resultats[:page_size], saisie),
+    })
+
+# --- END OF FILE app/backend/main/views.py ---